@@ -0,0 +1,264 @@
+"""Benchmarks every pattern on trees of different sizes, and compares the results against a saved baseline.
+
+   Each pattern is loaded through the PatternManager and drawn with draw_current() and Tree._request_frame(),
+   exactly as the main loop does, without a pixel driver. Run it from the backend folder:
+   ```
+   python bench.py --leds 500 1000 5000 --out bench.json
+   python bench.py --baseline bench.json
+   ```
+
+   The exit code is 1 if the median frame time of any pattern is slower than the baseline by more than the
+   threshold. Baselines are only comparable when they were made on the same machine.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Optional
+import numpy as np
+import attribute
+from clip import Clip
+from pattern_manager import PatternManager, print_message_centered
+from tree import tree
+from util import tcolors
+
+
+def synthetic_tree(num_leds: int, folder: str, seed: int = 0) -> str:
+    """synthetic_tree Write a tree file with LEDs wound round a cone, roughly the shape of the real tree
+
+    Args:
+        num_leds (int): The number of LEDs
+        folder (str): Where to write the tree file
+        seed (int, optional): The seed for the jitter in the LED positions. Defaults to 0.
+
+    Returns:
+        str: The location of the tree file
+    """
+    rng = np.random.default_rng(seed)
+    height, radius, turns = 4.0, 1.0, 30
+
+    t = np.linspace(0, 1, num_leds)
+    z = height * (1 - np.sqrt(1 - t))  # more LEDs at the bottom, where the tree is wider
+    r = radius * (1 - z / height) * rng.uniform(0.85, 1.0, num_leds)
+    angle = 2 * math.pi * turns * t + rng.normal(0, 0.05, num_leds)
+
+    path = os.path.join(folder, f"tree_{num_leds}.csv")
+    with open(path, "w") as f:
+        for x, y, h in zip(r * np.cos(angle), r * np.sin(angle), z):
+            f.write(f"{x:.8f},\t{y:.8f},\t{h:.8f}\n")
+    return path
+
+
+def bench_pattern(manager: PatternManager, name: str, frames: int, warmup: int, alloc_frames: int, seed: int) -> dict[str, Any]:
+    """bench_pattern Time one pattern
+
+    Args:
+        manager (PatternManager): The pattern manager, with the patterns loaded for the current tree
+        name (str): The name of the pattern
+        frames (int): How many frames to time
+        warmup (int): How many frames to draw before timing
+        alloc_frames (int): How many frames to draw while tracing memory allocations
+        seed (int): The seed for random and numpy.random
+
+    Returns:
+        dict[str, Any]: The results, times are in milliseconds and memory in KiB
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    tree._buffer.clear()
+    tree._shapes = []
+    tree._pattern_reset()
+    manager.unload_pattern()
+    manager.load_pattern(name)
+
+    def step():
+        manager.draw_current()
+        tree._request_frame()
+
+    for _ in range(warmup):
+        step()
+
+    times = np.zeros(frames, dtype=np.float64)
+    for i in range(frames):
+        start = time.perf_counter()
+        step()
+        times[i] = time.perf_counter() - start
+
+    # tracing slows everything down, so allocations are measured separately from the times
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    peaks = np.zeros(alloc_frames, dtype=np.float64)
+    for i in range(alloc_frames):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        step()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks[i] = peak - current
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times *= 1000
+    mean = float(times.mean())
+    return {
+        "mean_ms": mean,
+        "median_ms": float(np.median(times)),
+        "p95_ms": float(np.percentile(times, 95)),
+        "p99_ms": float(np.percentile(times, 99)),
+        "max_ms": float(times.max()),
+        "fps": 1000 / mean if mean > 0 else math.inf,
+        "alloc_kib_per_frame": float(peaks.mean()) / 1024 if alloc_frames else 0.0,
+        "retained_kib_per_frame": (after - before) / 1024 / alloc_frames if alloc_frames else 0.0,
+        "error": manager.currentPattern is None,
+    }
+
+
+def run(sizes: list[Optional[int]], names: Optional[list[str]], tree_file: str, pattern_dir: str,
+        frames: int, warmup: int, alloc_frames: int, seed: int, verbose: bool) -> dict[str, Any]:
+    """run Benchmark the patterns on every tree size
+
+    Args:
+        sizes (list[Optional[int]]): The number of LEDs in each synthetic tree, None uses tree_file
+        names (Optional[list[str]]): The patterns to benchmark, or None for all of them
+        tree_file (str): The real tree file
+        pattern_dir (str): The directory where pattern files are stored
+        frames (int): How many frames to time each pattern for
+        warmup (int): How many frames to draw before timing
+        alloc_frames (int): How many frames to trace memory allocations for
+        seed (int): The random seed
+        verbose (bool): Whether to show what the patterns print
+
+    Returns:
+        dict[str, Any]: The results, ready to be saved as json
+    """
+    results: dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "frames": frames,
+            "warmup": warmup,
+            "seed": seed,
+        },
+        "results": {},
+    }
+
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            file = tree_file if size is None else synthetic_tree(size, folder, seed)
+            tree.init(file, use_cache=size is None)
+            key = str(tree._num_pixels)
+
+            with quiet:
+                manager = PatternManager(pattern_dir)
+
+            print(f"{tcolors.OKBLUE}{print_message_centered(f'{key} LEDs', 78, '#')}{tcolors.ENDC}")
+            print(f"{'pattern':<24}{'mean ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'fps':>9}{'KiB/frame':>11}")
+
+            size_results: dict[str, Any] = {}
+            # clips are already recorded, there is nothing to time
+            patterns = [name for name, pattern in manager.patterns.items() if not isinstance(pattern, Clip)]
+
+            for name in sorted(names or patterns):
+                if name not in manager.patterns:
+                    print(f"{tcolors.FAIL}{name:<24}not found{tcolors.ENDC}")
+                    continue
+
+                with quiet:
+                    result = bench_pattern(manager, name, frames, warmup, alloc_frames, seed)
+                size_results[name] = result
+
+                color = tcolors.FAIL if result["error"] else ""
+                print(f"{color}{name[:23]:<24}{result['mean_ms']:>9.3f}{result['p95_ms']:>9.3f}{result['p99_ms']:>9.3f}"
+                      f"{result['fps']:>9.0f}{result['alloc_kib_per_frame']:>11.1f}{' error' if result['error'] else ''}{tcolors.ENDC if color else ''}")
+
+            results["results"][key] = size_results
+            attribute.Store.get_store().reset()
+
+    return results
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float, min_ms: float) -> list[str]:
+    """compare Find the patterns which got slower than the baseline
+
+    Args:
+        results (dict[str, Any]): The results from run()
+        baseline (dict[str, Any]): Results saved from an earlier run
+        threshold (float): How much slower, as a fraction, counts as a regression
+        min_ms (float): Differences smaller than this many milliseconds are ignored as noise
+
+    Returns:
+        list[str]: A line for each regression
+    """
+    regressions: list[str] = []
+    for size, patterns in results["results"].items():
+        for name, result in patterns.items():
+            old = baseline.get("results", {}).get(size, {}).get(name)
+            if old is None or "median_ms" not in old:
+                continue
+
+            if result["error"] and not old["error"]:
+                regressions.append(f"{name} ({size} LEDs) now fails")
+                continue
+
+            # the median is much steadier from run to run than the mean or the percentiles
+            new_ms, old_ms = result["median_ms"], old["median_ms"]
+            if new_ms > old_ms * (1 + threshold) and new_ms - old_ms > min_ms:
+                regressions.append(f"{name} ({size} LEDs) median {old_ms:.3f} ms -> {new_ms:.3f} ms")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="GRIDmas Tree - Benchmark",
+        description="Time every pattern on trees of different sizes, and compare against a baseline",
+    )
+    parser.add_argument("patterns", nargs="*", help="The patterns to benchmark, defaults to all of them")
+    parser.add_argument("--leds", type=int, nargs="+", required=False, help="Benchmark on synthetic trees with this many LEDs, defaults to the real tree")
+    parser.add_argument("--tree-file", type=str, required=False, help="Specify where to find the tree.csv file")
+    parser.add_argument("--pattern-dir", type=str, required=False, help="Specify the directory where pattern files are stored")
+    parser.add_argument("--frames", type=int, default=200, help="How many frames to time each pattern for")
+    parser.add_argument("--warmup", type=int, default=10, help="How many frames to draw before timing")
+    parser.add_argument("--alloc-frames", type=int, default=20, help="How many frames to trace memory allocations for")
+    parser.add_argument("--seed", type=int, default=0, help="The random seed")
+    parser.add_argument("--out", type=str, required=False, help="Save the results to this json file")
+    parser.add_argument("--baseline", type=str, required=False, help="Compare against results saved with --out")
+    parser.add_argument("--threshold", type=float, default=0.25, help="How much slower than the baseline, as a fraction, is a regression")
+    parser.add_argument("--min-ms", type=float, default=0.1, help="Ignore differences smaller than this many milliseconds")
+    parser.add_argument("--verbose", action="store_true", help="Show what the patterns print")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    sizes: list[Optional[int]] = args.leds or [None]
+    results = run(sizes, args.patterns or None, args.tree_file or "tree.csv", args.pattern_dir or "patterns",
+                  args.frames, args.warmup, args.alloc_frames, args.seed, args.verbose)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        if regressions:
+            print(f"{tcolors.FAIL}{len(regressions)} regressions against {args.baseline}:{tcolors.ENDC}")
+            for line in regressions:
+                print(f"{tcolors.FAIL}  {line}{tcolors.ENDC}")
+            sys.exit(1)
+        print(f"{tcolors.OKGREEN}No regressions against {args.baseline}{tcolors.ENDC}")
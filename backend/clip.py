@@ -0,0 +1,401 @@
+"""Records patterns into .gridmas clips and plays them back, so a pattern that looks the same every night
+   doesn't have to be worked out again on the tree every night.
+
+   A clip starts with a header:
+
+   | bytes | contents                                                   |
+   |-------|------------------------------------------------------------|
+   | 8     | `GRIDMAS\\0`                                                |
+   | 2     | format version                                             |
+   | 2     | flags, bit 0 is set when the frames are zstd compressed    |
+   | 4     | fps                                                        |
+   | 4     | number of LEDs                                             |
+   | 4     | number of frames                                           |
+   | 4     | keyframe interval                                          |
+   | 32    | sha256 of the tree file the clip was recorded for          |
+   | 8     | where the frame index starts                               |
+
+   followed by the frames and then the index, which is the offset of each frame and the end of the last one.
+   Every value is little endian.
+
+   Each frame is its packed GRB words XORed with the frame before, so LEDs which didn't change are zero and
+   compress to almost nothing. Every keyframe interval frames a frame is XORed with black instead, so playback
+   can start from there.
+
+   Record a pattern from the backend folder with:
+   ```
+   python clip.py "Fade Waves" --seconds 60
+   ```
+
+   Put the clip in the patterns folder and it will be listed with the other patterns.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+import argparse
+import contextlib
+import importlib
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+from types import GeneratorType
+from typing import Iterator, Optional
+import numpy as np
+import numpy.typing as npt
+import zstandard
+import attribute
+from tree import tree
+from util import tcolors
+
+
+CLIP_EXTENSION = ".gridmas"
+"""The file extension of clips"""
+
+MAGIC = b"GRIDMAS\0"
+VERSION = 1
+FLAG_ZSTD = 1
+
+_HEADER = struct.Struct("<8sHHIIII32sQ")
+
+
+class Clip:
+    """A recorded clip, memory mapped so only the frames being played are read from disk
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, path: str):
+        """__init__ Open a clip
+
+        Args:
+            path (str): The location of the .gridmas file
+
+        Raises:
+            ValueError: If the file isn't a clip this version can play
+        """
+        self.path = path
+        self.name = os.path.basename(path)
+        """The name of the clip, shown with the patterns"""
+
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{path} is too short to be a clip")
+
+        magic, version, flags, fps, num_leds, frame_count, keyframe_interval, tree_hash, index_offset = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a clip")
+        if version != VERSION:
+            raise ValueError(f"{path} is clip version {version}, only version {VERSION} can be played")
+        if frame_count == 0:
+            raise ValueError(f"{path} has no frames")
+
+        self.fps: int = fps
+        self.num_leds: int = num_leds
+        self.frame_count: int = frame_count
+        self.keyframe_interval: int = keyframe_interval
+        self.tree_hash: str = tree_hash.hex()
+        self.compressed = bool(flags & FLAG_ZSTD)
+
+        self._index: npt.NDArray[np.uint64] = np.frombuffer(self._map, dtype="<u8", count=frame_count + 1, offset=index_offset)
+        self._decompressor = zstandard.ZstdDecompressor() if self.compressed else None
+
+        self._frame: npt.NDArray[np.uint32] = np.zeros(num_leds, dtype=np.uint32)
+        self._position = 0
+        """The number of the next frame next_frame() will give"""
+
+    def __repr__(self) -> str:
+        return f"Clip({self.name!r}, {self.frame_count} frames at {self.fps} fps, {self.num_leds} LEDs)"
+
+    @property
+    def seconds(self) -> float:
+        """How long the clip lasts"""
+        return self.frame_count / self.fps
+
+    def _delta(self, n: int) -> npt.NDArray[np.uint32]:
+        start, end = int(self._index[n]), int(self._index[n + 1])
+        if self._decompressor is not None:
+            data = self._decompressor.decompress(self._map[start:end], max_output_size=4 * self.num_leds)
+            return np.frombuffer(data, dtype="<u4")
+        return np.frombuffer(self._map, dtype="<u4", count=self.num_leds, offset=start)
+
+    def reset(self):
+        """reset Play from the start again"""
+        self._position = 0
+
+    def next_frame(self) -> npt.NDArray[np.uint32]:
+        """next_frame The next frame of the clip, going back to the start after the last one
+
+        The same array is returned every time and changed in place, copy it if you need to keep it
+
+        Returns:
+            npt.NDArray[np.uint32]: The frame as packed GRB words
+        """
+        n = self._position
+        if n % self.keyframe_interval == 0:
+            self._frame[:] = self._delta(n)
+        else:
+            np.bitwise_xor(self._frame, self._delta(n), out=self._frame)
+
+        self._position = (n + 1) % self.frame_count
+        return self._frame
+
+    def frame(self, n: int) -> npt.NDArray[np.uint32]:
+        """frame Jump to a frame
+
+        Decodes from the keyframe before it, next_frame() carries on from here
+
+        Args:
+            n (int): The frame number
+
+        Returns:
+            npt.NDArray[np.uint32]: The frame as packed GRB words, in the same array as next_frame()
+        """
+        n %= self.frame_count
+        self._position = n - n % self.keyframe_interval
+        while self._position != n:
+            self.next_frame()
+        return self.next_frame()
+
+    def frames(self) -> Iterator[npt.NDArray[np.uint32]]:
+        """frames Every frame of the clip from the start, as copies"""
+        self.reset()
+        for _ in range(self.frame_count):
+            yield self.next_frame().copy()
+        self.reset()
+
+    def check(self, num_leds: int, tree_hash: str) -> bool:
+        """check Whether the clip can be played on a tree
+
+        Args:
+            num_leds (int): The number of LEDs on the tree
+            tree_hash (str): The sha256 of the tree file
+
+        Returns:
+            bool: False if the clip has the wrong number of LEDs, a different tree file only gives a warning
+        """
+        if self.num_leds != num_leds:
+            print(f"{tcolors.FAIL}skipping {self.name} | recorded for {self.num_leds} LEDs, the tree has {num_leds} {tcolors.ENDC}")
+            return False
+        if self.tree_hash != tree_hash:
+            print(f"{tcolors.WARNING}{self.name} was recorded for a different tree file, it may not look right{tcolors.ENDC}")
+        return True
+
+    def close(self):
+        """close Unmap the clip"""
+        self._decompressor = None
+        del self._index
+        self._map.close()
+
+
+class ClipWriter:
+    """Writes frames to a new clip
+
+    The clip is written next to where it should be and moved into place by close(), so a half written
+    clip is never left behind
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, path: str, fps: int, num_leds: int, tree_hash: str, compress: bool = True, keyframe_interval: Optional[int] = None):
+        """__init__ Start a clip
+
+        Args:
+            path (str): Where to save the clip
+            fps (int): The fps the clip plays at
+            num_leds (int): The number of LEDs in each frame
+            tree_hash (str): The sha256 of the tree file
+            compress (bool, optional): Whether to zstd compress the frames. Defaults to True.
+            keyframe_interval (Optional[int], optional): How many frames apart keyframes are, one second of frames if None. Defaults to None.
+        """
+        self.path = path
+        self.fps = fps
+        self.num_leds = num_leds
+        self.tree_hash = tree_hash
+        self.compress = compress
+        self.keyframe_interval = keyframe_interval or fps
+
+        self._offsets: list[int] = []
+        self._previous: npt.NDArray[np.uint32] = np.zeros(num_leds, dtype=np.uint32)
+        self._compressor = zstandard.ZstdCompressor(level=19) if compress else None
+
+        folder = os.path.dirname(os.path.abspath(path))
+        fd, self._staging = tempfile.mkstemp(dir=folder, suffix=CLIP_EXTENSION + ".tmp")
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(b"\0" * _HEADER.size)
+
+    @property
+    def frame_count(self) -> int:
+        """The number of frames added so far"""
+        return len(self._offsets)
+
+    def add(self, frame: npt.NDArray[np.uint32]):
+        """add Add the next frame
+
+        Args:
+            frame (npt.NDArray[np.uint32]): The frame as packed GRB words
+        """
+        frame = np.asarray(frame, dtype=np.uint32)[:self.num_leds]
+        if len(frame) < self.num_leds:
+            frame = np.concatenate([frame, np.zeros(self.num_leds - len(frame), dtype=np.uint32)])
+
+        if self.frame_count % self.keyframe_interval == 0:
+            delta = frame
+        else:
+            delta = frame ^ self._previous
+        self._previous = frame.copy()
+
+        data = delta.astype("<u4").tobytes()
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+
+        offset = self._file.tell()
+        self._file.write(data)
+        self._offsets.append(offset)
+
+    def close(self):
+        """close Write the index and header and move the clip into place
+
+        Raises:
+            ValueError: If no frames were added
+        """
+        try:
+            if self.frame_count == 0:
+                raise ValueError("A clip needs at least one frame")
+
+            end = self._file.tell()
+            self._file.write(np.array(self._offsets + [end], dtype="<u8").tobytes())
+
+            flags = FLAG_ZSTD if self.compress else 0
+            self._file.seek(0)
+            self._file.write(_HEADER.pack(MAGIC, VERSION, flags, self.fps, self.num_leds, self.frame_count,
+                                          self.keyframe_interval, bytes.fromhex(self.tree_hash), end))
+            self._file.close()
+            os.replace(self._staging, self.path)
+
+        except BaseException:
+            self._file.close()
+            os.remove(self._staging)
+            raise
+
+
+CLOCK_START = 1735084800.0
+"""What time.time() starts at while recording, midnight on Christmas day 2024, so recordings are the same every time"""
+
+
+@contextlib.contextmanager
+def _frame_clock():
+    # patterns read the time with time.time(), make it move on one frame per frame instead of with the wall clock.
+    # The fps is passed to each tick, patterns may only set theirs once they are running
+    real_time = time.time
+    now = [CLOCK_START]
+
+    def fake_time() -> float:
+        return now[0]
+
+    def tick(fps: int):
+        now[0] += 1 / fps
+
+    time.time = fake_time
+    try:
+        yield tick
+    finally:
+        time.time = real_time
+
+
+def record(name: str, path: str, seconds: float = 60, frames: Optional[int] = None, pattern_dir: str = "patterns", seed: Optional[int] = 0, compress: bool = True) -> ClipWriter:
+    """record Run a pattern without a tree and save its frames to a clip
+
+    The pattern is drawn through Tree._request_frame() exactly as it would be on the tree, with time moving
+    on one frame each frame, so it can run much faster than real time. Recording the same pattern with the
+    same seed always gives the same clip. tree.init() must be called first
+
+    Args:
+        name (str): The name of the pattern
+        path (str): Where to save the clip
+        seconds (float, optional): How long to record for, at the fps the pattern sets. Defaults to 60.
+        frames (Optional[int], optional): How many frames to record, instead of seconds. Defaults to None.
+        pattern_dir (str, optional): The directory where pattern files are stored. Defaults to "patterns".
+        seed (Optional[int], optional): The seed for random and numpy.random, or None to not seed them. Defaults to 0.
+        compress (bool, optional): Whether to zstd compress the frames. Defaults to True.
+
+    Returns:
+        ClipWriter: The closed writer, with the details of the clip
+    """
+    package = os.path.basename(os.path.normpath(pattern_dir))
+    module = importlib.import_module(f"{package}.{name}")
+
+    # start from a black tree
+    tree._buffer.clear()
+    tree._shapes = []
+
+    writer: Optional[ClipWriter] = None
+    with _frame_clock() as tick:
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+
+        # run the pattern's setup again, now the clock and random numbers are fixed
+        attribute.Store.get_store().reset()
+        tree._pattern_reset()
+        module = importlib.reload(module)
+
+        generator = None
+        while writer is None or writer.frame_count < (frames or round(seconds * writer.fps)):
+            if generator:
+                next(generator)
+            else:
+                res = module.draw()
+                if isinstance(res, GeneratorType):
+                    generator = res
+
+            frame = tree._request_frame()
+            if writer is None:
+                # patterns set their fps in draw(), so wait for the first frame to know it
+                writer = ClipWriter(path, tree._fps, tree._num_pixels, tree._tree_hash, compress)
+            elif tree._fps != writer.fps:
+                print(f"{tcolors.WARNING}{name} changed its fps to {tree._fps}, the clip plays at {writer.fps}{tcolors.ENDC}")
+
+            writer.add(frame)
+            # the clip plays at the writer's fps, so that is how fast time moves for the pattern
+            tick(writer.fps)
+
+    assert writer is not None
+    writer.close()
+    return writer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="GRIDmas Tree - Clip recorder",
+        description="Record a pattern into a .gridmas clip which can be played back without running the pattern",
+    )
+    parser.add_argument("pattern", type=str, help="The name of the pattern to record")
+    parser.add_argument("--out", type=str, required=False, help="Where to save the clip, defaults to the pattern directory")
+    parser.add_argument("--seconds", type=float, required=False, help="How long to record for, defaults to 60 seconds")
+    parser.add_argument("--frames", type=int, required=False, help="How many frames to record, instead of --seconds")
+    parser.add_argument("--tree-file", type=str, required=False, help="Specify where to find the tree.csv file")
+    parser.add_argument("--pattern-dir", type=str, required=False, help="Specify the directory where pattern files are stored")
+    parser.add_argument("--seed", type=int, required=False, default=0, help="The random seed to record with")
+    parser.add_argument("--no-compress", action="store_true", required=False, help="Don't zstd compress the frames")
+    args = parser.parse_args()
+
+    pattern_dir = args.pattern_dir or "patterns"
+    tree.init(args.tree_file or "tree.csv")
+
+    out = args.out or os.path.join(pattern_dir, args.pattern + CLIP_EXTENSION)
+
+    start = time.perf_counter()
+    writer = record(args.pattern, out, args.seconds or 60, args.frames, pattern_dir, args.seed, not args.no_compress)
+    took = time.perf_counter() - start
+
+    size = os.path.getsize(out)
+    print(f"{tcolors.OKGREEN}Recorded {writer.frame_count} frames at {writer.fps} fps to {out} "
+          f"({size / 1024:.0f} KiB, {took:.1f}s){tcolors.ENDC}")
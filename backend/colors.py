@@ -526,18 +526,161 @@ class Pixel(Color):
     """
 
     def __init__(self, id: int, coord: tuple[float, float, float], tree: "Tree", color: Color = Color.black()):
-        super().__init__(*color.to_tuple())
+        # the color and lerp state live in the tree's frame buffer, so this must be set up
+        # before Color.__init__ writes to them
         self._id = id
+        self._buffer = tree._buffer
+        super().__init__(*color.to_tuple())
 
         self._x = coord[0]
         self._y = coord[1]
         self._z = coord[2]
 
-        self._a = math.atan2(self._y, self._x)
-        self._d = math.sqrt(self._y ** 2 + self._x ** 2)
+        self._a = float(tree._a[id])
+        self._d = float(tree._d[id])
         
         self._tree = tree
 
+    # The color and lerp state of a pixel is stored in the frame buffer rather than on the
+    # object, these properties make the pixel a view onto its row of the buffer
+
+    @property
+    def _r(self) -> int:
+        return int(self._buffer.rgb[self._id, 0])
+
+    @_r.setter
+    def _r(self, value: int):
+        self._buffer.rgb[self._id, 0] = value & 0xff
+
+    @property
+    def _g(self) -> int:
+        return int(self._buffer.rgb[self._id, 1])
+
+    @_g.setter
+    def _g(self, value: int):
+        self._buffer.rgb[self._id, 1] = value & 0xff
+
+    @property
+    def _b(self) -> int:
+        return int(self._buffer.rgb[self._id, 2])
+
+    @_b.setter
+    def _b(self, value: int):
+        self._buffer.rgb[self._id, 2] = value & 0xff
+
+    @property
+    def _changed(self) -> bool:
+        return bool(self._buffer.changed[self._id])
+
+    @_changed.setter
+    def _changed(self, value: bool):
+        self._buffer.changed[self._id] = value
+
+    @property
+    def _L_previous(self) -> tuple[int, int, int]:
+        r, g, b = self._buffer.lerp_previous[self._id]
+        return (int(r), int(g), int(b))
+
+    @_L_previous.setter
+    def _L_previous(self, value: tuple[int, int, int]):
+        self._buffer.lerp_previous[self._id] = value
+
+    @property
+    def _L_target(self) -> tuple[int, int, int]:
+        r, g, b = self._buffer.lerp_target[self._id]
+        return (int(r), int(g), int(b))
+
+    @_L_target.setter
+    def _L_target(self, value: tuple[int, int, int]):
+        self._buffer.lerp_target[self._id] = value
+
+    @property
+    def _L_step(self) -> int:
+        return int(self._buffer.lerp_step[self._id])
+
+    @_L_step.setter
+    def _L_step(self, value: int):
+        self._buffer.lerp_step[self._id] = value
+
+    @property
+    def _L_total(self) -> int:
+        return int(self._buffer.lerp_total[self._id])
+
+    @_L_total.setter
+    def _L_total(self, value: int):
+        self._buffer.lerp_total[self._id] = value
+
+    @property
+    def _L_fn(self) -> Callable[[float], float]:
+        return self._buffer.lerp_fns[self._buffer.lerp_fn_id[self._id]]
+
+    @_L_fn.setter
+    def _L_fn(self, value: Callable[[float], float]):
+        self._buffer.lerp_fn_id[self._id] = self._buffer.fn_id(value)
+
+    # The most common setters write the whole row at once instead of going through the
+    # per channel properties
+
+    def lerp_reset(self):
+        """lerp_reset Reset to lerp step 0
+
+        This method sets the previous lerp state to the current color, and sets the step number to 0
+        """
+        self._buffer.lerp_previous[self._id] = self._buffer.rgb[self._id]
+        self._buffer.lerp_step[self._id] = 0
+
+    def set_lerp(self, target: "Color", time: int, override: bool = False, fn: Callable[[float], float] = linear):
+        """This resets the lerp and starts interpolation to target from current value. Successive calls will not change the target unless override is set to True. Use with cont_lerp to have the same effect as lerp()"""
+        buffer = self._buffer
+        i = self._id
+        if override or buffer.lerp_target[i].tolist() != list(target.to_tuple()) or buffer.lerp_total[i] != time:
+            buffer.lerp_previous[i] = buffer.rgb[i]
+            buffer.lerp_step[i] = 0
+            buffer.lerp_target[i] = target.to_tuple()
+            buffer.lerp_total[i] = time
+            buffer.lerp_fn_id[i] = buffer.fn_id(fn)
+
+    def cont_lerp(self):
+        """Advanced the lerp one step.
+        """
+        buffer = self._buffer
+        i = self._id
+        step = int(buffer.lerp_step[i])
+        total = int(buffer.lerp_total[i])
+        if step == total:
+            return
+        step = min(step + 1, total)
+        buffer.lerp_step[i] = step
+        d = buffer.lerp_fns[buffer.lerp_fn_id[i]](clamp(step / total, 0, 1))
+
+        pr, pg, pb = buffer.lerp_previous[i].tolist()
+        tr, tg, tb = buffer.lerp_target[i].tolist()
+        self._r = int(pr * (1 - d) + tr * d)
+        self._g = int(pg * (1 - d) + tg * d)
+        self._b = int(pb * (1 - d) + tb * d)
+
+    def set(self, c: "Color"):
+        """Set the color to another color by value"""
+        self._buffer.set_rgb(self._id, c._r, c._g, c._b)
+
+    def set_color(self, c: "Color"):
+        self._buffer.set_rgb(self._id, c._r, c._g, c._b)
+
+    def set_rgb(self, r: int, g: int, b: int):
+        """Set the red, green and blue values of the color, values between 0 and 255"""
+        self._buffer.set_rgb(self._id, r, g, b)
+
+    def to_tuple(self) -> tuple[int, int, int]:
+        """Returns the tuple of the R, G and B, values between 0 and 255 """
+        r, g, b = self._buffer.rgb[self._id]
+        return (int(r), int(g), int(b))
+
+    def to_bit_string(self) -> int:
+        """Return the color as an byte string integer,
+       int bitmap encoded as GGGGGGGGRRRRRRRRBBBBBBBB"""
+        r, g, b = self.to_tuple()
+        return (r << 8) | (g << 16) | b
+
     @property
     def id(self) -> int:
         """The id in the LED sequence"""
@@ -580,7 +723,7 @@ class Pixel(Color):
             my_pixel = pixels(0)
             print(my_pixel.distance_to(pixels(10))) # 0.45
         """
-        return self._tree._distances[self._id][p.id]
+        return math.dist(self.xyz, p.xyz)
 
     def nearest(self, n: int) -> list[tuple["Pixel", float]]:
         """Find the nearest n pixels from the current
@@ -592,7 +735,8 @@ class Pixel(Color):
                 len(neighbors) # 4, nearest pixels
                 ```
         """
-        return self._tree._pixel_distance_matrix[self._id][:n]
+        ids, distances = self._tree._grid.nearest(self.xyz, n)
+        return [(self._tree._pixels[i], d) for i, d in zip(ids.tolist(), distances.tolist())]
 
     def within(self, d: float) -> list["Pixel"]:
         """Find all pixels that are within a certain radius
@@ -603,15 +747,8 @@ class Pixel(Color):
                 neighbors = my_pixel.within(0.4) # pixels within 0.4 radius
                 ```
         """
-        left = 0
-        right = self._tree._num_pixels - 1
-        while left < right:
-            mid = (left + right) // 2
-            if self._tree._pixel_distance_matrix[self._id][mid][1] < d:
-                left = mid + 1
-            else:
-                right = mid
-        return list(map(lambda x: x[0], self._tree._pixel_distance_matrix[self._id][:left]))
+        ids, _ = self._tree._grid.within(self.xyz, d)
+        return [self._tree._pixels[i] for i in ids.tolist()]
 
 def int2tuple(c: int) -> tuple[int, int, int]:
     """conver the 24bit encoded int to tuple of R, G, and B.
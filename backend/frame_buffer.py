@@ -0,0 +1,247 @@
+"""The frame buffer holds the colour and lerp state of every pixel on the tree in
+   contiguous arrays so that the compositor can work on the whole tree at once.
+
+   Pixels are thin views onto a row of the frame buffer, so patterns which use the
+   classic per-pixel API keep working unchanged.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+from typing import Callable, Union
+import numpy as np
+import numpy.typing as npt
+
+from util import array_easing, linear
+
+
+MAX_LERP_FNS = 64
+"""How many timing functions to remember before forgetting the unused ones"""
+
+
+class FrameBuffer:
+    """Structure of arrays holding the state of every pixel on the tree
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, num_pixels: int):
+        """__init__ Create an empty (black) frame buffer
+
+        Args:
+            num_pixels (int): The number of pixels on the tree
+        """
+        self.num_pixels = num_pixels
+
+        self.rgb: npt.NDArray[np.uint8] = np.zeros((num_pixels, 3), dtype=np.uint8)
+        """The current color of every pixel, one row of R, G, B per pixel"""
+
+        self.changed: npt.NDArray[np.bool_] = np.zeros(num_pixels, dtype=np.bool_)
+        """Which pixels have been directly set since the last frame"""
+
+        self.lerp_previous: npt.NDArray[np.float64] = np.zeros((num_pixels, 3), dtype=np.float64)
+        """The color each lerp started from"""
+
+        self.lerp_target: npt.NDArray[np.float64] = np.zeros((num_pixels, 3), dtype=np.float64)
+        """The color each lerp is heading towards"""
+
+        self.lerp_step: npt.NDArray[np.int32] = np.zeros(num_pixels, dtype=np.int32)
+        """How many frames each lerp has advanced"""
+
+        self.lerp_total: npt.NDArray[np.int32] = np.zeros(num_pixels, dtype=np.int32)
+        """How many frames each lerp takes in total"""
+
+        self.lerp_fn_id: npt.NDArray[np.int32] = np.zeros(num_pixels, dtype=np.int32)
+        """Which timing function each lerp uses, an index into lerp_fns"""
+
+        self.lerp_fns: list[Callable[[float], float]] = [linear]
+        """Every timing function that has been used for a lerp"""
+
+    def clear(self):
+        """clear Turn every pixel off and forget every lerp, as if the buffer had just been created"""
+        self.rgb[:] = 0
+        self.changed[:] = False
+        self.lerp_previous[:] = 0
+        self.lerp_target[:] = 0
+        self.lerp_step[:] = 0
+        self.lerp_total[:] = 0
+        self.lerp_fn_id[:] = 0
+        self.lerp_fns = [linear]
+
+    def set_rgb(self, i: int, r: int, g: int, b: int):
+        """set_rgb Directly set the color of a pixel
+
+        Sets the color, resets the lerp to start from the new color and marks the pixel as changed
+
+        Args:
+            i (int): The id of the pixel
+            r (int): Red component 0-255
+            g (int): Green component 0-255
+            b (int): Blue component 0-255
+        """
+        r, g, b = r & 0xff, g & 0xff, b & 0xff
+
+        # single element writes are a lot cheaper than assigning a row from a tuple
+        rgb = self.rgb
+        rgb[i, 0] = r
+        rgb[i, 1] = g
+        rgb[i, 2] = b
+
+        previous = self.lerp_previous
+        previous[i, 0] = r
+        previous[i, 1] = g
+        previous[i, 2] = b
+
+        self.lerp_step[i] = 0
+        self.changed[i] = True
+
+    def fill(self, r: int, g: int, b: int, ids: Union[slice, npt.NDArray[np.intp]] = slice(None)):
+        """fill Directly set the color of many pixels at once
+
+        Args:
+            r (int): Red component 0-255
+            g (int): Green component 0-255
+            b (int): Blue component 0-255
+            ids (Union[slice, npt.NDArray[np.intp]], optional): The pixels to set. Defaults to the whole tree.
+        """
+        self.rgb[ids] = (r & 0xff, g & 0xff, b & 0xff)
+        self.lerp_previous[ids] = self.rgb[ids]
+        self.lerp_step[ids] = 0
+        self.changed[ids] = True
+
+    def set_colors(self, rgb: npt.NDArray[np.uint8], ids: Union[slice, npt.NDArray[np.intp]] = slice(None)):
+        """set_colors Directly set a different color for each of many pixels at once
+
+        Args:
+            rgb (npt.NDArray[np.uint8]): An (n, 3) array of colors, one row for each pixel in ids
+            ids (Union[slice, npt.NDArray[np.intp]], optional): The pixels to set. Defaults to the whole tree.
+        """
+        self.rgb[ids] = rgb
+        self.lerp_previous[ids] = rgb
+        self.lerp_step[ids] = 0
+        self.changed[ids] = True
+
+    def fn_id(self, fn: Callable[[float], float]) -> int:
+        """fn_id Get the id of a timing function, registering it if it hasn't been seen before
+
+        Args:
+            fn (Callable[[float], float]): The timing function
+
+        Returns:
+            int: The index of fn in lerp_fns
+        """
+        try:
+            return self.lerp_fns.index(fn)
+        except ValueError:
+            pass
+
+        # patterns which pass a new lambda every frame would grow this forever,
+        # so drop the functions that no pixel is using any more
+        if len(self.lerp_fns) >= MAX_LERP_FNS:
+            used = np.unique(self.lerp_fn_id)
+            remap = np.zeros(len(self.lerp_fns), dtype=np.int32)
+            remap[used] = np.arange(len(used), dtype=np.int32)
+            self.lerp_fn_id = remap[self.lerp_fn_id]
+            self.lerp_fns = [self.lerp_fns[i] for i in used.tolist()]
+
+        self.lerp_fns.append(fn)
+        return len(self.lerp_fns) - 1
+
+    def set_lerp(self, target: tuple[int, int, int], total: int, fn: Callable[[float], float], override: bool = False, ids: Union[slice, npt.NDArray[np.intp]] = slice(None)):
+        """set_lerp Start lerping pixels towards the target color
+
+        The array version of Color.set_lerp(), pixels which are already lerping to the same target over the same
+        number of frames carry on from where they are unless override is set
+
+        Args:
+            target (tuple[int, int, int]): The color to lerp to
+            total (int): The number of frames to perform the lerp over
+            fn (Callable[[float], float]): Timing function from the Util module
+            override (bool, optional): Restart the lerp even if it hasn't changed. Defaults to False.
+            ids (Union[slice, npt.NDArray[np.intp]], optional): The pixels to lerp. Defaults to the whole tree.
+        """
+        restart = np.arange(self.num_pixels)[ids]
+        if not override:
+            differs = np.any(self.lerp_target[restart] != target, axis=1) | (self.lerp_total[restart] != total)
+            restart = restart[differs]
+
+        if len(restart) == 0:
+            return
+
+        self.lerp_previous[restart] = self.rgb[restart]
+        self.lerp_step[restart] = 0
+        self.lerp_target[restart] = target
+        self.lerp_total[restart] = total
+        self.lerp_fn_id[restart] = self.fn_id(fn)
+
+    def advance_lerps(self):
+        """advance_lerps Advance every active lerp by one step
+
+        The array version of calling Color.cont_lerp() on every pixel, pixels which are not part way through a lerp cost nothing
+        """
+        active = np.flatnonzero(self.lerp_step != self.lerp_total)
+        if len(active) == 0:
+            return
+
+        total = self.lerp_total[active]
+        step = np.minimum(self.lerp_step[active] + 1, total)
+        self.lerp_step[active] = step
+
+        percent = np.clip(step / total, 0, 1)
+
+        # group the lerps by their timing function so each function is called once
+        fn_ids = self.lerp_fn_id[active]
+        first = int(fn_ids[0])
+        if np.all(fn_ids == first):
+            d = array_easing(self.lerp_fns[first])(percent)
+        else:
+            d = np.empty_like(percent)
+            for fn_id in np.unique(fn_ids).tolist():
+                group = fn_ids == fn_id
+                d[group] = array_easing(self.lerp_fns[fn_id])(percent[group])
+        d = d[:, np.newaxis]
+
+        value = self.lerp_previous[active] * (1 - d) + self.lerp_target[active] * d
+        self.rgb[active] = value.astype(np.int64) & 0xff
+
+    def packed(self) -> npt.NDArray[np.uint32]:
+        """packed The whole buffer encoded for the pixel driver
+
+        Returns:
+            npt.NDArray[np.uint32]: One word per pixel, encoded as GGGGGGGGRRRRRRRRBBBBBBBB
+        """
+        return pack_rgb(self.rgb)
+
+
+def pack_rgb(rgb: npt.NDArray[np.uint8]) -> npt.NDArray[np.uint32]:
+    """pack_rgb Convert an array of R, G, B rows to 24bit encoded ints
+
+    The array version of Color.to_bit_string(), int bitmap encoded as GGGGGGGGRRRRRRRRBBBBBBBB
+
+    Args:
+        rgb (npt.NDArray[np.uint8]): An (n, 3) array of colors
+
+    Returns:
+        npt.NDArray[np.uint32]: n packed colors
+    """
+    words = rgb.astype(np.uint32)
+    return (words[:, 0] << 8) | (words[:, 1] << 16) | words[:, 2]
+
+
+def unpack_rgb(words: npt.NDArray[np.uint32]) -> npt.NDArray[np.uint8]:
+    """unpack_rgb Convert 24bit encoded ints back to an array of R, G, B rows
+
+    The inverse of pack_rgb()
+
+    Args:
+        words (npt.NDArray[np.uint32]): n colors encoded as GGGGGGGGRRRRRRRRBBBBBBBB
+
+    Returns:
+        npt.NDArray[np.uint8]: An (n, 3) array of colors
+    """
+    rgb = np.empty((len(words), 3), dtype=np.uint8)
+    rgb[:, 0] = words >> 8
+    rgb[:, 1] = words >> 16
+    rgb[:, 2] = words
+    return rgb
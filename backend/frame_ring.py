@@ -0,0 +1,139 @@
+"""A ring of frame slots in shared memory, used to hand frames from the main loop to the pixel driver process
+   without pickling them.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Any, Optional
+import numpy as np
+import numpy.typing as npt
+
+
+class FrameRing:
+    """A fixed number of frame slots in shared memory, with one writer and one reader
+
+    The writer blocks while every slot is full, the same as putting into a full multiprocessing.Queue.
+    Each slot holds the frame as packed GRB words and the fps it should be shown at.
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, num_leds: int, slots: int = 10):
+        """__init__ Create the shared memory for the ring
+
+        Args:
+            num_leds (int): The number of LEDs in each frame
+            slots (int, optional): How many frames can be waiting for the reader. Defaults to 10.
+        """
+        self.num_leds = num_leds
+        self.slots = slots
+
+        self._memory = shared_memory.SharedMemory(create=True, size=self._size())
+        self._free = multiprocessing.Semaphore(slots)
+        self._filled = multiprocessing.Semaphore(0)
+        self._attach()
+        self._sequence[:] = 0
+
+    def _size(self) -> int:
+        return 8 * 2 + 4 * self.slots + 4 * self.slots * self.num_leds
+
+    def _attach(self):
+        buf = self._memory.buf
+
+        self._sequence: npt.NDArray[np.int64] = np.ndarray((2,), dtype=np.int64, buffer=buf, offset=0)
+        """The number of frames written and read so far"""
+
+        self._fps: npt.NDArray[np.int32] = np.ndarray((self.slots,), dtype=np.int32, buffer=buf, offset=16)
+        self._frames: npt.NDArray[np.uint32] = np.ndarray((self.slots, self.num_leds), dtype=np.uint32, buffer=buf, offset=16 + 4 * self.slots)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # the array views point into this process's mapping, the other process makes its own
+        state = self.__dict__.copy()
+        del state["_sequence"], state["_fps"], state["_frames"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]):
+        self.__dict__.update(state)
+        self._attach()
+
+    @property
+    def written(self) -> int:
+        """The number of frames put into the ring"""
+        return int(self._sequence[0])
+
+    @property
+    def read(self) -> int:
+        """The number of frames taken out of the ring"""
+        return int(self._sequence[1])
+
+    def put(self, frame: npt.NDArray[np.uint32], fps: int, timeout: Optional[float] = None) -> bool:
+        """put Copy a frame into the next free slot
+
+        Blocks until a slot is free
+
+        Args:
+            frame (npt.NDArray[np.uint32]): The frame as packed GRB words, shorter frames are padded with black
+            fps (int): The fps the frame should be shown at
+            timeout (Optional[float], optional): How long to wait for a free slot, forever if None. Defaults to None.
+
+        Returns:
+            bool: False if the timeout ran out before a slot was free
+        """
+        if not self._free.acquire(timeout=timeout):
+            return False
+
+        slot = self.written % self.slots
+        count = min(len(frame), self.num_leds)
+        self._frames[slot, :count] = frame[:count]
+        self._frames[slot, count:] = 0
+        self._fps[slot] = fps
+        self._sequence[0] += 1
+
+        self._filled.release()
+        return True
+
+    def get(self, out: npt.NDArray[np.uint32], timeout: Optional[float] = None) -> Optional[int]:
+        """get Copy the oldest frame out of the ring and free its slot
+
+        Args:
+            out (npt.NDArray[np.uint32]): Where to copy the frame to, num_leds words long
+            timeout (Optional[float], optional): How long to wait for a frame, forever if None. Defaults to None.
+
+        Returns:
+            Optional[int]: The fps of the frame, or None if the timeout ran out
+        """
+        if not self._filled.acquire(timeout=timeout):
+            return None
+
+        slot = self.read % self.slots
+        np.copyto(out, self._frames[slot])
+        fps = int(self._fps[slot])
+        self._sequence[1] += 1
+
+        self._free.release()
+        return fps
+
+    def pending(self) -> int:
+        """pending The number of frames waiting for the reader"""
+        return self.written - self.read
+
+    def clear(self):
+        """clear Throw away every frame waiting for the reader"""
+        while self._filled.acquire(block=False):
+            self._sequence[1] += 1
+            self._free.release()
+
+    def close(self, unlink: bool = False):
+        """close Detach from the shared memory
+
+        Args:
+            unlink (bool, optional): Also free the shared memory, only the process which created the ring should do this. Defaults to False.
+        """
+        del self._sequence, self._fps, self._frames
+        self._memory.close()
+        if unlink:
+            self._memory.unlink()
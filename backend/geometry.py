@@ -2,6 +2,8 @@
 
 from abc import ABC, abstractmethod
 from typing import Optional
+import numpy as np
+import numpy.typing as npt
 from colors import Color, Pixel
 from tree import tree
 
@@ -13,6 +15,10 @@ class Shape(ABC):
     Args:
         ABC (abc.ABC): An abstract class
     """
+
+    color: Color
+    """The color the shape is drawn with, shapes which implement rasterize() must set this"""
+
     @abstractmethod
     def does_draw(self, pixel: Pixel) -> Optional[Color]:
         """does_draw T.B.D
@@ -27,6 +33,92 @@ class Shape(ABC):
         """
         ...
 
+    def bounds(self) -> Optional[tuple[tuple[float, float, float], tuple[float, float, float]]]:
+        """bounds The box which the shape fits inside
+
+        The tree only asks does_draw() about the pixels inside this box, so a shape that
+        only covers a small part of the tree is much faster to draw
+
+        Returns:
+            Optional[tuple[tuple[float, float, float], tuple[float, float, float]]]: The lowest and highest [x, y, z] corners of the box, or None if the shape could cover the whole tree
+        """
+        return None
+
+    def rasterize(self, xyz: npt.NDArray[np.float64]) -> Optional[npt.NDArray[np.bool_]]:
+        """rasterize Find which of the pixels the shape draws, all at once
+
+        The array version of does_draw(), every pixel in the mask is drawn with the shape's color.
+        Shapes which don't implement this are drawn one pixel at a time with does_draw()
+
+        Args:
+            xyz (npt.NDArray[np.float64]): An (n, 3) array of pixel coordinates
+
+        Returns:
+            Optional[npt.NDArray[np.bool_]]: n booleans, true where the shape draws, or None if the shape can only use does_draw()
+        """
+        return None
+
+    _version = 0
+    """Bumped whenever the shape moves or changes size, so the tree knows to work out its pixels again"""
+
+    _covered: Optional[tuple[int, npt.NDArray[np.intp]]] = None
+    """The version of the shape and the pixels it covered then, for kept shapes"""
+
+    def keep(self) -> "Shape":
+        """keep Keep drawing the shape every frame, until it is removed
+
+        Normally a shape is only drawn for the frame it was made in. A kept shape stays on the tree, and a kept
+        Sphere, Box or Line can be moved with move_to() and move_by(). The tree remembers which pixels it covers and
+        only works them out again when it changes, so shapes which stay still cost almost nothing
+
+        Returns:
+            Shape: The shape, so it can be kept as it is made
+
+        Example:
+            ```
+            ball = Sphere((0, 0, 1), 0.3, Color.red()).keep()
+
+            def draw():
+                ball.move_by(0, 0, 0.01)
+            ```
+        """
+        if self in tree._shapes:
+            tree._shapes.remove(self)
+        if self not in tree._kept_shapes:
+            tree._kept_shapes.append(self)
+        return self
+
+    def remove(self):
+        """remove Stop drawing a kept shape"""
+        if self in tree._kept_shapes:
+            tree._kept_shapes.remove(self)
+
+    def changed(self):
+        """changed Tell the tree that the shape has moved or changed size
+
+        move_to(), move_by() and resize() do this already, call it after changing the shape's attributes directly
+        """
+        self._version += 1
+
+    def covered(self) -> Optional[npt.NDArray[np.intp]]:
+        """covered The pixels the shape covers, remembered until the shape changes
+
+        Returns:
+            Optional[npt.NDArray[np.intp]]: The ids of the pixels, or None if the shape can only use does_draw()
+        """
+        if self._covered is not None and self._covered[0] == self._version:
+            return self._covered[1]
+
+        box = self.bounds()
+        candidates = np.arange(tree._num_pixels) if box is None else tree._grid.candidates(*box)
+        mask = self.rasterize(tree._xyz[candidates])
+        if mask is None:
+            return None
+
+        ids = np.sort(candidates[mask])
+        self._covered = (self._version, ids)
+        return ids
+
 class Sphere(Shape):
     """Sphere a 3D circle :wink:
 
@@ -46,13 +138,41 @@ class Sphere(Shape):
             radius (float): The radius of the sphere
             color (Color): The color of the sphere
         """
+        self.move_to(pos)
+        self.resize(radius)
+        self.color = color
+        tree._shapes.append(self)
+
+    def move_to(self, pos: tuple[float, float, float]):
+        """move_to Move the center of the sphere
+
+        Args:
+            pos (tuple[float, float, float]): The new center [x, y, z]
+        """
         self.pos = pos
         self.x, self.y, self.z = pos
+        self.changed()
+
+    def move_by(self, dx: float, dy: float, dz: float):
+        """move_by Move the sphere
+
+        Args:
+            dx (float): How far to move along x
+            dy (float): How far to move along y
+            dz (float): How far to move along z
+        """
+        self.move_to((self.x + dx, self.y + dy, self.z + dz))
+
+    def resize(self, radius: float):
+        """resize Change the radius of the sphere
+
+        Args:
+            radius (float): The new radius
+        """
         self.radius = radius
         self.radius2 = radius * radius  # store squared radius
         self.inner_radius = radius / 1.73205  # for inscribed cube
-        self.color = color
-        tree._shapes.append(self)
+        self.changed()
 
     def does_draw(self, pixel: Pixel) -> Optional[Color]:
         dx = pixel.x - self.x
@@ -73,35 +193,54 @@ class Sphere(Shape):
 
         return None
 
+    def bounds(self) -> Optional[tuple[tuple[float, float, float], tuple[float, float, float]]]:
+        r = self.radius
+        return ((self.x - r, self.y - r, self.z - r), (self.x + r, self.y + r, self.z + r))
+
+    def rasterize(self, xyz: npt.NDArray[np.float64]) -> Optional[npt.NDArray[np.bool_]]:
+        d = np.abs(xyz - (self.x, self.y, self.z))
+
+        # same tests as does_draw, the inscribed cube is slightly bigger than the sphere at its corners
+        in_box = np.all(d <= self.radius, axis=1)
+        in_cube = np.all(d <= self.inner_radius, axis=1)
+        in_sphere = np.einsum("ij,ij->i", d, d) <= self.radius2
+        return in_box & (in_cube | in_sphere)
+
 class Box(Shape):
     def __init__(self, pos: tuple[float, float, float], length: float, color: Color):
-        self.pos = pos
-        self.x = pos[0]
-        self.y = pos[1]
-        self.z = pos[2]
-        self.length = length
+        self.move_to(pos)
+        self.resize(length)
         self.color = color
         tree._shapes.append(self)
 
-    def does_draw(self, pixel: Pixel) -> Optional[Color]:
-        # Check if the pixel is within the outer bounding box
-        if self.z - self.length < pixel.z < self.z + self.length and \
-           self.x - self.length < pixel.x < self.x + self.length and \
-           self.y - self.length < pixel.y < self.y + self.length:
-
-            return self.color
-        else:
-            return None
+    def move_to(self, pos: tuple[float, float, float]):
+        """move_to Move the center of the box
 
-class Box(Shape):
-    def __init__(self, pos: tuple[float, float, float], length: float, color: Color):
+        Args:
+            pos (tuple[float, float, float]): The new center [x, y, z]
+        """
         self.pos = pos
-        self.x = pos[0]
-        self.y = pos[1]
-        self.z = pos[2]
+        self.x, self.y, self.z = pos
+        self.changed()
+
+    def move_by(self, dx: float, dy: float, dz: float):
+        """move_by Move the box
+
+        Args:
+            dx (float): How far to move along x
+            dy (float): How far to move along y
+            dz (float): How far to move along z
+        """
+        self.move_to((self.x + dx, self.y + dy, self.z + dz))
+
+    def resize(self, length: float):
+        """resize Change the size of the box
+
+        Args:
+            length (float): The new distance from the center to each face
+        """
         self.length = length
-        self.color = color
-        tree._shapes.append(self)
+        self.changed()
 
     def does_draw(self, pixel: Pixel) -> Optional[Color]:
         # Check if the pixel is within the outer bounding box
@@ -113,6 +252,13 @@ class Box(Shape):
         else:
             return None
 
+    def bounds(self) -> Optional[tuple[tuple[float, float, float], tuple[float, float, float]]]:
+        l = self.length
+        return ((self.x - l, self.y - l, self.z - l), (self.x + l, self.y + l, self.z + l))
+
+    def rasterize(self, xyz: npt.NDArray[np.float64]) -> Optional[npt.NDArray[np.bool_]]:
+        return np.all(np.abs(xyz - (self.x, self.y, self.z)) < self.length, axis=1)
+
 
 class Line(Shape):
     """Line A line
@@ -133,19 +279,48 @@ class Line(Shape):
             stroke (float): The width of the line
             color (Color): The color of the line
         """
+        self.move_to(a, b)
+        self.resize(stroke)
+        self.color = color
+
+        tree._shapes.append(self)
+
+    def move_to(self, a: tuple[float, float, float], b: tuple[float, float, float]):
+        """move_to Move the ends of the line
+
+        Args:
+            a (tuple[float, float, float]): The new start position of the line [x, y, z]
+            b (tuple[float, float, float]): The new end position of the line [x, y, z]
+        """
         self.ax, self.ay, self.az = a
         self.bx, self.by, self.bz = b
-        self.stroke = stroke
-        self.stroke2 = stroke * stroke
-        self.color = color
 
         # Precompute axis vector and squared length
         self.vx = self.bx - self.ax
         self.vy = self.by - self.ay
         self.vz = self.bz - self.az
         self.len2 = self.vx*self.vx + self.vy*self.vy + self.vz*self.vz
+        self.changed()
 
-        tree._shapes.append(self)
+    def move_by(self, dx: float, dy: float, dz: float):
+        """move_by Move the line
+
+        Args:
+            dx (float): How far to move along x
+            dy (float): How far to move along y
+            dz (float): How far to move along z
+        """
+        self.move_to((self.ax + dx, self.ay + dy, self.az + dz), (self.bx + dx, self.by + dy, self.bz + dz))
+
+    def resize(self, stroke: float):
+        """resize Change the width of the line
+
+        Args:
+            stroke (float): The new width
+        """
+        self.stroke = stroke
+        self.stroke2 = stroke * stroke
+        self.changed()
 
     def does_draw(self, pixel: Pixel) -> Optional[Color]:
         # Vector from A to point
@@ -175,3 +350,18 @@ class Line(Shape):
             return self.color
         return None
 
+    def bounds(self) -> Optional[tuple[tuple[float, float, float], tuple[float, float, float]]]:
+        s = self.stroke
+        return ((min(self.ax, self.bx) - s, min(self.ay, self.by) - s, min(self.az, self.bz) - s),
+                (max(self.ax, self.bx) + s, max(self.ay, self.by) + s, max(self.az, self.bz) + s))
+
+    def rasterize(self, xyz: npt.NDArray[np.float64]) -> Optional[npt.NDArray[np.bool_]]:
+        p = xyz - (self.ax, self.ay, self.az)
+        v = np.array((self.vx, self.vy, self.vz))
+
+        # project onto the axis and find the closest point on the segment
+        t = p @ v / self.len2 if self.len2 != 0 else np.zeros(len(xyz))
+        d = p - t[:, np.newaxis] * v
+        return (t >= 0.0) & (t <= 1.0) & (np.einsum("ij,ij->i", d, d) <= self.stroke2)
+
+
@@ -10,6 +10,12 @@
     5. fizzle
     6. attribute
     7. gemoetry
+    8. shader
+    9. voxel
+    10. mapping
+    11. particle_system
+    12. sdf
+    13. layers
 
 
     Use this at the top of your pattern:
@@ -25,3 +31,9 @@ from wipe import *
 from fizzle import *
 from attribute import *
 from geometry import *
+from shader import *
+from voxel import *
+from mapping import *
+from particle_system import *
+from sdf import *
+from layers import *
@@ -0,0 +1,120 @@
+"""Layers of color which are blended over the tree, like the layers in an image editor.
+
+   Everything a pattern draws normally (pixels, shapes, shaders and the background) makes up the bottom of the
+   picture. Layers are stacked on top of it in the order they were made, each with its own opacity and blend
+   mode, so overlapping things can mix instead of hiding each other. A layer holds a color and an alpha for every
+   light in NumPy arrays, and every layer is blended over the whole tree at once when the frame is sent, so the
+   cost of a layer doesn't depend on how many lights it touches.
+
+   Use this at the top of your pattern:
+   ```
+   from gridmas import *
+   ```
+"""
+
+from typing import Literal, Union
+import numpy as np
+import numpy.typing as npt
+from colors import Color
+from tree import tree
+
+
+BlendMode = Literal["normal", "add", "multiply", "screen", "max"]
+"""How a layer's colors are combined with the colors under it"""
+
+BLEND_MODES: tuple[BlendMode, ...] = ("normal", "add", "multiply", "screen", "max")
+
+
+class Layer:
+    """A layer of color over the tree
+
+    A new layer is empty, see through everywhere. Layers keep what is drawn on them from frame to frame,
+    until they are cleared
+
+    Example:
+        ```
+        glow = Layer("add", opacity=0.5)
+        ball = SDFSphere((0, 0, 1), 0.4)
+
+        def draw():
+            glow.clear()
+            glow.fill(Color.red(), alpha=ball.coverage(0.5))
+        ```
+    """
+
+    def __init__(self, mode: BlendMode = "normal", opacity: float = 1):
+        """__init__ Create an empty layer on top of the others
+
+        Args:
+            mode (BlendMode, optional): How the layer is combined with the colors under it. "normal" covers them,
+                "add" adds to them, "multiply" darkens them, "screen" lightens them and "max" keeps the brighter of the two.
+                Defaults to "normal".
+            opacity (float, optional): How much the whole layer shows, 0-1. Defaults to 1.
+        """
+        if mode not in BLEND_MODES:
+            raise ValueError(f"Unknown blend mode '{mode}', a layer can use {', '.join(BLEND_MODES)}")
+
+        self.mode: BlendMode = mode
+        """How the layer is combined with the colors under it"""
+
+        self.opacity = opacity
+        """How much the whole layer shows, 0-1"""
+
+        self.rgb: npt.NDArray[np.float32] = np.zeros((tree._num_pixels, 3), dtype=np.float32)
+        """The color of the layer at every light, one row of R, G, B (0-255) per light"""
+
+        self.alpha: npt.NDArray[np.float32] = np.zeros(tree._num_pixels, dtype=np.float32)
+        """How much of the layer shows at every light, 0-1"""
+
+        tree._layers.append(self)
+
+    def clear(self):
+        """clear Make the whole layer see through again"""
+        self.rgb[:] = 0
+        self.alpha[:] = 0
+
+    def fill(self, color: Union[Color, npt.ArrayLike], alpha: npt.ArrayLike = 1, ids: Union[slice, npt.NDArray[np.intp]] = slice(None)):
+        """fill Paint lights on the layer
+
+        Args:
+            color (Union[Color, npt.ArrayLike]): A Color for every light, or an (n, 3) array with a color for each light in ids
+            alpha (npt.ArrayLike, optional): How much the paint shows, one value or one per light in ids, 0-1. Defaults to 1.
+            ids (Union[slice, npt.NDArray[np.intp]], optional): The lights to paint. Defaults to the whole tree.
+
+        Example:
+            ```
+            layer.fill(Color.blue(), ids=np.array([0, 1, 2]))
+            ```
+        """
+        if isinstance(color, Color):
+            color = color.to_tuple()
+        self.rgb[ids] = color
+        self.alpha[ids] = np.clip(alpha, 0, 1)
+
+    def remove(self):
+        """remove Take the layer off the tree"""
+        if self in tree._layers:
+            tree._layers.remove(self)
+
+    def _blend(self, rgb: npt.NDArray[np.float32]):
+        """Blend the layer over the (n, 3) colors under it, in place"""
+        if self.opacity <= 0:
+            return
+
+        top = self.rgb
+        match self.mode:
+            case "normal":
+                blended = top
+            case "add":
+                blended = np.minimum(rgb + top, 255)
+            case "multiply":
+                blended = rgb * top / 255
+            case "screen":
+                blended = 255 - (255 - rgb) * (255 - top) / 255
+            case "max":
+                blended = np.maximum(rgb, top)
+            case _:
+                raise ValueError(f"Unknown blend mode '{self.mode}', a layer can use {', '.join(BLEND_MODES)}")
+
+        weight = self.alpha * np.float32(min(self.opacity, 1))
+        rgb += (blended - rgb) * weight[:, np.newaxis]
@@ -8,10 +8,13 @@ __documenter__ = "Owen Plimer"
 
 #!/usr/bin/python3
 
-from renderer import Renderer
+from renderer import DRIVERS, Renderer
 from pattern_manager import PatternManager
 from tree import tree
-from web_server import DrawFrame, StartPattern, StopPattern, WebServer, RandomPattern
+from pattern_worker import PatternWorker
+from profiler import SamplingProfiler
+from transition import TRANSITION_STYLES
+from web_server import DrawFrame, SetAttribute, StartPattern, StopPattern, WebServer, RandomPattern
 import argparse
 import signal
 import sys
@@ -29,12 +32,26 @@ parser.add_argument("--port", type=int, required=False, help="The port to host t
 parser.add_argument("--tree-file", type=str, required=False, help="Specify where to find the tree.csv file")
 parser.add_argument("--rate-limit", action="store_true", required=False, help="Use this to enable rate limiting on the web server")
 parser.add_argument("--pattern-dir", type=str, required=False, help="Specify the directory where pattern files are stored")
+parser.add_argument("--strip-layout", type=str, required=False, help="Specify a json file describing how the LED strips are wired")
+parser.add_argument("--driver", type=str, choices=DRIVERS, default="auto", required=False, help="Which pixel driver to use, null and file don't need a tree or a display")
+parser.add_argument("--output", type=str, required=False, help="Where the file driver saves frames, defaults to output.gridmas")
+parser.add_argument("--pattern-worker", action="store_true", required=False, help="Run patterns in their own process, so a slow pattern can't slow down the web server")
+parser.add_argument("--profile", type=str, nargs="?", const="profile", required=False, help="Sample the patterns while they draw and save a flamegraph profile when stopped, to profile.collapsed unless a path is given")
+parser.add_argument("--profile-interval", type=float, default=2, required=False, help="Milliseconds of CPU time between profile samples")
 parser.add_argument("--auto-pattern", type=int, required=False, help="Automatically run through random patterns at the interval you set")
+parser.add_argument("--transition", type=int, default=0, required=False, help="Crossfade between patterns over this many frames instead of cutting straight to the next one")
+parser.add_argument("--transition-style", type=str, choices=TRANSITION_STYLES, default="fade", required=False, help="How patterns are blended during a transition")
 
 def signal_handler(sig, frame):
     print("\nShutting down gracefully...")
     if web_server:
         web_server.stop()
+    if worker:
+        worker.stop()
+    if renderer:
+        renderer.stop()
+    if profiler:
+        profiler.finish()
     sys.exit(0)
 
 if __name__ == '__main__':
@@ -44,16 +61,31 @@ if __name__ == '__main__':
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
+    web_server = None
+    worker = None
+    renderer = None
+    profiler = None
+
     # initialise tree
-    tree.init(args.tree_file or "tree.csv")
+    tree_file = args.tree_file or "tree.csv"
+    tree.init(tree_file)
 
     # Start pattern manager and load patterns
-    patternManager = PatternManager(args.pattern_dir or "patterns/")
+    pattern_dir = args.pattern_dir or "patterns/"
+    if args.profile and not args.pattern_worker:
+        profiler = SamplingProfiler(args.profile, args.profile_interval / 1000)
+        profiler.start(pattern_dir)
+    patternManager = PatternManager(pattern_dir, profiler, args.transition, args.transition_style)
 
     tree._fps = 45
 
     # Initialise the rendering pipeline
-    renderer = Renderer(tree._coords)
+    renderer = Renderer(tree._coords, args.strip_layout, args.driver, args.output)
+
+    # Run patterns in a separate process which writes frames straight to the pixel driver
+    if args.pattern_worker:
+        worker = PatternWorker(tree_file, pattern_dir, renderer.frame_ring, args.profile, args.profile_interval / 1000,
+                               args.transition, args.transition_style)
 
     # Web server
     is_rate_limit = False
@@ -66,7 +98,11 @@ if __name__ == '__main__':
 
     auto_pattern = args.auto_pattern
 
-    web_server = WebServer(is_rate_limit, patternManager)
+    def timing_rings():
+        # in worker mode the worker times the loop which draws the patterns
+        return {"loop": worker.render_times if worker else tree._render_times, "driver": renderer.pixel_driver.times}
+
+    web_server = WebServer(is_rate_limit, patternManager, timing_rings)
     web_server.run(port)
 
     # Give the web server a moment to start up
@@ -78,9 +114,11 @@ if __name__ == '__main__':
 
     print(auto_pattern)
     ## main loop
+    timer = tree._render_times
     try:
         while True:
             t += 1
+            timer.start()
 
             if (auto_pattern is not None and time.time() - last_change > auto_pattern):
                 web_server.request_queue.put(RandomPattern())
@@ -90,44 +128,90 @@ if __name__ == '__main__':
             while req != None:
                 match req:
                     case StopPattern():
-                        patternManager.unload_pattern()
+                        if worker:
+                            worker.send(req)
+                        else:
+                            patternManager.unload_pattern()
 
                     case StartPattern(name=name):
-                        tree._pattern_reset()
-                        patternManager.load_pattern(name)
+                        if worker:
+                            worker.send(req)
+                        else:
+                            patternManager.switch_pattern(name)
+                            req.loaded.set()
 
                     case DrawFrame(frame=frame):
-                        patternManager.unload_pattern()
-                        for i, pixel in enumerate(frame):
-                            if (pixel != None):
-                                tree._pixels[i].set_rgb(pixel[0], pixel[1], pixel[2])
+                        if worker:
+                            worker.send(req)
+                        else:
+                            patternManager.unload_pattern()
+                            for i, pixel in enumerate(frame):
+                                if (pixel != None):
+                                    tree._pixels[i].set_rgb(pixel[0], pixel[1], pixel[2])
+
+                    case SetAttribute():
+                        # the web server has already set the attribute in this process
+                        if worker:
+                            worker.send(req)
 
                     case RandomPattern():
-                        tree._pattern_reset()
-                        patternManager.unload_pattern()
                         a = list(patternManager.patterns.keys())
                         random.shuffle(a)
-                        patternManager.load_pattern(a[0])
+                        if worker:
+                            worker.send(StartPattern(a[0]))
+                        else:
+                            patternManager.switch_pattern(a[0])
                         last_change = time.time()
 
                     case _: 
                         pass
                 req = web_server.get_next_request()
-
-            # 2. call draw()
-            patternManager.draw_current()
-
-            # 3. get pixels from tree instance
-            frame = tree._request_frame()
-            fps = tree._fps
+            timer.lap("requests")
+
+            if worker:
+                # the worker draws and sends the frames, just keep an eye on it
+                worker.poll()
+                timer.end_frame()
+                time.sleep(0.01)
+                continue
+
+            frame = patternManager.clip_frame()
+            if frame is not None:
+                # a recorded clip is playing, there is nothing to draw
+                fps = patternManager.currentPattern.fps
+            else:
+                # 2. call draw()
+                patternManager.draw_current()
+                timer.lap("draw")
+
+                # 3. get pixels from tree instance
+                with patternManager.profile("composite"):
+                    frame = tree._request_frame()
+                fps = tree._fps
+
+            # the pattern being switched away from is drawn and blended in
+            frame = patternManager.transition_frame(frame)
+            timer.lap("composite")
 
             # 4. send to pixel driver | blocks until space
             renderer.add_to_queue(frame, fps)
+            timer.lap("queue")
+            timer.end_frame()
 
     except KeyboardInterrupt:
         print("\nShutting down gracefully...")
         web_server.stop()
+        if worker:
+            worker.stop()
+        renderer.stop()
+        if profiler:
+            profiler.finish()
     except Exception as e:
         print(f"Error in main loop: {e}")
         web_server.stop()
+        if worker:
+            worker.stop()
+        renderer.stop()
+        if profiler:
+            profiler.finish()
         raise
@@ -0,0 +1,277 @@
+"""Show images and videos on the tree by projecting them onto the lights.
+
+   A projection works out once where each light lands on a picture, as a fraction of its width and height.
+   Sampling a picture is then a single NumPy lookup, rather than a Python loop over every pixel, so even
+   a full video frame costs almost nothing to show.
+
+   Use this at the top of your pattern:
+   ```
+   from gridmas import *
+   ```
+"""
+
+import math
+import queue
+import threading
+from typing import Any, Callable, Optional
+import numpy as np
+import numpy.typing as npt
+from tree import tree
+
+
+class UVMap:
+    """Where every light lands on a picture, made by planar_map(), cylindrical_map() or spherical_map()
+
+    u goes across the picture from 0 on the left to 1 on the right, v goes down it from 0 at the top to 1 at the bottom
+    """
+
+    def __init__(self, u: npt.NDArray[np.float64], v: npt.NDArray[np.float64]):
+        """__init__ Create a map from the coordinates of each light on the picture
+
+        Args:
+            u (npt.NDArray[np.float64]): How far across the picture each light is, 0-1
+            v (npt.NDArray[np.float64]): How far down the picture each light is, 0-1
+        """
+        self.u = u
+        self.v = v
+
+        self.inside: npt.NDArray[np.bool_] = (u >= 0) & (u <= 1) & (v >= 0) & (v <= 1)
+        """Which lights land on the picture, the others are given the color of its nearest edge"""
+
+        self._indices: dict[tuple[int, int], tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]] = {}
+
+    def indices(self, height: int, width: int) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+        """indices The row and column each light reads from a picture of a given size
+
+        These are worked out the first time a picture of this size is sampled, and remembered after that
+
+        Args:
+            height (int): The height of the picture in pixels
+            width (int): The width of the picture in pixels
+
+        Returns:
+            tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]: The rows and the columns
+        """
+        key = (height, width)
+        cached = self._indices.get(key)
+        if cached is None:
+            rows = np.clip((self.v * height).astype(np.intp), 0, height - 1)
+            cols = np.clip((self.u * width).astype(np.intp), 0, width - 1)
+            cached = self._indices[key] = (rows, cols)
+        return cached
+
+    def sample(self, image: npt.NDArray[Any], dx: int = 0, dy: int = 0, window: Optional[tuple[int, int]] = None) -> npt.NDArray[Any]:
+        """sample The color of the picture under every light
+
+        Args:
+            image (npt.NDArray[Any]): The picture, an (height, width) or (height, width, channels) array
+            dx (int, optional): Slide the picture this many pixels left under the lights, lights which end up off the
+                picture read 0. Defaults to 0.
+            dy (int, optional): Slide the picture this many pixels up. Defaults to 0.
+            window (Optional[tuple[int, int]], optional): The height and width of the part of the picture the map covers,
+                for pictures bigger than the tree which are moved around with dx and dy. Defaults to the whole picture.
+
+        Returns:
+            npt.NDArray[Any]: The value, or row of channels, for every light
+        """
+        height, width = image.shape[:2]
+        rows, cols = self.indices(*(window or (height, width)))
+        if dx == 0 and dy == 0 and window is None:
+            return image[rows, cols]
+
+        rows = rows + dy
+        cols = cols + dx
+        on = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        values = np.zeros((len(rows), *image.shape[2:]), dtype=image.dtype)
+        values[on] = image[rows[on], cols[on]]
+        return values
+
+    def show(self, image: npt.NDArray[Any], bgr: bool = False, dx: int = 0, dy: int = 0, window: Optional[tuple[int, int]] = None):
+        """show Set every light to the color of the picture under it
+
+        Args:
+            image (npt.NDArray[Any]): The picture, grey levels as an (height, width) array or colors as an (height, width, 3) array
+            bgr (bool, optional): Whether the colors are blue, green, red, as OpenCV gives them. Defaults to False.
+            dx (int, optional): Slide the picture this many pixels left, see sample(). Defaults to 0.
+            dy (int, optional): Slide the picture this many pixels up. Defaults to 0.
+            window (Optional[tuple[int, int]], optional): The size of the part of the picture the map covers, see sample(). Defaults to the whole picture.
+
+        Example:
+            ```
+            picture = cylindrical_map()
+
+            def draw():
+                picture.show(image)
+            ```
+        """
+        values = self.sample(image, dx, dy, window)
+        if values.ndim == 1:
+            rgb = np.repeat(values[:, np.newaxis], 3, axis=1)
+        elif bgr:
+            rgb = values[:, 2::-1]
+        else:
+            rgb = values[:, :3]
+        tree._buffer.set_colors(np.clip(rgb, 0, 255).astype(np.uint8))
+
+
+def _z_range(z_range: Optional[tuple[float, float]]) -> tuple[float, float]:
+    return z_range if z_range is not None else (0.0, tree._height)
+
+
+def planar_map(x_range: tuple[float, float] = (-1, 1), z_range: Optional[tuple[float, float]] = None, axis: str = "x") -> UVMap:
+    """planar_map Project a picture straight through the tree, like a slide projector
+
+    Args:
+        x_range (tuple[float, float], optional): The positions on the axis of the left and right edges of the picture,
+            swap them to flip the picture. Defaults to (-1, 1).
+        z_range (Optional[tuple[float, float]], optional): The heights of the bottom and top edges of the picture. Defaults to the whole tree.
+        axis (str, optional): "x" or "y", the axis which runs across the picture. Defaults to "x".
+
+    Returns:
+        UVMap: The map
+
+    Example:
+        ```
+        picture = planar_map((1, -1), (0, 2))
+        ```
+    """
+    if axis not in ("x", "y"):
+        raise ValueError(f"A planar map runs along x or y, not {axis}")
+
+    across = tree._xyz[:, 0 if axis == "x" else 1]
+    z = tree._xyz[:, 2]
+    bottom, top = _z_range(z_range)
+
+    u = (across - x_range[0]) / (x_range[1] - x_range[0])
+    v = (top - z) / (top - bottom)
+    return UVMap(u, v)
+
+
+def cylindrical_map(z_range: Optional[tuple[float, float]] = None, turn: float = 0) -> UVMap:
+    """cylindrical_map Wrap a picture round the tree, like a label round a tin
+
+    Args:
+        z_range (Optional[tuple[float, float]], optional): The heights of the bottom and top edges of the picture. Defaults to the whole tree.
+        turn (float, optional): Where the join is, in radians round the trunk from the x axis. Defaults to 0.
+
+    Returns:
+        UVMap: The map
+    """
+    bottom, top = _z_range(z_range)
+
+    u = ((tree._a - turn) / (2 * math.pi)) % 1
+    v = (top - tree._xyz[:, 2]) / (top - bottom)
+    return UVMap(u, v)
+
+
+def spherical_map(center: Optional[tuple[float, float, float]] = None, turn: float = 0) -> UVMap:
+    """spherical_map Wrap a picture round a ball in the tree, like a map of the world round a globe
+
+    The picture is stretched the way a map of the world is, its top edge is the top of the ball
+
+    Args:
+        center (Optional[tuple[float, float, float]], optional): The middle of the ball. Defaults to halfway up the trunk.
+        turn (float, optional): Where the join is, in radians round the trunk from the x axis. Defaults to 0.
+
+    Returns:
+        UVMap: The map
+    """
+    if center is None:
+        center = (0.0, 0.0, tree._height / 2)
+
+    offset = tree._xyz - np.asarray(center, dtype=np.float64)
+    r = np.linalg.norm(offset, axis=1)
+
+    u = ((np.arctan2(offset[:, 1], offset[:, 0]) - turn) / (2 * math.pi)) % 1
+    v = np.arccos(np.divide(offset[:, 2], r, out=np.ones_like(r), where=r > 0)) / math.pi
+    return UVMap(u, v)
+
+
+class VideoSource:
+    """Decodes a video on its own thread, keeping a few frames ready so draw() never waits for one
+
+    Needs OpenCV (`pip install opencv-python`)
+
+    Example:
+        ```
+        picture = planar_map()
+        video = VideoSource("patterns/video.mp4", transform=picture.sample)
+
+        def draw():
+            set_fps(video.fps)
+            while not video.finished:
+                colors = video.read()
+                if colors is not None:
+                    ...
+                yield
+        ```
+    """
+
+    def __init__(self, path: str, prefetch: int = 8, loop: bool = False, transform: Optional[Callable[[npt.NDArray[np.uint8]], Any]] = None):
+        """__init__ Open the video and start decoding it
+
+        Args:
+            path (str): The location of the video
+            prefetch (int, optional): How many frames to keep ready. Defaults to 8.
+            loop (bool, optional): Whether to start again from the beginning at the end. Defaults to False.
+            transform (Optional[Callable[[npt.NDArray[np.uint8]], Any]], optional): Called on each frame on the decoding thread,
+                e.g. UVMap.sample, so only what the tree needs is kept. Defaults to None.
+        """
+        import cv2
+
+        self._capture = cv2.VideoCapture(path)
+        if not self._capture.isOpened():
+            raise FileNotFoundError(f"Couldn't open the video {path}")
+
+        self.fps: int = round(self._capture.get(cv2.CAP_PROP_FPS)) or 30
+        """The frame rate of the video"""
+
+        self.loop = loop
+        self.transform = transform
+        self._frames: queue.Queue = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._decode, daemon=True)
+        self._thread.start()
+
+    def _decode(self):
+        import cv2
+
+        while not self._stop.is_set():
+            ok, frame = self._capture.read()
+            if not ok:
+                if self.loop and self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0):
+                    continue
+                break
+
+            item = self.transform(frame) if self.transform else frame
+            while not self._stop.is_set():
+                try:
+                    self._frames.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+        self._capture.release()
+        self._done.set()
+
+    @property
+    def finished(self) -> bool:
+        """Whether every frame of the video has been read"""
+        return self._done.is_set() and self._frames.empty()
+
+    def read(self) -> Optional[Any]:
+        """read The next frame, without waiting for it
+
+        Returns:
+            Optional[Any]: The frame, after the transform if there is one, or None if the next frame isn't ready yet
+        """
+        try:
+            return self._frames.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """close Stop decoding"""
+        self._stop.set()
+        self._thread.join(1)
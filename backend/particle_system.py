@@ -8,10 +8,11 @@ The particle system will then advance each particle, and then draw them to the t
 
 from abc import ABC, abstractmethod
 
-from typing import Optional
+from typing import Optional, Union
+import numpy as np
+import numpy.typing as npt
 from colors import Color, Pixel
-from util import dist
-from tree import Tree
+from tree import Tree, pixels, tree
 
 
 class Particle(ABC):
@@ -50,19 +51,15 @@ class CubeParticle(Particle):
         self.color = color
 
     def draw(self, tree: Tree):
-        for pixel in pixels():
-            # Check if the pixel is within the outer bounding box
-            if self.z - self.length < pixel.z < self.z + self.length and \
-               self.x - self.length < pixel.x < self.x + self.length and \
-               self.y - self.length < pixel.y < self.y + self.length:
-
-                pixel.set(self.color)
+        ids = tree._grid.query_box((self.x - self.length, self.y - self.length, self.z - self.length),
+                                   (self.x + self.length, self.y + self.length, self.z + self.length))
+        tree._buffer.fill(*self.color.to_tuple(), ids=ids)
 
     @abstractmethod
     def advance(self):
         ...
 
-    def fast_Draw(self, pixel: Pixel) -> Optional[Color]:
+    def fast_draw(self, pixel: Pixel) -> Optional[Color]:
         # Check if the pixel is within the outer bounding box
         if self.z - self.length < pixel.z < self.z + self.length and \
            self.x - self.length < pixel.x < self.x + self.length and \
@@ -95,42 +92,20 @@ class SphereParticle(Particle):
         self.color = color
 
     def draw(self, tree: Tree):
-        inner_radius = 0.866  # sqrt(3) / 2, side length of box inscribed by sphere
-        for pixel in pixels():
-            # Check if the pixel is within the outer bounding box
-            if self.z - self.radius < pixel.z < self.z + self.radius and \
-               self.x - self.radius < pixel.x < self.x + self.radius and \
-               self.y - self.radius < pixel.y < self.y + self.radius:
-
-                # Check if the pixel is within the inner bounding box
-                if self.z - inner_radius < pixel.z < self.z + inner_radius and \
-                   self.x - inner_radius < pixel.x < self.x + inner_radius and \
-                   self.y - inner_radius < pixel.y < self.y + inner_radius:
-                    pixel.set(self.color)
-                else:
-                    # Perform the distance check if not within the inner bounding box
-                    if dist([pixel.x, pixel.y, pixel.z], [self.x, self.y, self.z]) < self.radius:
-                        pixel.set(self.color)
+        ids, _ = tree._grid.within((self.x, self.y, self.z), self.radius)
+        tree._buffer.fill(*self.color.to_tuple(), ids=ids)
 
     @abstractmethod
     def advance(self):
         ...
 
     def fast_draw(self, pixel: Pixel) -> Optional[Color]:
-        inner_radius = 0.866  # sqrt(3) / 2, side length of box inscribed by sphere
-        if self.z - self.radius < pixel.z < self.z + self.radius and \
-           self.x - self.radius < pixel.x < self.x + self.radius and \
-           self.y - self.radius < pixel.y < self.y + self.radius:
-
-            # Check if the pixel is within the inner bounding box
-            if self.z - inner_radius < pixel.z < self.z + inner_radius and \
-               self.x - inner_radius < pixel.x < self.x + inner_radius and \
-               self.y - inner_radius < pixel.y < self.y + inner_radius:
-                return self.color
-            else:
-                # Perform the distance check if not within the inner bounding box
-                if dist([pixel.x, pixel.y, pixel.z], [self.x, self.y, self.z]) < self.radius:
-                    return self.color
+        dx = pixel.x - self.x
+        dy = pixel.y - self.y
+        dz = pixel.z - self.z
+        if dx * dx + dy * dy + dz * dz < self.radius * self.radius:
+            return self.color
+        return None
 
 
 class ParticleSystem:
@@ -175,13 +150,189 @@ class ParticleSystem:
         """Better for performance if there are lots of overlapping particles. However, it could
            lead to unpredictable overlap coloring
         """
-        skip_amount = 0
-        for pixel in self.pixels():
-            for i, particle in enumerate(self._particles):
+        for pixel in pixels():
+            for particle in self._particles:
                 a = particle.fast_draw(pixel)
                 if a is not None:
                     pixel.set(a)
-                    skip_amount += len(self._particles) - i
                     break
-        # if len(self._particles) != 0:
-            # print(skip_amount / (len(self.pixels()) * len(self._particles)))
+
+
+class Particles:
+    """A particle engine which keeps every particle in NumPy arrays and moves them all in one step
+
+    Use this rather than ParticleSystem when there are a lot of particles. Each particle is a sphere with a position,
+    velocity, acceleration, age, radius and color, and the arrays can be changed directly for custom behaviour.
+    Particles which are added later are drawn on top of earlier ones
+
+    Example:
+        ```
+        snow = Particles()
+
+        def draw():
+            fade()
+            snow.emit(pos=(random.random() - 0.5, random.random() - 0.5, height()), vel=(0, 0, -0.05), color=Color.white())
+            snow.kill(snow.pos[:, 2] < -0.2)
+            snow.draw()
+            snow.advance()
+        ```
+    """
+
+    def __init__(self, capacity: int = 256, fields: tuple[str, ...] = ()):
+        """__init__ Create an empty particle engine
+
+        Args:
+            capacity (int, optional): How many particles there is room for to begin with, this grows when needed. Defaults to 256.
+            fields (tuple[str, ...], optional): The names of extra numbers to keep for each particle, read and write them with engine[name]. Defaults to ().
+        """
+        self.count = 0
+        """How many particles are alive"""
+
+        self._pos = np.zeros((capacity, 3), dtype=np.float64)
+        self._vel = np.zeros((capacity, 3), dtype=np.float64)
+        self._acc = np.zeros((capacity, 3), dtype=np.float64)
+        self._age = np.zeros(capacity, dtype=np.int64)
+        self._max_age = np.zeros(capacity, dtype=np.int64)
+        self._radius = np.zeros(capacity, dtype=np.float64)
+        self._color = np.zeros((capacity, 3), dtype=np.uint8)
+        self._fields: dict[str, npt.NDArray[np.float64]] = {name: np.zeros(capacity, dtype=np.float64) for name in fields}
+
+    def _arrays(self) -> list[npt.NDArray]:
+        return [self._pos, self._vel, self._acc, self._age, self._max_age, self._radius, self._color, *self._fields.values()]
+
+    @property
+    def pos(self) -> npt.NDArray[np.float64]:
+        """The (n, 3) position of every particle"""
+        return self._pos[:self.count]
+
+    @property
+    def vel(self) -> npt.NDArray[np.float64]:
+        """The (n, 3) velocity of every particle, added to the position every step"""
+        return self._vel[:self.count]
+
+    @property
+    def acc(self) -> npt.NDArray[np.float64]:
+        """The (n, 3) acceleration of every particle, added to the velocity every step"""
+        return self._acc[:self.count]
+
+    @property
+    def age(self) -> npt.NDArray[np.int64]:
+        """How many steps every particle has been alive for"""
+        return self._age[:self.count]
+
+    @property
+    def radius(self) -> npt.NDArray[np.float64]:
+        """The radius of every particle"""
+        return self._radius[:self.count]
+
+    @property
+    def color(self) -> npt.NDArray[np.uint8]:
+        """The (n, 3) R, G, B color of every particle"""
+        return self._color[:self.count]
+
+    def __getitem__(self, name: str) -> npt.NDArray[np.float64]:
+        return self._fields[name][:self.count]
+
+    def __setitem__(self, name: str, values: npt.ArrayLike):
+        self._fields[name][:self.count] = values
+
+    def __len__(self) -> int:
+        return self.count
+
+    def emit(self, n: int = 1, pos: npt.ArrayLike = (0, 0, 0), vel: npt.ArrayLike = (0, 0, 0), acc: npt.ArrayLike = (0, 0, 0),
+             radius: npt.ArrayLike = 0.15, color: Union[Color, npt.ArrayLike] = (255, 255, 255), max_age: npt.ArrayLike = 0, **fields: npt.ArrayLike):
+        """emit Add new particles
+
+        Every value can be the same for all of the new particles, or an array with one value (or row) per particle
+
+        Args:
+            n (int, optional): How many particles to add. Defaults to 1.
+            pos (npt.ArrayLike, optional): Where they start. Defaults to (0, 0, 0).
+            vel (npt.ArrayLike, optional): Their starting velocity. Defaults to (0, 0, 0).
+            acc (npt.ArrayLike, optional): Their acceleration. Defaults to (0, 0, 0).
+            radius (npt.ArrayLike, optional): Their radius. Defaults to 0.15.
+            color (Union[Color, npt.ArrayLike], optional): Their color, a Color or R, G, B values. Defaults to (255, 255, 255).
+            max_age (npt.ArrayLike, optional): How many steps they live for, 0 lives until killed. Defaults to 0.
+            **fields (npt.ArrayLike): Starting values for the extra fields, the others start at 0
+        """
+        if n <= 0:
+            return
+
+        needed = self.count + n
+        if needed > len(self._pos):
+            self._grow(needed)
+
+        new = slice(self.count, needed)
+        self._pos[new] = pos
+        self._vel[new] = vel
+        self._acc[new] = acc
+        self._age[new] = 0
+        self._max_age[new] = max_age
+        self._radius[new] = radius
+        self._color[new] = color.to_tuple() if isinstance(color, Color) else color
+        for name, values in self._fields.items():
+            values[new] = fields.pop(name, 0)
+        if fields:
+            raise KeyError(f"Unknown particle fields {', '.join(fields)}")
+
+        self.count = needed
+
+    def _grow(self, needed: int):
+        capacity = max(needed, len(self._pos) * 2)
+        for name, array in vars(self).items():
+            if isinstance(array, np.ndarray):
+                grown = np.zeros((capacity, *array.shape[1:]), dtype=array.dtype)
+                grown[:self.count] = array[:self.count]
+                setattr(self, name, grown)
+        for name, array in self._fields.items():
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            self._fields[name] = grown
+
+    def kill(self, dead: npt.NDArray[np.bool_]):
+        """kill Remove particles
+
+        The particles which are left are moved down to fill the gaps, keeping their order
+
+        Args:
+            dead (npt.NDArray[np.bool_]): Which particles to remove, one value per particle
+
+        Example:
+            ```
+            particles.kill(particles.pos[:, 2] > height())
+            ```
+        """
+        keep = np.flatnonzero(~np.asarray(dead, dtype=np.bool_))
+        if len(keep) == self.count:
+            return
+        for array in self._arrays():
+            array[:len(keep)] = array[keep]
+        self.count = len(keep)
+
+    def advance(self):
+        """advance Move every particle by its velocity, speed it up by its acceleration and age it by a step
+
+        Particles older than their max_age are removed
+        """
+        n = self.count
+        self._pos[:n] += self._vel[:n]
+        self._vel[:n] += self._acc[:n]
+        self._age[:n] += 1
+
+        max_age = self._max_age[:n]
+        self.kill((max_age > 0) & (self._age[:n] >= max_age))
+
+    def draw(self):
+        """draw Set the lights inside each particle to its color
+
+        The lights are set the same as pixel.set_rgb() sets them, where particles overlap the newest one wins
+        """
+        owners, lights = tree._grid.pairs_within(self.pos, self.radius)
+        if len(lights) == 0:
+            return
+
+        # newer particles have higher indices, so each light takes the color of the newest particle over it
+        winner = np.full(tree._num_pixels, -1, dtype=np.intp)
+        np.maximum.at(winner, lights, owners)
+        hit = np.flatnonzero(winner >= 0)
+        tree._buffer.set_colors(self.color[winner[hit]], ids=hit)
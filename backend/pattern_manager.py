@@ -2,14 +2,21 @@
     A collection of the pattern manager class and its helper functions
 """
 
+import contextlib
 from types import GeneratorType, ModuleType
 import os
-from typing import Generator
+from typing import ContextManager, Generator, Optional
+import numpy as np
+import numpy.typing as npt
 import attribute
+from clip import CLIP_EXTENSION, Clip
+from profiler import SamplingProfiler
+from transition import TRANSITION_STYLES, Transition, TransitionStyle
 from util import tcolors
 import math
 import importlib
-from tree import tree
+import time
+from tree import TreeState, tree
 
 
 def print_tabulated(item1: str, item2: str, item3: str, max_length: int):
@@ -67,21 +74,41 @@ class PatternManager:
         This module is intended for internal use only. You do not need to use any of this in your pattern code
     """
     
-    def __init__(self, pattern_dir: str):
+    def __init__(self, pattern_dir: str, profiler: Optional[SamplingProfiler] = None, transition_frames: int = 0, transition_style: TransitionStyle = "fade"):
         """__init__ Initialise the pattern manager
 
         Create a new instance of the pattern manager and load the `on` pattern
 
         Args:
             pattern_dir (str): The directory to search for pattern files. The search is carried out automatically
+            profiler (Optional[SamplingProfiler], optional): Samples the patterns while they draw, if given. Defaults to None.
+            transition_frames (int, optional): How many frames switch_pattern() crossfades for, 0 for a hard cut. Defaults to 0.
+            transition_style (TransitionStyle, optional): How switch_pattern() blends the patterns, "fade" or "wipe". Defaults to "fade".
         """
-        self.patterns: dict[str, ModuleType] = {}
+        if transition_style not in TRANSITION_STYLES:
+            raise ValueError(f"Unknown transition '{transition_style}', use one of {', '.join(TRANSITION_STYLES)}")
+
+        self.patterns: dict[str, ModuleType | Clip] = {}
         self.load_patterns(pattern_dir)
 
         self.currentPattern = self.patterns["on"]
+        self.currentName: Optional[str] = "on"
+        self.profiler = profiler
 
         self.generator = None
 
+        self.transition_frames = transition_frames
+        self.transition_style: TransitionStyle = transition_style
+
+        self.transition: Optional[Transition] = None
+        """The pattern being faded out, while a transition is running"""
+
+        self._spare_state: Optional[TreeState] = None
+        """The part of the tree the last faded out pattern used, kept for the next transition"""
+
+        self._draw_time = 0.0
+        """How long the current pattern took to draw its last frame, in seconds"""
+
 
     def load_patterns(self, pattern_dir: str):
         """load_patterns Loads the patterns from the pattern_dir
@@ -95,7 +122,7 @@ class PatternManager:
         print(f"{tcolors.OKBLUE}{print_message_centered('Loading Patterns', 60, '#')}{tcolors.ENDC}")
 
         pattern_files = [f for f in os.listdir(pattern_dir) if f.endswith(".py")]
-        patterns: dict[str, ModuleType] = {}
+        patterns: dict[str, ModuleType | Clip] = {}
         for file in pattern_files:
             print("loading pattern from " + file + "        ", end="\r")
             try:
@@ -111,9 +138,25 @@ class PatternManager:
             except Exception as e:
                 print(f"{tcolors.FAIL}skipping {file} | wrong configuration | {e} {tcolors.ENDC}")
 
+        # recorded clips are listed with the patterns, by their file name
+        clip_files = [f for f in os.listdir(pattern_dir) if f.endswith(CLIP_EXTENSION)]
+        for file in clip_files:
+            try:
+                clip = Clip(os.path.join(pattern_dir, file))
+            except (OSError, ValueError) as e:
+                print(f"{tcolors.FAIL}skipping {file} | not a clip | {e} {tcolors.ENDC}")
+                continue
+
+            if clip.check(tree._num_pixels, tree._tree_hash):
+                print_tabulated(clip.name, "clip", f"{clip.seconds:.0f}s", 20)
+                patterns[clip.name] = clip
+
         print(f"{tcolors.OKBLUE}{print_message_centered('Loading Patterns', 60, '#')}{tcolors.ENDC}")
 
         attribute.Store.get_store().reset()
+        # patterns may keep shapes or make layers when they are imported, they belong to the pattern once it is loaded properly
+        tree._kept_shapes = []
+        tree._layers = []
         self.patterns = patterns
 
 
@@ -122,19 +165,116 @@ class PatternManager:
 
         Takes the currently loaded pattern and runs it, if no pattern is loaded then nothing will happen
         """
-        if self.currentPattern != None:
+        if self.currentPattern != None and not isinstance(self.currentPattern, Clip):
+            started = time.perf_counter()
             try:
-                if self.generator:
-                    next(self.generator)
-                else:
-                    res: Generator[None, None, None] | None = self.currentPattern.draw()
-                    if isinstance(res, GeneratorType):
-                        self.generator = res
+                with self.profile("draw"):
+                    if self.generator:
+                        next(self.generator)
+                    else:
+                        res: Generator[None, None, None] | None = self.currentPattern.draw()
+                        if isinstance(res, GeneratorType):
+                            self.generator = res
             except Exception as e:
                 self.generator = None
                 self.currentPattern = None
+                self.currentName = None
+                # the pattern's kept shapes and layers would otherwise carry on being drawn
+                tree._kept_shapes = []
+                tree._layers = []
                 print("There was an error", e)
+            self._draw_time = time.perf_counter() - started
+
+    def switch_pattern(self, name: str):
+        """switch_pattern Change to another pattern, crossfading from the current one if transitions are turned on
+
+        While the transition runs the old pattern keeps drawing with its own part of the tree, see transition_frame()
+
+        Args:
+            name (str): The name of the pattern to change to
+        """
+        outgoing = self.currentPattern
+        if self.transition_frames <= 0 or outgoing is None or name == self.currentName or name not in self.patterns:
+            self._end_transition()
+            tree._pattern_reset()
+            self.load_pattern(name)
+            return
+
+        # a transition which is still running is cut short, the pattern fading in now fades out instead
+        self._end_transition()
+        self.transition = Transition(outgoing, self.generator, tree._save_state(), self.transition_frames, self.transition_style)
+
+        # the new pattern starts from the colors on the tree, just as it would without a transition
+        state = self._spare_state or tree._new_state()
+        self._spare_state = None
+        rgb = tree._buffer.rgb
+        tree._load_state(state)
+        tree._buffer.clear()
+        tree._buffer.rgb[:] = rgb
+        tree._buffer.lerp_previous[:] = rgb
+        tree._shapes = []
+
+        tree._pattern_reset()
+        self.load_pattern(name)
+
+    def transition_frame(self, frame: npt.NDArray[np.uint32]) -> npt.NDArray[np.uint32]:
+        """transition_frame Blend the old pattern into the new pattern's frame, while a transition is running
+
+        The old pattern is drawn again for every frame, unless drawing both patterns would take longer than a
+        frame, then its last frame is held instead
+
+        Args:
+            frame (npt.NDArray[np.uint32]): The current pattern's frame
+
+        Returns:
+            npt.NDArray[np.uint32]: The frame to show
+        """
+        transition = self.transition
+        if transition is None:
+            return frame
+
+        budget = 1 / max(tree._fps, 1)
+        if transition.held is None or self._draw_time + transition.draw_time <= budget:
+            if not transition.draw():
+                self._end_transition()
+                return frame
+
+        frame = transition.mix(frame)
+        if transition.finished:
+            self._end_transition()
+        return frame
+
+    def _end_transition(self):
+        if self.transition is not None:
+            self._spare_state = self.transition.state
+            self.transition = None
+
 
+    def clip_frame(self) -> Optional[npt.NDArray[np.uint32]]:
+        """clip_frame Get the next frame of the current clip
+
+        Clips are already recorded, so when one is playing this frame is sent to the tree instead
+        of drawing the tree
+
+        Returns:
+            Optional[npt.NDArray[np.uint32]]: The next frame of the clip, or None if a pattern is running instead
+        """
+        if isinstance(self.currentPattern, Clip):
+            return self.currentPattern.next_frame()
+        return None
+
+    def profile(self, stage: str) -> ContextManager[None]:
+        """profile Sample the current pattern while it is in a stage, if the manager has a profiler
+
+        Args:
+            stage (str): What the pattern is doing, e.g. "draw"
+
+        Returns:
+            ContextManager[None]: A context to run the stage in
+        """
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.section(self.currentName or "none", stage)
 
     def load_pattern(self, name: str):
         """load_pattern Loads a pattern
@@ -148,6 +288,15 @@ class PatternManager:
             TODO fix so people cant just inject whatever name they want from client side :skull:
         """
         attribute.Store.get_store().reset()
+
+        clip = self.patterns.get(name)
+        if isinstance(clip, Clip):
+            clip.reset()
+            self.currentPattern = clip
+            self.currentName = name
+            self.generator = None
+            return
+
         try:
             module = __import__("patterns." + name)
         except:
@@ -160,6 +309,7 @@ class PatternManager:
         if tempVar is None:
             return    
         self.currentPattern = tempVar
+        self.currentName = name
 
         self.generator = None
         print(attribute.Store.get_store().store)
@@ -171,7 +321,11 @@ class PatternManager:
         """
         
         self.currentPattern = None
+        self.currentName = None
         self.generator = None
+        self._end_transition()
+        tree._kept_shapes = []
+        tree._layers = []
 
     def get(self, name: str):
         """get Gets a pattern
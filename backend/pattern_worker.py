@@ -0,0 +1,209 @@
+"""Runs the active pattern in its own process, so a slow draw() doesn't hold up the web server and the main loop.
+
+   The worker has its own tree and pattern manager and writes each frame straight into the FrameRing
+   that the pixel driver reads, the main process only passes on web requests and keeps a copy of the
+   pattern's attributes for the web interface.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+import multiprocessing
+import queue
+import signal
+import threading
+from typing import Optional, Union
+from attribute import ColorAttr, RangeAttr, Store
+from frame_ring import FrameRing
+from pattern_manager import PatternManager
+from profiler import SamplingProfiler
+from render_stats import LOOP_STAGES, TimingRing
+from transition import TransitionStyle
+from tree import tree
+from util import tcolors
+from web_server import DrawFrame, Request, SetAttribute, StartPattern, StopPattern
+
+
+class PatternAttributes:
+    """Sent back by the worker when a pattern is loaded, with the attributes the pattern made"""
+
+    def __init__(self, attributes: list[Union[ColorAttr, RangeAttr]]):
+        self.attributes = attributes
+
+
+class PatternWorker:
+    """The main process's handle on the pattern worker
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, tree_file: str, pattern_dir: str, ring: FrameRing, profile: Optional[str] = None, profile_interval: float = 0.002,
+                 transition_frames: int = 0, transition_style: TransitionStyle = "fade"):
+        """__init__ Start the worker
+
+        Args:
+            tree_file (str): The location of the tree.csv file
+            pattern_dir (str): The directory where pattern files are stored
+            ring (FrameRing): Where the worker writes frames for the pixel driver
+            profile (Optional[str], optional): Where the worker saves a profile of the patterns when it stops, or None to not profile them. Defaults to None.
+            profile_interval (float, optional): Seconds of CPU time between profile samples. Defaults to 0.002.
+            transition_frames (int, optional): How many frames to crossfade between patterns for, 0 for a hard cut. Defaults to 0.
+            transition_style (TransitionStyle, optional): How patterns are blended during a transition. Defaults to "fade".
+        """
+        self.tree_file = tree_file
+        self.pattern_dir = pattern_dir
+        self.ring = ring
+        self.profile = profile
+        self.profile_interval = profile_interval
+        self.transition_frames = transition_frames
+        self.transition_style = transition_style
+        self.process: Optional[multiprocessing.Process] = None
+        self.pattern: Optional[str] = None
+        """The pattern that should be running, so it can be started again if the worker dies"""
+
+        self.loading: list[threading.Event] = []
+        """The StartPattern requests the worker hasn't loaded yet, in the order they were sent"""
+
+        self.render_times = TimingRing(LOOP_STAGES, shared=True)
+        """How long each stage of the worker's loop took for the recent frames"""
+
+        self.start()
+
+    def start(self):
+        """start Start the worker process"""
+        self.commands: multiprocessing.Queue = multiprocessing.Queue()
+        self.replies: multiprocessing.Queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=_run_worker,
+            args=(self.tree_file, self.pattern_dir, self.ring, self.render_times, self.commands, self.replies,
+                  self.profile, self.profile_interval, self.transition_frames, self.transition_style),
+            daemon=True,
+        )
+        self.process.start()
+
+        # the old worker won't answer the requests it had, so don't keep the web server waiting for them
+        for loaded in self.loading:
+            loaded.set()
+        self.loading.clear()
+
+        if self.pattern is not None:
+            self.send(StartPattern(self.pattern))
+
+    def send(self, request: Request):
+        """send Pass a request from the web server on to the worker
+
+        Args:
+            request (Request): A StartPattern, StopPattern, DrawFrame or SetAttribute request
+        """
+        match request:
+            case StartPattern(name=name):
+                self.pattern = name
+                self.loading.append(request.loaded)
+            case StopPattern() | DrawFrame():
+                self.pattern = None
+        self.commands.put(request)
+
+    def poll(self):
+        """poll Handle replies from the worker, and restart it if it has died"""
+        while True:
+            try:
+                reply = self.replies.get_nowait()
+            except queue.Empty:
+                break
+
+            match reply:
+                case PatternAttributes(attributes=attributes):
+                    # the web interface reads and sets the attributes through the main process's store
+                    Store.get_store().store = attributes
+                    if self.loading:
+                        self.loading.pop(0).set()
+
+        if self.process is not None and not self.process.is_alive():
+            print(f"{tcolors.FAIL}Pattern worker stopped with code {self.process.exitcode}, restarting it{tcolors.ENDC}")
+            self.start()
+
+    def stop(self):
+        """stop Stop the worker process"""
+        if self.process is None:
+            return
+
+        self.commands.put(None)
+        # the worker may still be saving its profile
+        self.process.join(5 if self.profile else 1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+        self.process = None
+        self.render_times.close(unlink=True)
+
+
+def _run_worker(tree_file: str, pattern_dir: str, ring: FrameRing, render_times: TimingRing, commands: multiprocessing.Queue, replies: multiprocessing.Queue,
+                profile: Optional[str] = None, profile_interval: float = 0.002, transition_frames: int = 0, transition_style: TransitionStyle = "fade"):
+    # the main process handles ctrl+c and stops the worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    tree.init(tree_file)
+    tree._render_times = render_times
+
+    # the timer signal only reaches this process, so the worker profiles its own patterns
+    profiler = None
+    if profile:
+        profiler = SamplingProfiler(profile, profile_interval)
+        profiler.start(pattern_dir)
+    manager = PatternManager(pattern_dir, profiler, transition_frames, transition_style)
+
+    while True:
+        render_times.start()
+        while True:
+            try:
+                command = commands.get_nowait()
+            except queue.Empty:
+                break
+
+            match command:
+                case None:
+                    if profiler:
+                        profiler.finish()
+                    ring.close()
+                    return
+
+                case StopPattern():
+                    manager.unload_pattern()
+
+                case StartPattern(name=name):
+                    manager.switch_pattern(name)
+                    replies.put(PatternAttributes(Store.get_store().get_all()))
+
+                case DrawFrame(frame=frame):
+                    manager.unload_pattern()
+                    for i, pixel in enumerate(frame):
+                        if (pixel != None):
+                            tree._pixels[i].set_rgb(pixel[0], pixel[1], pixel[2])
+
+                case SetAttribute(name=name, value=value):
+                    try:
+                        Store.get_store().get(name).set(value)
+                    except IndexError:
+                        pass
+
+                case _:
+                    pass
+
+        render_times.lap("requests")
+
+        frame = manager.clip_frame()
+        if frame is not None:
+            fps = manager.currentPattern.fps
+        else:
+            manager.draw_current()
+            render_times.lap("draw")
+            with manager.profile("composite"):
+                frame = tree._request_frame()
+            fps = tree._fps
+        frame = manager.transition_frame(frame)
+        render_times.lap("composite")
+
+        ring.put(frame, fps)
+        render_times.lap("queue")
+        render_times.end_frame()
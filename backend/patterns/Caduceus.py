@@ -1,37 +1,29 @@
 from gridmas import *
+import numpy as np
 import random
-import math
 
 name = "Caduceus"
 author = "Ciaran"
 
 radius = 0.15
 
-
-class Particle:
-    def __init__(self):
-        self.z = -radius
-        self.angle = random.random() * 2 * math.pi
-        self.dist = random.randint(2, 7) / 10
-        self.pitch = random.randint(15, 25) / 100
-        self.speed = random.randint(3, 10) / 100
-        self.col = Color.random()
-
-particles = []
+# each particle spirals up the tree, at its own distance from the trunk
+particles = Particles(fields=("angle", "dist", "pitch"))
 
 def draw():
-    global particles
-    particles = list(filter(lambda x: x.z < height(), particles))
+    particles.kill(particles.pos[:, 2] >= height())
+
+    particles.advance()
+    particles["angle"] += particles["pitch"]
+    particles.pos[:, 0] = particles["dist"] * np.sin(particles["angle"])
+    particles.pos[:, 1] = particles["dist"] * np.cos(particles["angle"])
+    particles.draw()
 
-    for p in particles:
-        p.z += p.speed
-        p.angle += p.pitch
-        p.x = p.dist * math.sin(p.angle)
-        p.y = p.dist * math.cos(p.angle)
-        Sphere([p.x, p.y, p.z], radius, p.col)
-        
     lerp(Color.black(), 10)
 
     if frame() % 20 == 0:
-        particles.append(Particle())
-
+        angle = random.random() * 2 * np.pi
+        dist = random.randint(2, 7) / 10
+        pitch = random.randint(15, 25) / 100
+        speed = random.randint(3, 10) / 100
+        particles.emit(pos=(0, 0, -radius), vel=(0, 0, speed), radius=radius, color=Color.random(), angle=angle, dist=dist, pitch=pitch)
@@ -1,4 +1,5 @@
 from gridmas import *
+import numpy as np
 
 name = "Center Finder"
 author = "Ciaran"
@@ -8,8 +9,8 @@ portion = RangeAttr("position", 0, -1, 1, 0.01)
 def draw():
     global portion
 
-    for pixel in pixels():
-        if pixel.y > portion.get():
-            pixel.set_rgb(200, 0, 0)
-        else:
-            pixel.set_rgb(0, 0, 200)
+    def halves(y):
+        above = y > portion.get()
+        return np.where(above, 200, 0), 0, np.where(above, 0, 200)
+
+    shade(halves)
@@ -39,9 +39,9 @@ def draw():
             elif a > 0.765:
                 pixel.fade(0.5)
 
-            for exp in explosions:
-                if exp.tick / 6 < dist([exp.x, exp.y, exp.z], [pixel.x, pixel.y, pixel.z]) < exp.tick / 5:
-                    pixel.set_color(exp.color)
+        for exp in explosions:
+            for pixel in pixels_in_shell((exp.x, exp.y, exp.z), exp.tick / 6, exp.tick / 5):
+                pixel.set_color(exp.color)
 
         yield
         explosions = list(filter(lambda x: x.tick <= x.max_age, explosions))
@@ -16,7 +16,7 @@ class Ball:
         self.xVel = (random.random() - 0.5) * 0.3
         self.yVel = (random.random() - 0.5) * 0.3
         self.zVel = (1 - random.random()) * 0.03
-
+        self.shape = Sphere((self.x, self.y, self.z), 0.2, self.c).keep()
 
 
 
@@ -28,11 +28,11 @@ def draw():
     while True:
         balls.append(Ball())
         if len(balls) > 5:
-            balls.pop(0)
+            balls.pop(0).shape.remove()
         for _ in range(random.randrange(50, 100)):
             lerp(Color(0, 0, 0), 5)
             for ball in balls:
-                Sphere((ball.x, ball.y, ball.z), 0.2, ball.c)
+                ball.shape.move_to((ball.x, ball.y, ball.z))
 
                 ball.zVel -= 0.03
                 ball.z += ball.zVel
@@ -0,0 +1,24 @@
+import math
+from gridmas import *
+
+name = "Light Mixing"
+author = "Ciaran"
+
+speed = RangeAttr("speed", 0.03, 0.01, 0.1, 0.01)
+softness = RangeAttr("softness", 0.3, 0, 1, 0.05)
+
+# a red, a green and a blue ball, each on its own layer so they add up to white where they overlap
+colors = [Color(255, 0, 0), Color(0, 255, 0), Color(0, 0, 255)]
+balls = [SDFSphere((0, 0, 0), 0.45) for _ in colors]
+layers = [Layer("add") for _ in colors]
+
+def draw():
+    t = frame() * speed.get()
+    middle = height() / 2
+
+    for i, (ball, layer, color) in enumerate(zip(balls, layers, colors)):
+        angle = t + i * 2 * math.pi / 3
+        ball.center[:] = (0.3 * math.cos(angle), 0.3 * math.sin(angle), middle + 0.4 * math.sin(t * 1.3 + i))
+        layer.fill(color, alpha=ball.coverage(softness.get()))
+
+    background(Color.black())
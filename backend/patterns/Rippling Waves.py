@@ -1,4 +1,5 @@
 from gridmas import *
+import numpy as np
 
 name = "Rippling Waves"
 author = "Claude 3.5"
@@ -13,31 +14,25 @@ def draw():
 
     time = 0
     while True:
-        for i, pixel in enumerate(pixels()):
+        def waves(z, d):
             # Calculate the wave based on height (z-coordinate) and time
-            wave = math.sin(wave_frequency.get() * (pixel.z / height() * 2 * math.pi + time))
+            wave = np.sin(wave_frequency.get() * (z / height() * 2 * math.pi + time))
 
             # Map the wave to a value between 0 and 1
             wave_mapped = (wave + 1) / 2
 
             # Interpolate between primary and secondary colors
-            r = int(primary_color.get().r * wave_mapped + secondary_color.get().r * (1 - wave_mapped))
-            g = int(primary_color.get().g * wave_mapped + secondary_color.get().g * (1 - wave_mapped))
-            b = int(primary_color.get().b * wave_mapped + secondary_color.get().b * (1 - wave_mapped))
+            r, g, b = mix_colors(secondary_color.get(), primary_color.get(), wave_mapped)
 
             # Add a radial component based on distance from the center
-            distance = math.sqrt(pixel.x**2 + pixel.y**2)
-            radial_factor = (math.sin(distance * wave_frequency.get() * 2 + time) + 1) / 2
+            radial_factor = (np.sin(d * wave_frequency.get() * 2 + time) + 1) / 2
 
             # Combine the vertical wave with the radial component
             combined_factor = (wave_mapped + radial_factor) / 2
 
-            # Set the final color
-            pixel.set_rgb(
-                int(r * combined_factor),
-                int(g * combined_factor),
-                int(b * combined_factor)
-            )
+            return r * combined_factor, g * combined_factor, b * combined_factor
+
+        shade(waves)
 
         yield
         time += wave_speed.get()
@@ -7,28 +7,19 @@ name = "Snowing"
 author = "Ciaran"
 
 
-class SnowFlake:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.z = height() + 0.2
-        self.yVel = 0.05
-
-
 def draw():
-    flakes = []
+    flakes = Particles()
 
     while True:
         for _ in range(random.randint(5, 30)):
 
-            flakes = list(filter(lambda x: x.z > -0.2, flakes))
+            flakes.kill(flakes.pos[:, 2] <= -0.2)
             fade()
 
-            for flake in flakes:
-                Sphere((flake.x, flake.y, flake.z), 0.2, Color(200, 200, 240))
-                flake.z -= flake.yVel
-                flake.yVel += 0.002
+            flakes.draw()
+            flakes.advance()
 
             yield
 
-        flakes.append(SnowFlake(random.random() - 0.5, random.random() - 0.5))
+        flakes.emit(pos=(random.random() - 0.5, random.random() - 0.5, height() + 0.2), vel=(0, 0, -0.05), acc=(0, 0, -0.002),
+                    radius=0.2, color=Color(200, 200, 240))
@@ -0,0 +1,34 @@
+import math
+from gridmas import *
+
+name = "Soft Shapes"
+author = "Ciaran"
+
+softness = RangeAttr("softness", 0.3, 0, 1, 0.05)
+speed = RangeAttr("speed", 0.03, 0.01, 0.1, 0.01)
+
+helix = SDFHelix(0.5, 1.2, 0.08, strands=2)
+ring = SDFTorus((0, 0, 0), 0.5, 0.08)
+blob_a = SDFSphere((0, 0, 0), 0.25)
+blob_b = SDFSphere((0, 0, 0), 0.25)
+blobs = blob_a.smooth_union(blob_b, 0.3)
+
+def draw():
+    t = frame() * speed.get()
+    soft = softness.get()
+
+    fill(Color.black())
+
+    helix.turn = t
+    helix.draw(Color(0, 40, 80), soft)
+
+    # a ring slides up the tree, shrinking to fit it
+    ring.center[2] = (t * 0.5) % 1 * height()
+    ring.radius = 0.6 * (1 - ring.center[2] / height()) + 0.05
+    ring.draw(Color(255, 180, 0), soft)
+
+    # two blobs orbit each other and melt together as they pass
+    middle = height() / 2
+    blob_a.center[:] = (0.35 * math.cos(t), 0.35 * math.sin(t), middle + 0.3 * math.sin(t * 2))
+    blob_b.center[:] = (0.35 * math.cos(t + math.pi), 0.35 * math.sin(t + math.pi), middle - 0.3 * math.sin(t * 2))
+    blobs.draw(Color(200, 0, 60), soft)
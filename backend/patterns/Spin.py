@@ -1,5 +1,6 @@
 import math
 from gridmas import *
+import numpy as np
 
 name = "Spin"
 author = "Ciaran"
@@ -21,12 +22,12 @@ c = -height() / 2
 def draw():
     global angle
 
-    for pixel in pixels():
+    def plane(x, z):
         # figure out if the pixel is above or below the plane
-        if (math.tan(angle) * pixel.x <= pixel.z + c) ^ (angle > 0.5 * math.pi) ^ (angle >= 1.5 * math.pi):
-            pixel.set_color(color1.get())
-        else:
-            pixel.set_color(color2.get())
+        above = (math.tan(angle) * x <= z + c) ^ (angle > 0.5 * math.pi) ^ (angle >= 1.5 * math.pi)
+        return mix_colors(color2.get(), color1.get(), above)
+
+    shade(plane)
 
     # now we get ready for the next cycle
 
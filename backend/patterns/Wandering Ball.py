@@ -16,6 +16,8 @@ radius = RangeAttr("radius", 0.4, 0.1, 0.8, 0.03)
 color = ColorAttr("ball color", Color.white())
 trailLength = RangeAttr("Trail Length", 100, 5, 200, 5)
 
+ball = Sphere((0, 0, cur_height), radius.get(), color.get()).keep()
+
 def draw():
     global angle, cur_height, angle2, dist
     lerp(Color.black(), int(trailLength.get()))
@@ -25,5 +27,7 @@ def draw():
 
     center = [dist * math.sin(angle), dist * math.cos(angle), cur_height]
     cur_height = abs(math.sin(angle2)) * (height() - radius.get() * 2) + radius.get()
-    Sphere((center[0], center[1], cur_height), radius.get(), color.get())
-
+    ball.move_to((center[0], center[1], cur_height))
+    if ball.radius != radius.get():
+        ball.resize(radius.get())
+    ball.color = color.get()
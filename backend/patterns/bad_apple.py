@@ -1,34 +1,27 @@
-import cv2
 from gridmas import *
+import numpy as np
 
 name = "Bad Apple"
 author = "Ciaran"
 
 
 def draw():
-    cap = cv2.VideoCapture("patterns/badapple.mp4")
-    coords = []
+    picture = planar_map((1, -1), (0, 2))
+    # only the middle of the tree shows the video
+    z = np.array(coords())[:, 2]
+    band = (z > 0.5) & (z < 2.5)
 
-    for pixel in pixels():
-        videox = max(min(int(((-pixel.x + 1) / 2) * 480), 479), 0)
-        videoy = max(min(int((1 - pixel.z / 2) * 360), 359), 0)
-        coords.append((videox, videoy))
+    # the decoding thread picks out the blue channel under each light, the video is black and white
+    video = VideoSource("patterns/badapple.mp4", transform=lambda frame: picture.sample(frame)[:, 0])
 
     set_fps(30)
 
-    while True:
-
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        for i, pixel in enumerate(pixels()):
-            if 0.5 < pixel.z < 2.5:
-                value = int(frame[coords[i][1]][coords[i][0]][0])
-                pixel.set_rgb(value, value, value)
-
-            else:
-                pixel.set_rgb(0, 0, 0)
-        yield
-
-    cap.release()
+    try:
+        while not video.finished:
+            values = video.read()
+            if values is not None:
+                values = np.where(band, values, 0)
+                shade(lambda: (values, values, values))
+            yield
+    finally:
+        video.close()
@@ -0,0 +1,47 @@
+import signal
+import sys
+from typing import Optional
+import numpy as np
+import numpy.typing as npt
+from clip import ClipWriter
+from frame_ring import FrameRing
+from pixel_driver.pixel_driver import PixelDriver
+from util import tcolors
+
+
+class FileDriver(PixelDriver):
+    """Writes every frame to a .gridmas clip instead of showing it
+
+    The clip is finished when the driver is stopped, and can be played back like any other clip
+    """
+
+    def __init__(self, ring: FrameRing, coords: list[tuple[float, float, float]], path: str = "output.gridmas", tree_hash: str = "0" * 64, compress: bool = True):
+        super().__init__(ring, coords)
+        self.path = path
+        self.tree_hash = tree_hash
+        self.compress = compress
+        self.frame: Optional[npt.NDArray[np.uint32]] = None
+        self.writer: Optional[ClipWriter] = None
+
+    def init(self):
+        # the main process handles ctrl+c, then stops the driver, which is when the clip is finished
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, self._stop)
+
+    def draw(self, frame: npt.NDArray[np.uint32]):
+        self.frame = frame
+
+    def show(self):
+        if self.frame is None:
+            return
+
+        if self.writer is None:
+            # a clip plays at one fps, the one the first frame was sent at
+            self.writer = ClipWriter(self.path, self.pacer.fps or 45, len(self.frame), self.tree_hash, self.compress)
+        self.writer.add(self.frame)
+
+    def _stop(self, sig, frame):
+        if self.writer is not None and self.writer.frame_count > 0:
+            self.writer.close()
+            print(f"{tcolors.OKGREEN}Saved {self.writer.frame_count} frames to {self.path}{tcolors.ENDC}")
+        sys.exit(0)
@@ -0,0 +1,159 @@
+"""Decides when the pixel driver shows each frame, so frames go out at a steady fps.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+import time
+from typing import Callable, Optional
+
+
+class FrameStats:
+    """Counts how well the driver is keeping up
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """reset Start counting again"""
+
+        self.shown = 0
+        """Frames shown"""
+
+        self.late = 0
+        """Frames shown after their deadline"""
+
+        self.dropped = 0
+        """Frames skipped because the driver was behind and newer frames were waiting"""
+
+        self.held = 0
+        """Deadlines where no frame had arrived, so the last frame stayed on the tree"""
+
+        self.total_lateness = 0.0
+        """Seconds that the late frames were late by, added up"""
+
+        self.max_lateness = 0.0
+        """Seconds that the latest frame was late by"""
+
+    def summary(self) -> str:
+        """summary The stats as a line of text"""
+        mean = self.total_lateness / self.late if self.late else 0.0
+        return (f"{self.shown} frames shown, {self.late} late (mean {mean * 1000:.1f} ms, worst {self.max_lateness * 1000:.1f} ms), "
+                f"{self.dropped} dropped, {self.held} held")
+
+
+class FramePacer:
+    """A deadline scheduler for showing frames
+
+    Every frame has an absolute deadline one period after the last, so time spent drawing
+    or waiting doesn't add up into drift. When the driver falls more than a frame behind
+    it drops frames which are already waiting, if there are none it starts the schedule
+    again from now rather than showing a burst of frames. When a frame doesn't arrive in
+    time the last frame is held on the tree for another period.
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, tolerance: float = 0.002, clock: Callable[[], float] = time.perf_counter, sleep: Callable[[float], None] = time.sleep):
+        """__init__ Create a pacer
+
+        Args:
+            tolerance (float, optional): How many seconds after its deadline a frame can be shown without counting as late. Defaults to 0.002.
+            clock (Callable[[], float], optional): The clock used for deadlines. Defaults to time.perf_counter.
+            sleep (Callable[[float], None], optional): Used to wait for a deadline. Defaults to time.sleep.
+        """
+        self.tolerance = tolerance
+        self.clock = clock
+        self.sleep = sleep
+
+        self.fps = 0
+        self.period = 0.0
+        self.deadline: Optional[float] = None
+        """When the next frame should be shown, None until the first frame arrives"""
+
+        self.stats = FrameStats()
+
+    def reset(self):
+        """reset Forget the schedule, the next frame is shown straight away"""
+        self.deadline = None
+
+    def timeout(self, idle: float = 0.04) -> float:
+        """timeout How long to wait for the next frame before holding the last one
+
+        Args:
+            idle (float, optional): How long to wait when nothing has been shown yet. Defaults to 0.04.
+
+        Returns:
+            float: Seconds to wait
+        """
+        if self.deadline is None:
+            return idle
+        return max(0.0, self.deadline - self.clock())
+
+    def missed(self):
+        """missed No frame arrived by the deadline, so the last one stays up for another period"""
+        if self.deadline is None:
+            return
+
+        self.stats.held += 1
+        self.deadline += self.period
+
+    def accept(self, fps: int, pending: int) -> bool:
+        """accept Schedule a frame that has just arrived
+
+        Args:
+            fps (int): The fps the frame should be shown at
+            pending (int): How many newer frames are already waiting
+
+        Returns:
+            bool: False if the frame should be dropped
+        """
+        now = self.clock()
+
+        if fps != self.fps:
+            # a new fps starts a new schedule
+            self.fps = fps
+            self.period = 1 / fps
+            self.deadline = None
+
+        if self.deadline is None:
+            self.deadline = now
+
+        lateness = now - self.deadline
+
+        if lateness >= self.period:
+            if pending > 0:
+                self.stats.dropped += 1
+                self.deadline += self.period
+                return False
+
+            # nothing to catch up with, so don't rush out frames to make up the time
+            self._late(lateness)
+            self.deadline = now
+
+        elif lateness > self.tolerance:
+            self._late(lateness)
+
+        return True
+
+    def wait(self):
+        """wait Sleep until the deadline of the accepted frame, then move the deadline on a period"""
+        if self.deadline is None:
+            return
+
+        delay = self.deadline - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+
+        self.stats.shown += 1
+        self.deadline += self.period
+
+    def _late(self, lateness: float):
+        self.stats.late += 1
+        self.stats.total_lateness += lateness
+        self.stats.max_lateness = max(self.stats.max_lateness, lateness)
@@ -0,0 +1,28 @@
+"""Direct access to the LED memory of a ws281x channel, so a whole frame can be copied in with one call
+   instead of setting each LED through the library"""
+
+from ctypes import c_uint32
+from types import ModuleType
+from typing import Any
+import numpy as np
+import numpy.typing as npt
+
+
+def channel_led_memory(ws: ModuleType, leds: Any, channel: int, count: int) -> npt.NDArray[np.uint32]:
+    """channel_led_memory Get a numpy view onto the LED buffer of a channel
+
+    The buffer is allocated by ws2811_init(), so this must be called after it and the view
+    stops being valid once ws2811_fini() is called
+
+    Args:
+        ws (ModuleType): The _rpi_ws281x module
+        leds (Any): The ws2811_t structure
+        channel (int): The channel number
+        count (int): The number of LEDs on the channel
+
+    Returns:
+        npt.NDArray[np.uint32]: count words, writing to these sets the LEDs
+    """
+    pointer = ws.ws2811_channel_t_leds_get(ws.ws2811_channel_get(leds, channel))
+    return np.ctypeslib.as_array((c_uint32 * count).from_address(int(pointer)))
+
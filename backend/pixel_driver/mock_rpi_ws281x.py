@@ -0,0 +1,202 @@
+"""A stand in for the _rpi_ws281x library, so the ws281x drivers can be run, tested and benchmarked without a Raspberry Pi.
+
+   It keeps the LED memory of each channel in ordinary memory and records what was rendered,
+   nothing is sent to any hardware.
+
+   Use install() before importing a driver:
+   ```
+   from pixel_driver import mock_rpi_ws281x
+   mock_rpi_ws281x.install()
+   from pixel_driver import ws281x_tree
+   ```
+
+   Or run this file from the backend folder to benchmark uploading a frame:
+   ```
+   python -m pixel_driver.mock_rpi_ws281x
+   ```
+"""
+
+from ctypes import addressof, c_uint32
+import sys
+from typing import Any
+
+
+WS2811_SUCCESS = 0
+WS2811_ERROR_GENERIC = -1
+
+WS2811_STRIP_RGB = 0x00100800
+WS2811_STRIP_RBG = 0x00100008
+WS2811_STRIP_GRB = 0x00081000
+WS2811_STRIP_GBR = 0x00080010
+WS2811_STRIP_BRG = 0x00001008
+WS2811_STRIP_BGR = 0x00000810
+
+RPI_PWM_CHANNELS = 2
+
+
+class Pointer:
+    """A stand in for a SWIG pointer, int() gives the address"""
+
+    def __init__(self, address: int):
+        self.address = address
+
+    def __int__(self) -> int:
+        return self.address
+
+
+class Channel:
+    def __init__(self):
+        self.count = 0
+        self.gpionum = 0
+        self.invert = 0
+        self.brightness = 255
+        self.strip_type = WS2811_STRIP_GRB
+        self.leds: Any = None
+
+
+class Ws2811:
+    def __init__(self):
+        self.freq = 800000
+        self.dmanum = 10
+        self.channels = [Channel() for _ in range(RPI_PWM_CHANNELS)]
+        self.initialised = False
+
+        self.renders: list[list[list[int]]] = []
+        """The LED memory of every channel, each time ws2811_render() was called"""
+
+        self.record = False
+        """Set to True to keep a copy of every render in renders"""
+
+
+def new_ws2811_t() -> Ws2811:
+    return Ws2811()
+
+
+def delete_ws2811_t(leds: Ws2811):
+    pass
+
+
+def ws2811_channel_get(leds: Ws2811, channel: int) -> Channel:
+    return leds.channels[channel]
+
+
+def ws2811_channel_t_count_set(channel: Channel, count: int):
+    channel.count = count
+
+
+def ws2811_channel_t_gpionum_set(channel: Channel, gpionum: int):
+    channel.gpionum = gpionum
+
+
+def ws2811_channel_t_invert_set(channel: Channel, invert: int):
+    channel.invert = invert
+
+
+def ws2811_channel_t_brightness_set(channel: Channel, brightness: int):
+    channel.brightness = brightness
+
+
+def ws2811_channel_t_strip_type_set(channel: Channel, strip_type: int):
+    channel.strip_type = strip_type
+
+
+def ws2811_channel_t_leds_get(channel: Channel) -> Pointer:
+    return Pointer(addressof(channel.leds))
+
+
+def ws2811_t_freq_set(leds: Ws2811, freq: int):
+    leds.freq = freq
+
+
+def ws2811_t_dmanum_set(leds: Ws2811, dmanum: int):
+    leds.dmanum = dmanum
+
+
+def ws2811_init(leds: Ws2811) -> int:
+    for channel in leds.channels:
+        channel.leds = (c_uint32 * channel.count)()
+    leds.initialised = True
+    return WS2811_SUCCESS
+
+
+def ws2811_fini(leds: Ws2811):
+    leds.initialised = False
+
+
+def ws2811_render(leds: Ws2811) -> int:
+    if not leds.initialised:
+        return WS2811_ERROR_GENERIC
+    if leds.record:
+        leds.renders.append([list(channel.leds) for channel in leds.channels])
+    return WS2811_SUCCESS
+
+
+def ws2811_led_set(channel: Channel, lednum: int, color: int) -> int:
+    if lednum >= channel.count:
+        return -1
+    channel.leds[lednum] = color
+    return 0
+
+
+def ws2811_led_get(channel: Channel, lednum: int) -> int:
+    if lednum >= channel.count:
+        return -1
+    return channel.leds[lednum]
+
+
+def ws2811_get_return_t_str(code: int) -> str:
+    return "Success" if code == WS2811_SUCCESS else "Generic failure"
+
+
+def install():
+    """Make `import _rpi_ws281x` give this module"""
+    sys.modules["_rpi_ws281x"] = sys.modules[__name__]
+
+
+if __name__ == "__main__":
+    import timeit
+    import numpy as np
+
+    install()
+    ws = sys.modules[__name__]
+
+    from pixel_driver import ws281x_tree
+    from pixel_driver.strip_layout import StripChannel, StripLayout
+    from frame_ring import FrameRing
+
+    coords = [(0.0, 0.0, i / 1000) for i in range(1000)]
+    ring = FrameRing(len(coords), 1)
+    layout = StripLayout([
+        StripChannel(pin=18, count=500, offset=0),
+        StripChannel(pin=13, count=300, offset=500, reversed=[(0, 100)]),
+        StripChannel(pin=10, count=200, offset=800, order="RGB", dma=5),
+    ])
+    driver = ws281x_tree.ws281x_tree(ring, coords, layout)
+    frame = np.random.default_rng(0).integers(0, 1 << 24, len(coords), dtype=np.uint32)
+
+    channels = []
+    for leds, group in zip(driver.controllers, layout.groups().values()):
+        for strip in group:
+            channels.append((strip, ws.ws2811_channel_get(leds, strip.channel)))
+
+    def per_led():
+        frame_array = (c_uint32 * len(frame))(*frame.tolist())
+        for strip, channel in channels:
+            for i in range(strip.count):
+                ws.ws2811_led_set(channel, i, frame_array[i + strip.offset])
+
+    number = 200
+    slow = timeit.timeit(per_led, number=number) / number
+    fast = timeit.timeit(lambda: driver.draw(frame), number=number) / number
+    print(f"per LED: {slow * 1000:.3f} ms/frame, bulk: {fast * 1000:.3f} ms/frame")
+
+    driver.draw(frame)
+    for strip, memory in driver.strips:
+        expected = frame[strip.offset:strip.offset + strip.count].copy()
+        for start, end in strip.reversed:
+            expected[start:end] = expected[start:end][::-1]
+        if memory.tolist() != expected.tolist():
+            raise Exception(f"bulk upload wrong for the strip on pin {strip.pin}")
+
+    driver.times.close(unlink=True)
+    ring.close(unlink=True)
@@ -0,0 +1,52 @@
+import time
+import numpy as np
+import numpy.typing as npt
+from frame_ring import FrameRing
+from pixel_driver.pixel_driver import PixelDriver
+from util import tcolors
+
+
+class NullDriver(PixelDriver):
+    """Takes frames as fast as they are made and throws them away, timing how quickly they arrive
+
+    Used to measure how fast the main loop and patterns run without a tree or a display
+    """
+
+    paced = False
+
+    def __init__(self, ring: FrameRing, coords: list[tuple[float, float, float]], history: int = 4096):
+        super().__init__(ring, coords)
+
+        self.frames = 0
+        """Frames taken since the driver started"""
+
+        self.intervals: npt.NDArray[np.float64] = np.zeros(history, dtype=np.float64)
+        """Seconds between the most recent frames, a ring buffer"""
+
+        self.last_frame = None
+
+    def init(self):
+        self.last_frame = None
+
+    def draw(self, frame: npt.NDArray[np.uint32]):
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.intervals[self.frames % len(self.intervals)] = now - self.last_frame
+            self.frames += 1
+        self.last_frame = now
+
+    def show(self):
+        pass
+
+    def summary(self) -> str:
+        """summary How fast frames have been arriving, as a line of text"""
+        recent = self.intervals[:min(self.frames, len(self.intervals))]
+        if len(recent) == 0:
+            return "no frames yet"
+
+        mean = float(recent.mean())
+        p99 = float(np.percentile(recent, 99))
+        return f"{self.frames} frames, {1 / mean:.1f} fps, mean {mean * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms, worst {recent.max() * 1000:.2f} ms"
+
+    def report(self):
+        print(f"{tcolors.OKBLUE}Null driver: {self.summary()}{tcolors.ENDC}")
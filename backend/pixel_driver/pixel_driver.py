@@ -1,47 +1,77 @@
 from abc import ABC, abstractmethod
-import queue
 import time
-from multiprocessing import Queue
+import numpy as np
+import numpy.typing as npt
+from frame_ring import FrameRing
+from pixel_driver.frame_pacer import FramePacer
+from render_stats import DRIVER_STAGES, TimingRing
+from util import tcolors
+
+
+REPORT_INTERVAL = 30
+"""How often, in seconds, the driver reports late or dropped frames"""
 
 
 class PixelDriver(ABC):
-    def __init__(self, queue: "Queue[tuple[int, list[int]] | None]", coords: list[tuple[float, float, float]]):
-        self.queue = queue
+    paced = True
+    """Whether frames are shown at their fps, when False they are shown as soon as they arrive"""
+
+    def __init__(self, ring: FrameRing, coords: list[tuple[float, float, float]]):
+        self.ring = ring
         self.coords = coords
+        self.pacer = FramePacer()
+
+        # made before the driver process starts, so the main process can read the timings
+        self.times = TimingRing(DRIVER_STAGES, shared=True)
 
     def clear_queue(self):
-        while not self.queue.empty():
-            self.queue.get()
+        self.ring.clear()
+        self.pacer.reset()
 
 
     def run(self):
-        cur_fps = 45
-        start_time = time.perf_counter()
         self.init()
 
+        frame = np.zeros(self.ring.num_leds, dtype=np.uint32)
+        last_report = time.perf_counter()
         while True:
-            try:
-                data = self.queue.get(timeout=0.04)
-                if data is None:
-                    continue
-                fps, framea = data
-                if fps != cur_fps:
-                    cur_fps = fps
-                self.draw(framea)
+            fps = self.ring.get(frame, timeout=self.pacer.timeout())
+            if fps is None:
+                # the frame is late, leave the last one on the tree
+                self.pacer.missed()
+                self.idle()
+            elif not self.paced or self.pacer.accept(fps, self.ring.pending()):
+                self.times.start()
+                self.draw(frame)
+                self.times.lap("draw")
+                if self.paced:
+                    self.pacer.wait()
+                self.times.lap("wait")
+                self.show()
+                self.times.lap("show")
+                self.times.end_frame()
 
-                time.sleep((1 / fps) - (time.perf_counter() - start_time) % (1 / fps))
+            if time.perf_counter() - last_report > REPORT_INTERVAL:
+                last_report = time.perf_counter()
+                self.report()
 
-            except queue.Empty:
-                pass
+    def report(self):
+        """Print the frame stats if any frames were late, then start counting again"""
+        stats = self.pacer.stats
+        if stats.late or stats.dropped:
+            print(f"{tcolors.WARNING}Pixel driver: {stats.summary()}{tcolors.ENDC}")
+        stats.reset()
 
-            self.show()
+    def idle(self):
+        """Called instead of draw() and show() while waiting for a frame"""
+        pass
 
     @abstractmethod
     def init(self):
         ...
 
     @abstractmethod
-    def draw(self, frame: list[int]):
+    def draw(self, frame: npt.NDArray[np.uint32]):
         ...
 
     @abstractmethod
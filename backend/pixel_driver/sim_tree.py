@@ -1,31 +1,35 @@
 import os
 
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
-from multiprocessing import Queue
 from colors import int2tuple
-from typing import Optional
+import numpy as np
+import numpy.typing as npt
 import pygame.locals as PLocals
 import pygame
 import OpenGL.GL as GL
 import OpenGL.GLU as GLU
+from frame_ring import FrameRing
 from pixel_driver.pixel_driver import PixelDriver
 
 
 class SimTree(PixelDriver):
-    def __init__(self, queue: "Queue[Optional[tuple[int, list[int]]]]", coords: list[tuple[float, float, float]]):
-        super().__init__(queue, coords)
+    def __init__(self, ring: FrameRing, coords: list[tuple[float, float, float]]):
+        super().__init__(ring, coords)
         self.buffer = [0 for _ in range(len(coords))]
-        self.queue = queue
 
     def init(self):
         self.setup_visualisation()
 
-    def draw(self, frame: list[int]):
+    def draw(self, frame: npt.NDArray[np.uint32]):
         self.buffer = frame
 
     def show(self):
         self.pygame_frame()
 
+    def idle(self):
+        # keep the window responding while there are no new frames
+        pygame.event.pump()
+
     def setup_visualisation(self):
         pygame.init()
         display = (800, 600)
@@ -0,0 +1,264 @@
+"""Describes how the LED strips of a physical tree are wired, so one driver can handle any number of strips.
+
+   A layout is a json file with a list of channels, one for each strip:
+   ```
+   {
+       "freq": 800000,
+       "channels": [
+           {"pin": 18, "count": 500},
+           {"pin": 13, "count": 300, "offset": 500, "reversed": [[0, 100]], "order": "RGB", "dma": 10}
+       ]
+   }
+   ```
+
+   `pin` and `count` are needed, everything else is optional:
+
+   - `offset` is the index in the frame of the first LED on the strip, by default it follows on from the strip before
+   - `reversed` is a list of [start, end) ranges of LEDs on the strip which are wired the other way round
+   - `order` is the color order of the LEDs, one of RGB, RBG, GRB, GBR, BRG or BGR. Defaults to GRB
+   - `dma` is the DMA channel used, strips with the same dma are driven together by one controller. Defaults to 10
+   - `brightness` and `invert` are passed to the library. Default to 255 and false
+
+   The pin decides which of the Pi's peripherals drives a strip. The two PWM channels can share a dma, one strip on
+   pin 12 or 18 (PWM channel 0) and one on pin 13 or 19 (PWM channel 1). A strip on pin 10 (SPI) or pin 21 (PCM) needs
+   a dma of its own. Each peripheral can only be used by one dma, so a tree has at most four strips.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+import json
+from typing import Any, Optional
+import numpy as np
+import numpy.typing as npt
+from util import tcolors
+
+
+COLOR_ORDERS = ["RGB", "RBG", "GRB", "GBR", "BRG", "BGR"]
+"""The color orders a strip can have, each matches a WS2811_STRIP_ constant of the library"""
+
+CHANNELS_PER_DMA = 2
+"""The library drives at most two strips with each ws2811_t, and each one needs its own DMA channel"""
+
+PIN_CHANNELS: dict[int, tuple[str, int]] = {
+    12: ("PWM", 0),
+    18: ("PWM", 0),
+    13: ("PWM", 1),
+    19: ("PWM", 1),
+    10: ("SPI", 0),
+    21: ("PCM", 0),
+}
+"""The peripheral which drives each pin the library can use, and the ws2811_t channel a strip on it must be"""
+
+
+class StripChannel:
+    """One strip of LEDs plugged into a GPIO pin
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, pin: int, count: int, offset: int, reversed: Optional[list[tuple[int, int]]] = None,
+                 order: str = "GRB", dma: int = 10, brightness: int = 255, invert: bool = False):
+        """__init__ Describe a strip
+
+        Args:
+            pin (int): The GPIO pin the strip is plugged into
+            count (int): The number of LEDs on the strip
+            offset (int): The index in the frame of the first LED on the strip
+            reversed (Optional[list[tuple[int, int]]], optional): [start, end) ranges of LEDs on the strip which are wired the other way round. Defaults to None.
+            order (str, optional): The color order of the LEDs. Defaults to "GRB".
+            dma (int, optional): The DMA channel used to drive the strip. Defaults to 10.
+            brightness (int, optional): The brightness of the strip, 0-255. Defaults to 255.
+            invert (bool, optional): Whether the signal needs inverting. Defaults to False.
+
+        Raises:
+            ValueError: If the strip doesn't make sense
+        """
+        if count <= 0:
+            raise ValueError(f"Strip on pin {pin} must have at least one LED, not {count}")
+        if offset < 0:
+            raise ValueError(f"Strip on pin {pin} has a negative offset {offset}")
+        if pin not in PIN_CHANNELS:
+            raise ValueError(f"Strip on pin {pin} can't be driven, use one of pins {', '.join(str(p) for p in sorted(PIN_CHANNELS))}")
+        if order not in COLOR_ORDERS:
+            raise ValueError(f"Strip on pin {pin} has unknown color order {order}, use one of {', '.join(COLOR_ORDERS)}")
+
+        self.reversed = [(int(start), int(end)) for start, end in (reversed or [])]
+        for start, end in self.reversed:
+            if not 0 <= start < end <= count:
+                raise ValueError(f"Strip on pin {pin} has reversed range [{start}, {end}) outside its {count} LEDs")
+
+        self.pin = pin
+        self.count = count
+        self.offset = offset
+        self.order = order
+        self.dma = dma
+        self.brightness = brightness
+        self.invert = invert
+
+    @property
+    def peripheral(self) -> str:
+        """The peripheral which drives the strip, PWM, SPI or PCM"""
+        return PIN_CHANNELS[self.pin][0]
+
+    @property
+    def channel(self) -> int:
+        """The channel of its ws2811_t the strip must use, which the library works out from the pin"""
+        return PIN_CHANNELS[self.pin][1]
+
+    def fill(self, memory: npt.NDArray[np.uint32], frame: npt.NDArray[np.uint32]):
+        """fill Copy this strip's part of a frame into its LED memory
+
+        LEDs past the end of the frame are turned off
+
+        Args:
+            memory (npt.NDArray[np.uint32]): count words to write the strip to
+            frame (npt.NDArray[np.uint32]): The whole frame
+        """
+        part = frame[self.offset:self.offset + self.count]
+        memory[:len(part)] = part
+        memory[len(part):] = 0
+
+        for start, end in self.reversed:
+            memory[start:end] = memory[start:end][::-1]
+
+
+class StripLayout:
+    """All of the strips on a tree
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, channels: list[StripChannel], freq: int = 800000):
+        """__init__ Create a layout
+
+        Args:
+            channels (list[StripChannel]): The strips
+            freq (int, optional): The signal frequency of the LEDs. Defaults to 800000.
+
+        Raises:
+            ValueError: If there are no strips, or the strips can't be driven together
+        """
+        if len(channels) == 0:
+            raise ValueError("A strip layout needs at least one channel")
+
+        self.channels = channels
+        self.freq = freq
+
+        # each ws2811_t drives one peripheral, and each peripheral can only be driven by one ws2811_t
+        peripherals: dict[str, int] = {}
+        for dma, group in self.groups().items():
+            if len(group) > CHANNELS_PER_DMA:
+                raise ValueError(f"{len(group)} strips use DMA channel {dma}, at most {CHANNELS_PER_DMA} can share one")
+
+            kinds = {strip.peripheral for strip in group}
+            if len(kinds) > 1:
+                raise ValueError(f"The strips on DMA channel {dma} use {' and '.join(sorted(kinds))} pins, strips sharing a dma must all be on PWM pins")
+            kind = kinds.pop()
+
+            if kind in peripherals:
+                raise ValueError(f"The strips on DMA channels {peripherals[kind]} and {dma} both use {kind}, which can only be driven by one dma")
+            peripherals[kind] = dma
+
+            used: dict[int, StripChannel] = {}
+            for strip in group:
+                other = used.get(strip.channel)
+                if other is not None:
+                    raise ValueError(f"The strips on pins {other.pin} and {strip.pin} are both on {kind} channel {strip.channel}, "
+                                     f"put one on pin {'13 or 19' if strip.channel == 0 else '12 or 18'}")
+                used[strip.channel] = strip
+
+    def groups(self) -> dict[int, list[StripChannel]]:
+        """groups The strips grouped by the DMA channel which drives them, in the order they first appear"""
+        groups: dict[int, list[StripChannel]] = {}
+        for channel in self.channels:
+            groups.setdefault(channel.dma, []).append(channel)
+        return groups
+
+    @property
+    def num_leds(self) -> int:
+        """The number of frame LEDs the layout covers"""
+        return max(channel.offset + channel.count for channel in self.channels)
+
+    def check(self, num_leds: int):
+        """check Warn if the layout and the tree don't have the same number of LEDs
+
+        Args:
+            num_leds (int): The number of LEDs in each frame
+        """
+        covered = np.zeros(num_leds, dtype=np.bool_)
+        for channel in self.channels:
+            covered[channel.offset:channel.offset + channel.count] = True
+
+        missing = int(np.count_nonzero(~covered))
+        if missing:
+            print(f"{tcolors.WARNING}{missing} of the {num_leds} LEDs in the tree file are not on any strip in the layout{tcolors.ENDC}")
+
+        if self.num_leds > num_leds:
+            print(f"{tcolors.WARNING}The strip layout has {self.num_leds} LEDs but the tree file only has {num_leds}, the rest will stay off{tcolors.ENDC}")
+
+    @staticmethod
+    def from_dict(layout: dict[str, Any]) -> "StripLayout":
+        """from_dict Create a layout from the contents of a layout file
+
+        Args:
+            layout (dict[str, Any]): The parsed json
+
+        Raises:
+            ValueError: If the layout is missing something or doesn't make sense
+
+        Returns:
+            StripLayout: The layout
+        """
+        channels: list[StripChannel] = []
+        offset = 0
+        try:
+            for c in layout["channels"]:
+                channel = StripChannel(
+                    pin=int(c["pin"]),
+                    count=int(c["count"]),
+                    offset=int(c.get("offset", offset)),
+                    reversed=c.get("reversed"),
+                    order=str(c.get("order", "GRB")).upper(),
+                    dma=int(c.get("dma", 10)),
+                    brightness=int(c.get("brightness", 255)),
+                    invert=bool(c.get("invert", False)),
+                )
+                channels.append(channel)
+                offset = channel.offset + channel.count
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Bad strip layout | {e!r}")
+
+        return StripLayout(channels, int(layout.get("freq", 800000)))
+
+    @staticmethod
+    def load(layout_file: str) -> "StripLayout":
+        """load Read a layout file
+
+        Args:
+            layout_file (str): The location of the json file
+
+        Returns:
+            StripLayout: The layout
+        """
+        with open(layout_file) as f:
+            return StripLayout.from_dict(json.load(f))
+
+    @staticmethod
+    def default(num_leds: int) -> "StripLayout":
+        """default The layout used when there is no layout file
+
+        A single 500 LED strip on pin 18, with any LEDs after the first 500 on a second strip on pin 13
+
+        Args:
+            num_leds (int): The number of LEDs in the tree
+
+        Returns:
+            StripLayout: The layout
+        """
+        channels = [StripChannel(pin=18, count=500, offset=0)]
+        if num_leds > 500:
+            channels.append(StripChannel(pin=13, count=num_leds - 500, offset=500))
+        return StripLayout(channels)
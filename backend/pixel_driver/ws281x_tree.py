@@ -0,0 +1,71 @@
+from typing import Any, Optional
+import numpy as np
+import numpy.typing as npt
+import _rpi_ws281x as ws
+from frame_ring import FrameRing
+from pixel_driver.led_memory import channel_led_memory
+from pixel_driver.pixel_driver import PixelDriver
+from pixel_driver.strip_layout import CHANNELS_PER_DMA, StripChannel, StripLayout
+
+
+class ws281x_tree(PixelDriver):
+    def __init__(self, ring: FrameRing, coords: list[tuple[float, float, float]], layout: Optional[StripLayout] = None):
+
+        super().__init__(ring, coords)
+
+        if layout is not None:
+            layout.check(len(coords))
+        self.layout = layout or StripLayout.default(len(coords))
+
+        # one ws2811_t for each DMA channel, each driving up to two strips
+        self.controllers: list[Any] = []
+        self.strips: list[tuple[StripChannel, npt.NDArray[np.uint32]]] = []
+
+        for dma, group in self.layout.groups().items():
+            leds = ws.new_ws2811_t()
+
+            # the library picks the channel from the pin, so each strip goes in the channel its pin belongs to
+            by_channel = {strip.channel: strip for strip in group}
+            for ch in range(CHANNELS_PER_DMA):
+                channel = ws.ws2811_channel_get(leds, ch)
+                strip = by_channel.get(ch)
+                if strip is not None:
+                    ws.ws2811_channel_t_count_set(channel, strip.count)
+                    ws.ws2811_channel_t_gpionum_set(channel, strip.pin)
+                    ws.ws2811_channel_t_invert_set(channel, int(strip.invert))
+                    ws.ws2811_channel_t_brightness_set(channel, strip.brightness)
+                    ws.ws2811_channel_t_strip_type_set(channel, getattr(ws, f"WS2811_STRIP_{strip.order}"))
+                else:
+                    # unused channels must be switched off
+                    ws.ws2811_channel_t_count_set(channel, 0)
+                    ws.ws2811_channel_t_gpionum_set(channel, 0)
+
+            ws.ws2811_t_freq_set(leds, self.layout.freq)
+            ws.ws2811_t_dmanum_set(leds, dma)
+
+            # Initialize library with LED configuration.
+            resp = ws.ws2811_init(leds)
+            if resp != ws.WS2811_SUCCESS:
+                message = ws.ws2811_get_return_t_str(resp)
+                raise RuntimeError(f'ws2811_init failed for DMA channel {dma} with code {resp} ({message})')
+
+            self.controllers.append(leds)
+
+            # Views onto each strip's LED memory, so a frame is copied in with one call per strip
+            for strip in group:
+                self.strips.append((strip, channel_led_memory(ws, leds, strip.channel, strip.count)))
+
+    def init(self):
+        pass
+
+    def draw(self, frame: npt.NDArray[np.uint32]):
+        for strip, memory in self.strips:
+            strip.fill(memory, frame)
+
+    def show(self):
+        # Render all channels at once
+        for leds in self.controllers:
+            resp = ws.ws2811_render(leds)
+            if resp != ws.WS2811_SUCCESS:
+                message = ws.ws2811_get_return_t_str(resp)
+                raise RuntimeError(f'ws2811_render failed with code {resp} ({message})')
@@ -0,0 +1,176 @@
+"""A sampling profiler for finding out why a pattern is slow.
+
+   A timer signal interrupts the process every few milliseconds of CPU time, and while a pattern is drawing
+   the stack it was interrupted in is counted. Outside of the profiled sections the signal does nothing, so
+   it costs almost nothing. Run the tree with `python main.py --profile` and stop it, then turn the stacks
+   into a flamegraph with any tool which reads collapsed stacks, e.g.
+   ```
+   flamegraph.pl profile.collapsed > profile.svg
+   ```
+   or open the file in https://www.speedscope.app
+
+   The lines of each pattern which were running most often are written next to it, in profile.lines.txt
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+from collections import Counter
+import contextlib
+import os
+import signal
+import sys
+from types import FrameType
+from typing import Iterator, Optional
+from util import tcolors
+
+
+class SamplingProfiler:
+    """Counts the stacks the profiled sections are in when the timer signal arrives
+
+    Only works on the main thread of a process, on systems with setitimer
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, path: str = "profile", interval: float = 0.002):
+        """__init__ Create a profiler, it doesn't start sampling until start() is called
+
+        Args:
+            path (str, optional): Where to save the profile, .collapsed and .lines.txt are added. Defaults to "profile".
+            interval (float, optional): Seconds of CPU time between samples. Defaults to 0.002.
+        """
+        self.path = path
+        self.interval = interval
+
+        self.stacks: Counter[str] = Counter()
+        """How many samples landed in each stack, as ; separated frames from the outermost"""
+
+        self.lines: Counter[tuple[str, str, int]] = Counter()
+        """How many samples landed on each line of a pattern, by section, file and line number"""
+
+        self._labels: Optional[str] = None
+        self._root: Optional[FrameType] = None
+        self._pattern_dir: Optional[str] = None
+        self.running = False
+
+    @staticmethod
+    def available() -> bool:
+        """available Whether this system has the timer signal the profiler needs"""
+        return hasattr(signal, "setitimer") and hasattr(signal, "SIGPROF")
+
+    def start(self, pattern_dir: str = "patterns"):
+        """start Start the timer
+
+        Args:
+            pattern_dir (str, optional): The directory where pattern files are stored, samples in these files are counted by line. Defaults to "patterns".
+        """
+        if not self.available():
+            print(f"{tcolors.WARNING}Profiling needs setitimer, which this system doesn't have{tcolors.ENDC}")
+            return
+
+        self._pattern_dir = os.path.abspath(pattern_dir) + os.sep
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        self.running = True
+
+    def stop(self):
+        """stop Stop the timer"""
+        if not self.running:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_IGN)
+        self.running = False
+
+    @contextlib.contextmanager
+    def section(self, *labels: str) -> Iterator[None]:
+        """section Count samples taken inside the with block
+
+        Args:
+            *labels (str): Put at the root of the stacks sampled in this section, e.g. the pattern name and the stage
+
+        Example:
+            ```
+            with profiler.section("Snowing", "draw"):
+                manager.draw_current()
+            ```
+        """
+        self._labels = ";".join(label.replace(";", ":") for label in labels)
+        # the caller's frame, the stacks stop here so they don't include the main loop
+        self._root = sys._getframe(2)
+        try:
+            yield
+        finally:
+            self._labels = None
+            self._root = None
+
+    def _sample(self, signum: int, frame: Optional[FrameType]):
+        labels = self._labels
+        if labels is None or frame is None:
+            return
+
+        names: list[str] = []
+        line: Optional[tuple[str, str, int]] = None
+        while frame is not None and frame is not self._root:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+            if line is None and self._pattern_dir and code.co_filename.startswith(self._pattern_dir):
+                line = (labels, os.path.basename(code.co_filename), _line_number(frame))
+            frame = frame.f_back
+
+        names.append(labels)
+        self.stacks[";".join(reversed(names))] += 1
+        if line is not None:
+            self.lines[line] += 1
+
+    def write(self) -> tuple[str, str]:
+        """write Save the samples so far
+
+        Returns:
+            tuple[str, str]: The locations of the collapsed stacks and the line counts
+        """
+        stacks_path = self.path + ".collapsed"
+        with open(stacks_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        lines_path = self.path + ".lines.txt"
+        total = sum(self.stacks.values())
+        with open(lines_path, "w") as f:
+            f.write(f"{total} samples, {self.interval * 1000:g} ms of CPU apart\n\n")
+            for (labels, file, lineno), count in self.lines.most_common(50):
+                f.write(f"{count / total * 100:6.1f}%  {count:>7}  {labels}  {file}:{lineno}\n")
+
+        return stacks_path, lines_path
+
+    def finish(self):
+        """finish Stop the timer and save the samples"""
+        self.stop()
+        if self.stacks:
+            stacks_path, lines_path = self.write()
+            print(f"{tcolors.OKGREEN}Saved the profile to {stacks_path} and {lines_path}{tcolors.ENDC}")
+
+
+def _line_number(frame: FrameType) -> int:
+    """_line_number The line a frame is running
+
+    The signal is often handled on the jump back to the top of a loop, which has no line of its own,
+    so the last line before it is counted instead
+
+    Args:
+        frame (FrameType): The frame
+
+    Returns:
+        int: The line number
+    """
+    if frame.f_lineno is not None:
+        return frame.f_lineno
+
+    line = frame.f_code.co_firstlineno
+    for start, _, lineno in frame.f_code.co_lines():
+        if start > frame.f_lasti:
+            break
+        if lineno is not None:
+            line = lineno
+    return line
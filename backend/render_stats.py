@@ -0,0 +1,203 @@
+"""Times each stage of making and showing a frame, so the web server can report where the frame time goes.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+from multiprocessing import shared_memory
+import time
+from typing import Any, Optional
+import numpy as np
+import numpy.typing as npt
+
+
+LOOP_STAGES = ["requests", "draw", "composite", "queue"]
+"""The stages of the main loop: handling web requests, the pattern's draw(), Tree._request_frame() and waiting to hand the frame to the driver"""
+
+DRIVER_STAGES = ["draw", "wait", "show"]
+"""The stages of the pixel driver: copying the frame in, waiting for its deadline and sending it to the LEDs"""
+
+
+class TimingRing:
+    """How long each stage took for the most recent frames, plus running totals
+
+    The ring can live in shared memory, so one process can time its frames and another can read them.
+    Only one process should write to a ring
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, stages: list[str], size: int = 512, shared: bool = False):
+        """__init__ Create a ring
+
+        Args:
+            stages (list[str]): The names of the stages, in the order they happen
+            size (int, optional): How many frames are kept. Defaults to 512.
+            shared (bool, optional): Whether to put the ring in shared memory. Defaults to False.
+        """
+        self.stages = stages
+        self.size = size
+        self._columns = {stage: i for i, stage in enumerate(stages)}
+
+        nbytes = 8 + 8 * len(stages) + 8 * size * len(stages)
+        self._memory: Optional[shared_memory.SharedMemory] = None
+        if shared:
+            self._memory = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._attach(self._memory.buf)
+        else:
+            self._attach(bytearray(nbytes))
+        self._count[0] = 0
+        self._totals[:] = 0
+        self._samples[:] = 0
+
+        self._lap_start = time.perf_counter()
+
+    def _attach(self, buf: Any):
+        n = len(self.stages)
+
+        self._count: npt.NDArray[np.int64] = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=0)
+        """The number of frames finished"""
+
+        self._totals: npt.NDArray[np.float64] = np.ndarray((n,), dtype=np.float64, buffer=buf, offset=8)
+        """Seconds spent in each stage over every finished frame"""
+
+        self._samples: npt.NDArray[np.float64] = np.ndarray((self.size, n), dtype=np.float64, buffer=buf, offset=8 + 8 * n)
+        """Seconds spent in each stage of the most recent frames"""
+
+    def __getstate__(self) -> dict[str, Any]:
+        if self._memory is None:
+            raise TypeError("Only a shared TimingRing can be sent to another process")
+        state = self.__dict__.copy()
+        del state["_count"], state["_totals"], state["_samples"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]):
+        self.__dict__.update(state)
+        assert self._memory is not None
+        self._attach(self._memory.buf)
+
+    @property
+    def frames(self) -> int:
+        """The number of frames finished"""
+        return int(self._count[0])
+
+    def start(self):
+        """start Start timing the first stage"""
+        self._lap_start = time.perf_counter()
+
+    def lap(self, stage: str):
+        """lap Add the time since the last lap, or start(), to a stage of the current frame
+
+        Args:
+            stage (str): The name of the stage which just finished
+        """
+        now = time.perf_counter()
+        self._samples[self.frames % self.size, self._columns[stage]] += now - self._lap_start
+        self._lap_start = now
+
+    def end_frame(self):
+        """end_frame Finish the current frame and start the next one"""
+        row = self.frames % self.size
+        self._totals += self._samples[row]
+        self._samples[(row + 1) % self.size] = 0
+        self._count[0] += 1
+
+    def recent(self) -> npt.NDArray[np.float64]:
+        """recent The stage times of the most recent finished frames, in no particular order
+
+        Returns:
+            npt.NDArray[np.float64]: (frames, stages) seconds
+        """
+        frames = self.frames
+        if frames < self.size:
+            return self._samples[:frames].copy()
+
+        # every row but the one being written to
+        current = frames % self.size
+        return np.delete(self._samples, current, axis=0)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """summary Statistics for each stage over the recent frames, in milliseconds
+
+        Returns:
+            dict[str, dict[str, float]]: For each stage, its mean, p50, p95, p99 and max over the recent frames, and its total over every frame
+        """
+        recent = self.recent() * 1000
+        totals = self._totals.copy()
+        result: dict[str, dict[str, float]] = {}
+
+        for i, stage in enumerate(self.stages):
+            column = recent[:, i]
+            if len(column) == 0:
+                result[stage] = {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "total_s": 0.0}
+                continue
+
+            p50, p95, p99 = np.percentile(column, [50, 95, 99])
+            result[stage] = {
+                "mean": float(column.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(column.max()),
+                "total_s": float(totals[i]),
+            }
+
+        return result
+
+    def close(self, unlink: bool = False):
+        """close Detach from the shared memory
+
+        Args:
+            unlink (bool, optional): Also free the shared memory, only the process which created the ring should do this. Defaults to False.
+        """
+        if self._memory is None:
+            return
+        del self._count, self._totals, self._samples
+        self._memory.close()
+        if unlink:
+            self._memory.unlink()
+
+
+def stats(rings: dict[str, TimingRing]) -> dict[str, Any]:
+    """stats Everything the /stats endpoint reports
+
+    Args:
+        rings (dict[str, TimingRing]): The rings to report, by the name of what they time
+
+    Returns:
+        dict[str, Any]: For each ring, the number of frames and the summary of each stage
+    """
+    return {name: {"frames": ring.frames, "stages_ms": ring.summary()} for name, ring in rings.items()}
+
+
+def prometheus(rings: dict[str, TimingRing]) -> str:
+    """prometheus The stage times in the Prometheus text format, for the /metrics endpoint
+
+    Args:
+        rings (dict[str, TimingRing]): The rings to report, by the name of what they time
+
+    Returns:
+        str: The metrics
+    """
+    lines = [
+        "# HELP gridmas_stage_seconds Time spent in each stage of a frame, quantiles are over the recent frames",
+        "# TYPE gridmas_stage_seconds summary",
+    ]
+    for name, ring in rings.items():
+        summary = ring.summary()
+        for stage in ring.stages:
+            labels = f'process="{name}",stage="{stage}"'
+            for quantile, key in [("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")]:
+                lines.append(f'gridmas_stage_seconds{{{labels},quantile="{quantile}"}} {summary[stage][key] / 1000:.9f}')
+            lines.append(f"gridmas_stage_seconds_sum{{{labels}}} {summary[stage]['total_s']:.9f}")
+            lines.append(f"gridmas_stage_seconds_count{{{labels}}} {ring.frames}")
+
+    lines += [
+        "# HELP gridmas_frames_total Frames finished",
+        "# TYPE gridmas_frames_total counter",
+    ]
+    for name, ring in rings.items():
+        lines.append(f'gridmas_frames_total{{process="{name}"}} {ring.frames}')
+
+    return "\n".join(lines) + "\n"
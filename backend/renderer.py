@@ -2,10 +2,19 @@
     Contains the renderer class that handles frames on the tree
 """
 
-from typing import Optional
+from functools import partial
 import multiprocessing
+from typing import Optional
+import numpy as np
+import numpy.typing as npt
+from frame_ring import FrameRing
 from util import tcolors
 
+
+DRIVERS = ["auto", "ws281x", "sim", "null", "file"]
+"""The pixel drivers which can be picked, auto uses the physical tree if it can and the simulator if not"""
+
+
 class Renderer:
     """ _summary_
 
@@ -15,59 +24,84 @@ class Renderer:
         This module is intended for internal use only. You do not need to use any of this in your pattern code
     """
     
-    def __init__(self, coords: list[tuple[float, float, float]]):
+    def __init__(self, coords: list[tuple[float, float, float]], layout_file: Optional[str] = None, driver: str = "auto", output: Optional[str] = None):
         """__init__ Initialise the renderer
 
         Creates a new instance of Renderer, and selects the correct driver for the tree
 
         Args:
             coords (list[tuple[float, float, float]]): The list of LED positions on the tree
+            layout_file (Optional[str], optional): A json file describing how the LED strips are wired, see pixel_driver/strip_layout.py. Defaults to None.
+            driver (str, optional): Which pixel driver to use, one of DRIVERS. Defaults to "auto".
+            output (Optional[str], optional): Where the file driver saves frames. Defaults to None.
         """
 
-        # create a 10 frame buffer to the pixel driver
-        self.frame_queue: multiprocessing.Queue[Optional[tuple[int, list[int]]]] = multiprocessing.Queue(10)
+        # create a 10 frame buffer in shared memory to the pixel driver
+        self.frame_ring = FrameRing(len(coords), 10)
 
         # select the correct pixel driver for the system, either physical or sim
-        driver = self._pick_driver(len(coords))
-        self.pixel_driver = driver(self.frame_queue, coords)
+        pixel_driver = self._pick_driver(driver, layout_file, output)
+        self.pixel_driver = pixel_driver(self.frame_ring, coords)
 
         self.fps = 45
 
-        process = multiprocessing.Process(target=self.pixel_driver.run, args=())
-        process.start()
+        self.process = multiprocessing.Process(target=self.pixel_driver.run, args=(), daemon=True)
+        self.process.start()
 
-    def add_to_queue(self, frame: list[int], fps: int):
+    def add_to_queue(self, frame: npt.NDArray[np.uint32], fps: int):
         """Add a frame to the queue to be rendered
         This function blocks until there is space in the queue"""
-        self.frame_queue.put((fps, frame))
-        pass
+        self.frame_ring.put(frame, fps)
+
+    def stop(self):
+        """Stop the pixel driver and free the shared memory used to send it frames"""
+        self.process.terminate()
+        self.process.join(1)
+        self.frame_ring.close(unlink=True)
+        self.pixel_driver.times.close(unlink=True)
 
-    def _pick_driver(self, num_leds: int):
+    def _pick_driver(self, driver: str, layout_file: Optional[str], output: Optional[str]):
         """_pick_driver Pick the driver for rendering
 
-        If we have pygame use that, else we can use pixel
+        If the Neopixel library is available use the physical tree, else use the pygame simulator.
+        The null and file drivers don't need a tree or a display, so they can be used for testing and benchmarking
 
         Args:
-            num_leds (int): The number of LEDs to render
+            driver (str): Which driver to use, one of DRIVERS
+            layout_file (Optional[str]): A json file describing how the LED strips are wired, or None to use the default layout
+            output (Optional[str]): Where the file driver saves frames, or None for output.gridmas
 
         Returns:
-            Tree (ws2812_tree.ws2812_tree): Physical tree. Used if there are less than 500 LEDs
-            Tree (ws2812_tree_dual.ws2812_tree_dual): Physical tree. Used if there are more than 500 LEDs
+            Tree (ws281x_tree.ws281x_tree): Physical tree, with the strips set up from the layout
             Tree (sim_tree.SimTree): Simulated tree
+            Tree (null_driver.NullDriver): Throws frames away, timing them
+            Tree (file_driver.FileDriver): Saves frames to a clip
         """
 
-        try:
-            if num_leds > 500:
-                from pixel_driver import ws2812_tree_dual
+        if driver not in DRIVERS:
+            raise ValueError(f"Unknown pixel driver {driver}, use one of {', '.join(DRIVERS)}")
+
+        if driver == "null":
+            from pixel_driver import null_driver
+            return null_driver.NullDriver
+
+        if driver == "file":
+            from pixel_driver import file_driver
+            from tree import tree
+            return partial(file_driver.FileDriver, path=output or "output.gridmas", tree_hash=tree._tree_hash)
 
-                return ws2812_tree_dual.ws2812_tree_dual
-            else:
-                from pixel_driver import ws2812_tree
+        if driver in ("auto", "ws281x"):
+            try:
+                from pixel_driver import ws281x_tree
+                from pixel_driver.strip_layout import StripLayout
 
-                return ws2812_tree.ws2812_tree
+                layout = StripLayout.load(layout_file) if layout_file else None
+                return partial(ws281x_tree.ws281x_tree, layout=layout)
 
-        except ImportError:
-            print(f"{tcolors.WARNING}Using pygame simulator, Neopixels not found{tcolors.ENDC}\n")
+            except ImportError:
+                if driver == "ws281x":
+                    raise
+                print(f"{tcolors.WARNING}Using pygame simulator, Neopixels not found{tcolors.ENDC}\n")
 
-            from pixel_driver import sim_tree
-            return sim_tree.SimTree
+        from pixel_driver import sim_tree
+        return sim_tree.SimTree
@@ -0,0 +1,399 @@
+"""Shapes described by signed distance fields, which can be combined and drawn with soft edges.
+
+   A signed distance field gives the distance from any point to the surface of a shape, negative inside it.
+   Every field is worked out for all the lights at once with NumPy, so a scene made of many shapes joined
+   together still costs one array evaluation per frame rather than a Python call per light. Because the
+   distance is known, not just whether a light is inside, edges can fade out smoothly instead of cutting
+   off hard.
+
+   Use this at the top of your pattern:
+   ```
+   from gridmas import *
+   ```
+"""
+
+import math
+from abc import ABC, abstractmethod
+from typing import Optional
+import numpy as np
+import numpy.typing as npt
+from colors import Color
+from tree import tree
+
+
+Vector = tuple[float, float, float]
+
+
+class SDF(ABC):
+    """A signed distance field, the base of every SDF shape
+
+    Fields can be combined with `|` (union), `&` (intersection) and `-` (subtraction), or blended together
+    with smooth_union()
+
+    Example:
+        ```
+        snowman = SDFSphere((0, 0, 0.5), 0.5).smooth_union(SDFSphere((0, 0, 1.2), 0.35), 0.2)
+
+        def draw():
+            snowman.draw(Color.white(), soft=0.1)
+        ```
+    """
+
+    @abstractmethod
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """distance How far each point is from the surface of the shape
+
+        Args:
+            xyz (npt.NDArray[np.float64]): An (n, 3) array of points
+
+        Returns:
+            npt.NDArray[np.float64]: n distances, negative inside the shape
+        """
+        ...
+
+    def coverage(self, soft: float = 0, xyz: Optional[npt.NDArray[np.float64]] = None) -> npt.NDArray[np.float64]:
+        """coverage How much of each light the shape covers, for blending the shape in
+
+        Args:
+            soft (float, optional): The width of the edge, the shape fades from fully on to off over this
+                distance centered on its surface. 0 gives a hard edge. Defaults to 0.
+            xyz (Optional[npt.NDArray[np.float64]], optional): The points to check. Defaults to every light on the tree.
+
+        Returns:
+            npt.NDArray[np.float64]: One value per point, 1 inside, 0 outside and in between on the edge
+
+        Example:
+            ```
+            ball = SDFSphere((0, 0, 1), 0.5)
+
+            def draw():
+                shade(lambda: mix_colors(Color.blue(), Color.white(), ball.coverage(0.3)))
+            ```
+        """
+        d = self.distance(tree._xyz if xyz is None else xyz)
+        if soft <= 0:
+            return (d <= 0).astype(np.float64)
+
+        # smoothstep from 1 half an edge inside the surface to 0 half an edge outside it
+        x = np.clip(0.5 - d / soft, 0, 1)
+        return x * x * (3 - 2 * x)
+
+    def draw(self, color: Color, soft: float = 0):
+        """draw Draw the shape onto the tree
+
+        Lights fully inside the shape are set to its color, lights on a soft edge are blended between their
+        current color and the shape's color, and lights outside are left alone. The lights are set just like
+        pixel.set_rgb() sets them
+
+        Args:
+            color (Color): The color of the shape
+            soft (float, optional): The width of the edge, see coverage(). Defaults to 0.
+        """
+        c = self.coverage(soft)
+        ids = np.flatnonzero(c > 0)
+        if len(ids) == 0:
+            return
+
+        c = c[ids, np.newaxis]
+        current = tree._buffer.rgb[ids]
+        rgb = current + (np.array(color.to_tuple(), dtype=np.float64) - current) * c
+        tree._buffer.set_colors(np.rint(rgb).astype(np.uint8), ids)
+
+    def __or__(self, other: "SDF") -> "SDF":
+        return SDFUnion(self, other)
+
+    def __and__(self, other: "SDF") -> "SDF":
+        return SDFIntersection(self, other)
+
+    def __sub__(self, other: "SDF") -> "SDF":
+        return SDFSubtraction(self, other)
+
+    def smooth_union(self, other: "SDF", k: float) -> "SDF":
+        """smooth_union Join two shapes with a smooth fillet where they meet, like blobs of liquid
+
+        Args:
+            other (SDF): The shape to join
+            k (float): How far apart the shapes start to blend, bigger is smoother
+
+        Returns:
+            SDF: The joined shape
+        """
+        return SDFSmoothUnion(self, other, k)
+
+
+def _length(v: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return np.sqrt(np.einsum("ij,ij->i", v, v))
+
+
+def _radial(xyz: npt.NDArray[np.float64], center: npt.NDArray[np.float64]) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """The distance of each point from a vertical axis through center, and its height above center"""
+    dx = xyz[:, 0] - center[0]
+    dy = xyz[:, 1] - center[1]
+    return np.sqrt(dx * dx + dy * dy), xyz[:, 2] - center[2]
+
+
+class SDFSphere(SDF):
+    """A ball"""
+
+    def __init__(self, center: Vector, radius: float):
+        """__init__ Create a sphere
+
+        Args:
+            center (Vector): The [x, y, z] center of the sphere
+            radius (float): The radius of the sphere
+        """
+        self.center = np.asarray(center, dtype=np.float64)
+        self.radius = radius
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        return _length(xyz - self.center) - self.radius
+
+
+class SDFBox(SDF):
+    """A box lined up with the axes, optionally with rounded corners"""
+
+    def __init__(self, center: Vector, size: Vector, rounding: float = 0):
+        """__init__ Create a box
+
+        Args:
+            center (Vector): The [x, y, z] center of the box
+            size (Vector): The distance from the center to the faces along x, y and z
+            rounding (float, optional): The radius of the corners, added on to the size. Defaults to 0.
+        """
+        self.center = np.asarray(center, dtype=np.float64)
+        self.size = np.asarray(size, dtype=np.float64)
+        self.rounding = rounding
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        q = np.abs(xyz - self.center) - self.size
+        outside = _length(np.maximum(q, 0))
+        inside = np.minimum(q.max(axis=1), 0)
+        return outside + inside - self.rounding
+
+
+class SDFCapsule(SDF):
+    """A line with rounded ends, a sausage"""
+
+    def __init__(self, a: Vector, b: Vector, radius: float):
+        """__init__ Create a capsule
+
+        Args:
+            a (Vector): The [x, y, z] center of one end
+            b (Vector): The [x, y, z] center of the other end
+            radius (float): The radius of the capsule
+        """
+        self.a = np.asarray(a, dtype=np.float64)
+        self.b = np.asarray(b, dtype=np.float64)
+        self.radius = radius
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        pa = xyz - self.a
+        ba = self.b - self.a
+        length2 = float(ba @ ba)
+        h = np.clip(pa @ ba / length2, 0, 1) if length2 > 0 else np.zeros(len(xyz))
+        return _length(pa - h[:, np.newaxis] * ba) - self.radius
+
+
+class SDFPlane(SDF):
+    """Everything on one side of a flat plane"""
+
+    def __init__(self, point: Vector, normal: Vector = (0, 0, 1)):
+        """__init__ Create a plane
+
+        Args:
+            point (Vector): Any [x, y, z] point on the plane
+            normal (Vector, optional): The direction the plane faces, the outside. Defaults to up, so everything below point is inside.
+        """
+        n = np.asarray(normal, dtype=np.float64)
+        self.point = np.asarray(point, dtype=np.float64)
+        self.normal = n / np.linalg.norm(n)
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        return (xyz - self.point) @ self.normal
+
+
+class SDFCylinder(SDF):
+    """An upright cylinder with flat ends"""
+
+    def __init__(self, base: Vector, radius: float, height: float):
+        """__init__ Create a cylinder
+
+        Args:
+            base (Vector): The [x, y, z] center of the bottom end
+            radius (float): The radius of the cylinder
+            height (float): The height of the cylinder
+        """
+        self.base = np.asarray(base, dtype=np.float64)
+        self.radius = radius
+        self.height = height
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        r, z = _radial(xyz, self.base)
+        half = self.height / 2
+        dr = r - self.radius
+        dz = np.abs(z - half) - half
+        outside = np.hypot(np.maximum(dr, 0), np.maximum(dz, 0))
+        return outside + np.minimum(np.maximum(dr, dz), 0)
+
+
+class SDFCone(SDF):
+    """An upright cone with its point at the top, the shape of the tree"""
+
+    def __init__(self, base: Vector, radius: float, height: float):
+        """__init__ Create a cone
+
+        Args:
+            base (Vector): The [x, y, z] center of the bottom
+            radius (float): The radius of the bottom
+            height (float): The height from the bottom to the point
+        """
+        self.base = np.asarray(base, dtype=np.float64)
+        self.radius = radius
+        self.height = height
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        r, z = _radial(xyz, self.base)
+        half = self.height / 2
+        z = z - half
+
+        # the nearest point on the flat bottom
+        bottom_r = r - np.where(z < 0, np.minimum(r, self.radius), 0)
+        bottom_z = np.abs(z) - half
+
+        # the nearest point on the sloping side, from the rim (radius, -half) to the point (0, half)
+        k2r, k2z = -self.radius, self.height
+        t = np.clip(((-r) * k2r + (half - z) * k2z) / (k2r * k2r + k2z * k2z), 0, 1)
+        side_r = r + k2r * t
+        side_z = z - half + k2z * t
+
+        sign = np.where((side_r < 0) & (bottom_z < 0), -1.0, 1.0)
+        return sign * np.sqrt(np.minimum(bottom_r * bottom_r + bottom_z * bottom_z, side_r * side_r + side_z * side_z))
+
+
+class SDFTorus(SDF):
+    """A flat ring, a doughnut lying on its side"""
+
+    def __init__(self, center: Vector, radius: float, thickness: float):
+        """__init__ Create a torus
+
+        Args:
+            center (Vector): The [x, y, z] center of the ring
+            radius (float): The distance from the center to the middle of the ring
+            thickness (float): The radius of the ring itself
+        """
+        self.center = np.asarray(center, dtype=np.float64)
+        self.radius = radius
+        self.thickness = thickness
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        r, z = _radial(xyz, self.center)
+        return np.hypot(r - self.radius, z) - self.thickness
+
+
+class SDFHelix(SDF):
+    """A spiral wound round the trunk, like the stripes of a candy cane"""
+
+    def __init__(self, radius: float, pitch: float, thickness: float, turn: float = 0, strands: int = 1, center: tuple[float, float] = (0, 0)):
+        """__init__ Create a helix
+
+        Args:
+            radius (float): The distance from the trunk to the middle of the spiral
+            pitch (float): How far up the spiral goes in one turn
+            thickness (float): The radius of the spiral itself
+            turn (float, optional): How far round the trunk the spiral is turned, in radians. Defaults to 0.
+            strands (int, optional): The number of spirals, spaced evenly up the trunk. Defaults to 1.
+            center (tuple[float, float], optional): The [x, y] position of the trunk. Defaults to (0, 0).
+        """
+        self.radius = radius
+        self.pitch = pitch
+        self.thickness = thickness
+        self.turn = turn
+        self.strands = strands
+        self.center = np.array([center[0], center[1], 0], dtype=np.float64)
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        r, z = _radial(xyz, self.center)
+        angle = np.arctan2(xyz[:, 1] - self.center[1], xyz[:, 0] - self.center[0])
+
+        # how far above the nearest strand each point is, measured straight up
+        spacing = self.pitch / self.strands
+        rise = z - (angle - self.turn) / (2 * math.pi) * self.pitch
+        dz = (rise + spacing / 2) % spacing - spacing / 2
+
+        # the strands slope, so the nearest point on one is closer than straight up or down
+        circumference = 2 * math.pi * self.radius
+        slope = circumference / math.hypot(circumference, self.pitch)
+        return np.hypot(r - self.radius, dz * slope) - self.thickness
+
+
+class SDFUnion(SDF):
+    """Every point inside any of the shapes, made with `a | b`"""
+
+    def __init__(self, *fields: SDF):
+        """__init__ Join shapes together
+
+        Args:
+            *fields (SDF): The shapes
+        """
+        self.fields = fields
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        return np.minimum.reduce([f.distance(xyz) for f in self.fields])
+
+
+class SDFIntersection(SDF):
+    """Only the points inside all of the shapes, made with `a & b`"""
+
+    def __init__(self, *fields: SDF):
+        """__init__ Keep where shapes overlap
+
+        Args:
+            *fields (SDF): The shapes
+        """
+        self.fields = fields
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        return np.maximum.reduce([f.distance(xyz) for f in self.fields])
+
+
+class SDFSubtraction(SDF):
+    """One shape with another cut out of it, made with `a - b`"""
+
+    def __init__(self, a: SDF, b: SDF):
+        """__init__ Cut one shape out of another
+
+        Args:
+            a (SDF): The shape to keep
+            b (SDF): The shape to cut out of it
+        """
+        self.a = a
+        self.b = b
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        return np.maximum(self.a.distance(xyz), -self.b.distance(xyz))
+
+
+class SDFSmoothUnion(SDF):
+    """Two shapes joined with a smooth fillet, made with a.smooth_union(b, k)"""
+
+    def __init__(self, a: SDF, b: SDF, k: float):
+        """__init__ Blend two shapes together
+
+        Args:
+            a (SDF): The first shape
+            b (SDF): The second shape
+            k (float): How far apart the shapes start to blend, bigger is smoother
+        """
+        self.a = a
+        self.b = b
+        self.k = k
+
+    def distance(self, xyz: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        da = self.a.distance(xyz)
+        db = self.b.distance(xyz)
+        if self.k <= 0:
+            return np.minimum(da, db)
+
+        # polynomial smooth minimum
+        h = np.clip(0.5 + 0.5 * (db - da) / self.k, 0, 1)
+        return db + (da - db) * h - self.k * h * (1 - h)
@@ -0,0 +1,150 @@
+"""Color the whole tree at once with a shader, a function of where each pixel is and when it is.
+
+   Instead of looping over pixels() and working out each color in turn, write a function which works on
+   every pixel at the same time. Its arguments are NumPy arrays with one value per pixel, so ordinary maths
+   like `+` and `*` and the NumPy functions (`np.sin`, `np.where`...) work out the colors of the whole tree
+   in one go. This is much faster than a Python loop, which matters on a tree with a lot of pixels.
+
+   Use this at the top of your pattern:
+   ```
+   from gridmas import *
+   ```
+"""
+
+import inspect
+import time
+from typing import Any, Callable, Union
+import numpy as np
+import numpy.typing as npt
+from colors import Color
+from tree import tree
+
+
+SHADER_ARGS = ["x", "y", "z", "a", "d", "h", "frame", "t"]
+"""The arguments a shader can ask for, by name"""
+
+ShaderResult = Union[Color, tuple[Any, Any, Any], npt.NDArray[Any]]
+"""What a shader returns: a Color, a tuple of red, green and blue arrays (or numbers), or an (n, 3) array"""
+
+_shader_args: dict[Any, tuple[list[str], bool]] = {}
+"""The arguments each shader function asks for, and whether it takes **kwargs, by its code object"""
+
+
+def _arguments(fn: Callable[..., ShaderResult]) -> tuple[list[str], bool]:
+    code = getattr(fn, "__code__", fn)
+    cached = _shader_args.get(code)
+    if cached is not None:
+        return cached
+
+    names: list[str] = []
+    takes_all = False
+    for param in inspect.signature(fn).parameters.values():
+        if param.kind == inspect.Parameter.VAR_KEYWORD:
+            takes_all = True
+        elif param.name in SHADER_ARGS:
+            names.append(param.name)
+        elif param.default is inspect.Parameter.empty:
+            raise TypeError(f"shade() doesn't know what to pass as '{param.name}', a shader can ask for {', '.join(SHADER_ARGS)}")
+
+    _shader_args[code] = (names, takes_all)
+    return names, takes_all
+
+
+def _value(name: str) -> Any:
+    match name:
+        case "x":
+            return tree._xyz[:, 0]
+        case "y":
+            return tree._xyz[:, 1]
+        case "z":
+            return tree._xyz[:, 2]
+        case "a":
+            return tree._a
+        case "d":
+            return tree._d
+        case "h":
+            return tree._h
+        case "frame":
+            return tree._frame
+        case "t":
+            return time.time() - tree._pattern_started_at
+    raise TypeError(f"Unknown shader argument '{name}'")
+
+
+def shade(fn: Callable[..., ShaderResult]):
+    """shade Set the color of every pixel from a shader function
+
+    The shader is called once, with whichever of these arguments it asks for by name:
+
+    - x, y, z: the position of every pixel
+    - a: the angle of every pixel around the trunk, in radians, the same as pixel.a
+    - d: the distance of every pixel from the trunk, the same as pixel.d
+    - h: the height of every pixel as a fraction of the height of the tree, 0 at the bottom and 1 at the top
+    - frame: the current frame number, the same as frame()
+    - t: the number of seconds since the pattern started, with the fractions of a second
+
+    All but frame and t are arrays with one value per pixel. It returns the red, green and blue of every pixel,
+    as a tuple of three arrays (or plain numbers, which are used for every pixel), an (n, 3) array or a Color.
+    Values are between 0 and 255 and anything outside that is clamped.
+
+    The pixels are set just like pixel.set_rgb() sets them, so shaders can be mixed with the classic per-pixel
+    api, shapes and background() in the same pattern.
+
+    Args:
+        fn (Callable[..., ShaderResult]): The shader
+
+    Example:
+        ```
+        def rainbow(h, t):
+            return np.sin(h * 6 + t) * 127 + 128, 0, np.cos(h * 6 + t) * 127 + 128
+
+        def draw():
+            shade(rainbow)
+        ```
+    """
+    names, takes_all = _arguments(fn)
+    if takes_all:
+        names = SHADER_ARGS
+    result = fn(**{name: _value(name) for name in names})
+
+    n = tree._num_pixels
+    if isinstance(result, Color):
+        tree._buffer.fill(*result.to_tuple())
+        return
+
+    rgb = np.empty((n, 3), dtype=np.float64)
+    if isinstance(result, np.ndarray) and result.ndim == 2:
+        rgb[:] = result
+    else:
+        r, g, b = result
+        rgb[:, 0] = r
+        rgb[:, 1] = g
+        rgb[:, 2] = b
+
+    np.clip(rgb, 0, 255, out=rgb)
+    tree._buffer.set_colors(rgb.astype(np.uint8))
+
+
+def mix_colors(a: Color, b: Color, x: npt.ArrayLike) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """mix_colors The array version of Color.mix(), for shaders
+
+    Args:
+        a (Color): The color when x is 0
+        b (Color): The color when x is 1
+        x (npt.ArrayLike): How far between the colors each pixel is, 0-1
+
+    Returns:
+        tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]]: The red, green and blue of each pixel
+
+    Example:
+        ```
+        def draw():
+            shade(lambda h: mix_colors(Color.red(), Color.blue(), h))
+        ```
+    """
+    x = np.asarray(x, dtype=np.float64)
+    return (
+        a.r + (b.r - a.r) * x,
+        a.g + (b.g - a.g) * x,
+        a.b + (b.b - a.b) * x,
+    )
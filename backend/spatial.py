@@ -0,0 +1,231 @@
+"""A spatial index over the lights on the tree, used to quickly find which lights are near a point or inside a box
+   without checking every light on the tree.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+import math
+import numpy as np
+import numpy.typing as npt
+
+
+class UniformGrid:
+    """A uniform grid of cells covering the tree, each light is stored in the cell it falls inside
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, points: npt.NDArray[np.float64], per_cell: float = 4):
+        """__init__ Build the grid
+
+        The cell size is picked so that there are roughly per_cell lights in each cell
+
+        Args:
+            points (npt.NDArray[np.float64]): An (n, 3) array of light positions
+            per_cell (float, optional): The average number of lights per cell to aim for. Defaults to 4.
+        """
+        size = np.maximum(points.max(axis=0) - points.min(axis=0), 1e-6)
+        volume = float(np.prod(size))
+        self._layout(points, max(math.pow(volume / max(len(points), 1) * per_cell, 1 / 3), 1e-6))
+
+        cells = self._cell_ids(self._cell_of(points))
+
+        # lights sorted by the cell they are in, cell i holds order[start[i]:start[i + 1]]
+        self.order = np.argsort(cells, kind="stable")
+        counts = np.bincount(cells, minlength=int(np.prod(self.shape)))
+        self.start = np.concatenate(([0], np.cumsum(counts)))
+
+    @classmethod
+    def restore(cls, points: npt.NDArray[np.float64], order: npt.NDArray[np.intp], start: npt.NDArray[np.intp], cell_size: float) -> "UniformGrid":
+        """restore Recreate a grid from the arrays of one that was built earlier
+
+        Args:
+            points (npt.NDArray[np.float64]): The (n, 3) array of light positions the grid was built from
+            order (npt.NDArray[np.intp]): The order array of the earlier grid
+            start (npt.NDArray[np.intp]): The start array of the earlier grid
+            cell_size (float): The cell size of the earlier grid
+
+        Returns:
+            UniformGrid: A grid equivalent to the earlier one
+        """
+        grid = cls.__new__(cls)
+        grid._layout(points, cell_size)
+        grid.order = order
+        grid.start = start
+        return grid
+
+    def _layout(self, points: npt.NDArray[np.float64], cell_size: float):
+        self.points = points
+        self.lower = points.min(axis=0)
+        self.upper = points.max(axis=0)
+        self.cell_size = cell_size
+        size = np.maximum(self.upper - self.lower, 1e-6)
+        self.shape = np.maximum(np.ceil(size / self.cell_size).astype(np.int64), 1)
+
+    def _cell_of(self, points: npt.NDArray[np.float64]) -> npt.NDArray[np.int64]:
+        cell = np.floor((points - self.lower) / self.cell_size).astype(np.int64)
+        return np.clip(cell, 0, self.shape - 1)
+
+    def _cell_ids(self, cells: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        return cells[..., 0] + self.shape[0] * (cells[..., 1] + self.shape[1] * cells[..., 2])
+
+    def candidates(self, lower: tuple[float, float, float], upper: tuple[float, float, float]) -> npt.NDArray[np.intp]:
+        """candidates Find the lights in every cell which overlaps a box
+
+        This may include lights which are just outside the box, use query_box() for an exact answer
+
+        Args:
+            lower (tuple[float, float, float]): The lowest x, y and z corner of the box
+            upper (tuple[float, float, float]): The highest x, y and z corner of the box
+
+        Returns:
+            npt.NDArray[np.intp]: The ids of the lights, in no particular order
+        """
+        lo = np.asarray(lower, dtype=np.float64)
+        hi = np.asarray(upper, dtype=np.float64)
+        if np.any(hi < self.lower) or np.any(lo > self.upper):
+            return np.empty(0, dtype=np.intp)
+
+        lo_cell = self._cell_of(lo)
+        hi_cell = self._cell_of(hi)
+
+        # cells along x are stored next to each other, so each (y, z) row of the box is one slice
+        ys = np.arange(lo_cell[1], hi_cell[1] + 1)
+        zs = np.arange(lo_cell[2], hi_cell[2] + 1)
+        rows = (self.shape[0] * (ys[np.newaxis, :] + self.shape[1] * zs[:, np.newaxis])).ravel()
+        starts = self.start[rows + lo_cell[0]]
+        ends = self.start[rows + hi_cell[0] + 1]
+
+        if len(rows) == 1:
+            return self.order[starts[0]:ends[0]]
+        return np.concatenate([self.order[s:e] for s, e in zip(starts.tolist(), ends.tolist())])
+
+    def query_box(self, lower: tuple[float, float, float], upper: tuple[float, float, float]) -> npt.NDArray[np.intp]:
+        """query_box Find the lights inside a box
+
+        Args:
+            lower (tuple[float, float, float]): The lowest x, y and z corner of the box
+            upper (tuple[float, float, float]): The highest x, y and z corner of the box
+
+        Returns:
+            npt.NDArray[np.intp]: The ids of the lights inside the box, sorted by id
+        """
+        ids = self.candidates(lower, upper)
+        points = self.points[ids]
+        inside = np.all((points >= lower) & (points <= upper), axis=1)
+        return np.sort(ids[inside])
+
+    def within(self, point: tuple[float, float, float], radius: float) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]:
+        """within Find the lights closer to a point than the radius
+
+        Args:
+            point (tuple[float, float, float]): The [x, y, z] point to measure from
+            radius (float): Only lights closer than this are returned
+
+        Returns:
+            tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]: The ids of the lights and their distances, nearest first
+        """
+        p = np.asarray(point, dtype=np.float64)
+        ids, distances = self._sorted_by_distance(p, self.candidates(tuple(p - radius), tuple(p + radius)))
+        inside = distances < radius
+        return ids[inside], distances[inside]
+
+    def shell(self, point: tuple[float, float, float], inner: float, outer: float) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]:
+        """shell Find the lights further from a point than inner but closer than outer
+
+        Args:
+            point (tuple[float, float, float]): The [x, y, z] point to measure from
+            inner (float): Only lights further away than this are returned
+            outer (float): Only lights closer than this are returned
+
+        Returns:
+            tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]: The ids of the lights and their distances, nearest first
+        """
+        ids, distances = self.within(point, outer)
+        outside = distances > inner
+        return ids[outside], distances[outside]
+
+    def nearest(self, point: tuple[float, float, float], n: int) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]:
+        """nearest Find the n lights closest to a point
+
+        Args:
+            point (tuple[float, float, float]): The [x, y, z] point to measure from
+            n (int): How many lights to find
+
+        Returns:
+            tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]: The ids of the lights and their distances, nearest first
+        """
+        p = np.asarray(point, dtype=np.float64)
+        n = min(n, len(self.points))
+        radius = self.cell_size
+
+        # grow the search box until it holds n lights within the radius, nothing outside the box can be closer than those
+        while True:
+            lo = p - radius
+            hi = p + radius
+            ids, distances = self._sorted_by_distance(p, self.candidates(tuple(lo), tuple(hi)))
+            covers_all = np.all(lo <= self.lower) and np.all(hi >= self.upper)
+            if covers_all or np.count_nonzero(distances <= radius) >= n:
+                return ids[:n], distances[:n]
+            radius *= 2
+
+    def pairs_within(self, points: npt.NDArray[np.float64], radii: npt.NDArray[np.float64]) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+        """pairs_within Find the lights inside each of many spheres at once
+
+        Every sphere is looked up in the same pass, without a Python loop over the spheres
+
+        Args:
+            points (npt.NDArray[np.float64]): An (m, 3) array of sphere centers
+            radii (npt.NDArray[np.float64]): The m radii
+
+        Returns:
+            tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]: For every light inside a sphere, the index of the sphere
+                and the id of the light. Pairs are in order of the spheres
+        """
+        empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp))
+        if len(points) == 0:
+            return empty
+
+        lo = points - radii[:, np.newaxis]
+        hi = points + radii[:, np.newaxis]
+        overlaps = np.flatnonzero(np.all(hi >= self.lower, axis=1) & np.all(lo <= self.upper, axis=1))
+        if len(overlaps) == 0:
+            return empty
+
+        lo_cell = self._cell_of(lo[overlaps])
+        hi_cell = self._cell_of(hi[overlaps])
+
+        # every sphere checks a block of cells as big as the biggest sphere's, the cells past its own box are dropped
+        span = (hi_cell - lo_cell).max(axis=0) + 1
+        offsets = np.stack(np.meshgrid(*(np.arange(s) for s in span), indexing="ij"), axis=-1).reshape(-1, 3)
+        cells = lo_cell[:, np.newaxis, :] + offsets[np.newaxis, :, :]
+        valid = np.all(cells <= hi_cell[:, np.newaxis, :], axis=2)
+
+        owners = np.repeat(overlaps, len(offsets)).reshape(len(overlaps), -1)[valid]
+        cell_ids = self._cell_ids(cells[valid])
+
+        # expand each cell into the lights it holds. The arrays may be memory mapped from the tree cache,
+        # plain views of them are much quicker to index
+        start = np.asarray(self.start)
+        starts = start[cell_ids]
+        counts = start[cell_ids + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return empty
+        owners = np.repeat(owners, counts)
+        first = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        lights = np.asarray(self.order)[first + np.arange(total)]
+
+        offsets3 = np.asarray(self.points)[lights] - points[owners]
+        inside = np.einsum("ij,ij->i", offsets3, offsets3) <= radii[owners] ** 2
+        return owners[inside], lights[inside]
+
+    def _sorted_by_distance(self, point: npt.NDArray[np.float64], ids: npt.NDArray[np.intp]) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]:
+        offsets = self.points[ids] - point
+        distances = np.sqrt(np.einsum("ij,ij->i", offsets, offsets))
+
+        # ties are broken by id so results don't depend on how the grid is laid out
+        order = np.lexsort((ids, distances))
+        return ids[order], distances[order]
@@ -0,0 +1,58 @@
+"""Round trip tests for the .gridmas clip format, run from the backend folder with:
+   ```
+   python -m pytest test_clip.py
+   ```
+"""
+
+import numpy as np
+import pytest
+from clip import Clip, ClipWriter
+
+
+NUM_LEDS = 500
+TREE_HASH = "ab" * 32
+
+
+def random_frames(count: int, seed: int = 0) -> list[np.ndarray]:
+    """Frames where some LEDs change every frame and the rest keep their color, like a real pattern"""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 2 ** 24, NUM_LEDS, dtype=np.uint32)
+    frames = []
+    for _ in range(count):
+        frame = frame.copy()
+        changed = rng.random(NUM_LEDS) < 0.2
+        frame[changed] = rng.integers(0, 2 ** 24, changed.sum(), dtype=np.uint32)
+        frames.append(frame)
+    return frames
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip(tmp_path, compress):
+    # 25 frames with keyframes every 10 crosses two keyframes and ends part way between them
+    frames = random_frames(25)
+    path = str(tmp_path / "clip.gridmas")
+
+    writer = ClipWriter(path, 30, NUM_LEDS, TREE_HASH, compress, keyframe_interval=10)
+    for frame in frames:
+        writer.add(frame)
+    writer.close()
+
+    clip = Clip(path)
+    try:
+        assert clip.compressed == compress
+        assert (clip.fps, clip.num_leds, clip.frame_count) == (30, NUM_LEDS, len(frames))
+        assert clip.check(NUM_LEDS, TREE_HASH)
+
+        for frame in frames:
+            np.testing.assert_array_equal(clip.next_frame(), frame)
+
+        # playback loops back to the first frame
+        np.testing.assert_array_equal(clip.next_frame(), frames[0])
+
+        # and can jump straight to a frame past a keyframe
+        np.testing.assert_array_equal(clip.frame(17), frames[17])
+
+        clip.reset()
+        np.testing.assert_array_equal(clip.next_frame(), frames[0])
+    finally:
+        clip.close()
@@ -0,0 +1,117 @@
+"""Crossfades between patterns, so changing pattern isn't a hard cut.
+
+   While a transition runs both patterns are drawn every frame, each with its own part of the tree (its own
+   frame buffer, pixels, shapes and clock, see tree.TreeState), and the two frames are blended together.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+import time
+from types import GeneratorType, ModuleType
+from typing import Literal, Optional
+import numpy as np
+import numpy.typing as npt
+from clip import Clip
+from frame_buffer import pack_rgb, unpack_rgb
+from tree import TreeState, tree
+from util import ease_in_out_sine, tcolors
+
+
+TransitionStyle = Literal["fade", "wipe"]
+"""How the new pattern replaces the old one: fading in over the whole tree, or wiping up from the bottom"""
+
+TRANSITION_STYLES: tuple[TransitionStyle, ...] = ("fade", "wipe")
+
+WIPE_EDGE = 0.2
+"""How soft the edge of a wipe is, as a fraction of the height of the tree"""
+
+
+class Transition:
+    """The pattern that is being faded out, and how far through the transition it is
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, pattern: ModuleType | Clip, generator: Optional[GeneratorType], state: TreeState, frames: int, style: TransitionStyle = "fade"):
+        """__init__ Start fading out a pattern
+
+        Args:
+            pattern (ModuleType | Clip): The outgoing pattern
+            generator (Optional[GeneratorType]): The outgoing pattern's generator, if its draw() yields
+            state (TreeState): The outgoing pattern's part of the tree
+            frames (int): How many frames the transition takes
+            style (TransitionStyle, optional): How the patterns are blended. Defaults to "fade".
+        """
+        if style not in TRANSITION_STYLES:
+            raise ValueError(f"Unknown transition '{style}', use one of {', '.join(TRANSITION_STYLES)}")
+
+        self.pattern = pattern
+        self.generator = generator
+        self.state = state
+        self.frames = max(frames, 1)
+        self.style = style
+        self.frame = 0
+
+        self.held: Optional[npt.NDArray[np.uint32]] = None
+        """The outgoing pattern's last frame, shown again when there isn't time to draw a new one"""
+
+        self.draw_time = 0.0
+        """How long the outgoing pattern took to draw its last frame, in seconds"""
+
+    @property
+    def finished(self) -> bool:
+        """Whether the new pattern has completely replaced the old one"""
+        return self.frame >= self.frames
+
+    def draw(self) -> bool:
+        """draw Draw the next frame of the outgoing pattern
+
+        Returns:
+            bool: False if the pattern stopped or had an error, the transition should end
+        """
+        started = time.perf_counter()
+        try:
+            if isinstance(self.pattern, Clip):
+                self.held = self.pattern.next_frame()
+            else:
+                with tree._using_state(self.state):
+                    if self.generator:
+                        next(self.generator)
+                    else:
+                        res = self.pattern.draw()
+                        if isinstance(res, GeneratorType):
+                            self.generator = res
+                    self.held = tree._request_frame()
+        except Exception as e:
+            print(f"{tcolors.FAIL}The pattern being faded out had an error, ending the transition | {e!r}{tcolors.ENDC}")
+            return False
+        finally:
+            self.draw_time = time.perf_counter() - started
+        return True
+
+    def mix(self, frame: npt.NDArray[np.uint32]) -> npt.NDArray[np.uint32]:
+        """mix Blend the incoming pattern's frame with the outgoing one's and move the transition on a frame
+
+        Args:
+            frame (npt.NDArray[np.uint32]): The incoming pattern's frame
+
+        Returns:
+            npt.NDArray[np.uint32]: The frame to show
+        """
+        self.frame += 1
+        if self.held is None:
+            return frame
+
+        progress = min(self.frame / self.frames, 1)
+        if self.style == "wipe":
+            # the new pattern shows below the edge, which rises from below the tree to above it
+            weight = np.clip((progress * (1 + WIPE_EDGE) - tree._h) / WIPE_EDGE, 0, 1)[:, np.newaxis]
+        else:
+            weight = ease_in_out_sine(progress)
+
+        old = unpack_rgb(self.held).astype(np.float32)
+        new = unpack_rgb(frame).astype(np.float32)
+        rgb = old + (new - old) * weight
+        return pack_rgb(np.rint(rgb).astype(np.uint8))
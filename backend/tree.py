@@ -1,14 +1,42 @@
 """Contains all the methods you need to change the tree. (Where the magic happens)"""
 
+import contextlib
 from math import dist
 import math
-from typing import Callable, Optional, Union, overload
-from util import  linear, read_tree_csv
+from typing import Callable, Iterator, Optional, Union, overload
+from util import  linear
 import time
 from colors import Color, Pixel
+from frame_buffer import FrameBuffer, pack_rgb
+from render_stats import LOOP_STAGES, TimingRing
+from tree_cache import load_tree_geometry
+import numpy as np
+import numpy.typing as npt
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from geometry import Shape
+    from layers import Layer
+
+
+PATTERN_STATE = ("_buffer", "_pixels", "_shapes", "_kept_shapes", "_layers", "_background", "_fps", "_frame", "_pattern_started_at")
+"""The parts of the tree which belong to the running pattern, the rest is the shape of the tree and is shared"""
+
+
+class TreeState:
+    """For internal use
+    The parts of the tree which belong to one pattern, so two patterns can be drawn at once by swapping them in and out"""
+
+    def __init__(self, tree: "Tree"):
+        self.capture(tree)
+
+    def capture(self, tree: "Tree"):
+        """capture Copy the pattern's part of the tree into the state
+
+        Args:
+            tree (Tree): The tree
+        """
+        for name in PATTERN_STATE:
+            setattr(self, name, getattr(tree, name))
 
 
 class Tree():
@@ -18,35 +46,57 @@ class Tree():
         pass
 
 
-    def init(self, tree_file: str):
+    def init(self, tree_file: str, use_cache: bool = True):
         """For internal use
-        Initialise / reset the tree"""
-        
-        self._coords = read_tree_csv(tree_file)
+        Initialise / reset the tree
+
+        The geometry derived from the tree file is cached on disk next to it, set use_cache to False to always recompute it"""
+
+        coords, geometry = load_tree_geometry(tree_file, use_cache)
+
+        self._coords = coords
         """The coordinates of all lights on the tree"""
 
         self._num_pixels = int(len(self._coords))
         """The number of pixels on the tree"""
 
-        self._height = max([x[2] for x in self._coords])
+        self._height = geometry.height
         """The height of the tree"""
 
+        self._tree_hash = geometry.tree_hash
+        """The sha256 of the tree file, identifies which tree the coordinates came from"""
+
+        self._xyz = geometry.xyz
+        """The coordinates of all lights on the tree as an (n, 3) array"""
+
+        self._a = geometry.a
+        """The polar angle of every light, the same as pixel.a"""
+
+        self._d = geometry.d
+        """The distance of every light from the trunk, the same as pixel.d"""
+
+        self._h = self._xyz[:, 2] / self._height if self._height else np.zeros(self._num_pixels)
+        """The height of every light as a fraction of the height of the tree"""
+
+        self._grid = geometry.grid
+        """Spatial index of the lights, for finding the lights near a point"""
+
+        self._buffer = FrameBuffer(self._num_pixels)
+        """The colors and lerp state of every pixel, the pixels are views onto this"""
+
         self._pixels: list[Pixel] = [Pixel(i, (x[0], x[1], x[2]), self) for i, x in enumerate(self._coords)]
         """The list of all pixels on the tree"""
 
-        # 2d array, cols from, rows to -> dist
-        self._distances = self._generate_distance_map()
-        """2d array, cols from, rows to -> dist"""
-
-        # 2d array, cols from id, rows sorted array of distance
-        self._pixel_distance_matrix = self._generate_pixel_distances()
-        """2d array, cols from id, rows sorted array of distance"""
+        # the full distance matrices are O(n^2), so they are only built if something asks for them.
+        # Pixel.distance_to(), nearest() and within() use the grid instead
+        self._distance_map: Optional[npt.NDArray[np.float64]] = None
+        self._sorted_distances: Optional[list[list[tuple[Pixel, float]]]] = None
 
         self._last_update = time.perf_counter()
         """When the last update took place"""
         
-        self._render_times: list[float] = []
-        """A list of the render times for frames"""
+        self._render_times = TimingRing(LOOP_STAGES)
+        """How long each stage of the main loop took for the recent frames"""
 
         self._pattern_started_at = time.time()
         self._frame = 0
@@ -54,6 +104,12 @@ class Tree():
 
         self._shapes: list[Shape] = []
         """The list of shapes that the tree can draw"""
+
+        self._kept_shapes: list[Shape] = []
+        """Shapes which are drawn every frame until they are removed, see Shape.keep()"""
+
+        self._layers: list[Layer] = []
+        """Layers blended over the frame, bottom first"""
         
         self._background = None
         self._fps = 45
@@ -61,69 +117,148 @@ class Tree():
     def _pattern_reset(self):
         self._pattern_started_at = time.time()
         self._frame = 0
+        self._kept_shapes = []
+        self._layers = []
         self._background = None
         self._fps = 45
 
-    def _request_frame(self):
+    def _save_state(self) -> TreeState:
+        """For internal use
+        The running pattern's part of the tree, see PATTERN_STATE"""
+        return TreeState(self)
+
+    def _load_state(self, state: TreeState):
+        """For internal use
+        Swap in a pattern's part of the tree"""
+        for name in PATTERN_STATE:
+            setattr(self, name, getattr(state, name))
+
+    @contextlib.contextmanager
+    def _using_state(self, state: TreeState) -> Iterator[None]:
+        """For internal use
+        Draw with another pattern's part of the tree, changes made inside are kept in the state"""
+        current = self._save_state()
+        self._load_state(state)
+        try:
+            yield
+        finally:
+            state.capture(self)
+            self._load_state(current)
+
+    def _new_state(self) -> TreeState:
+        """For internal use
+        A blank part of the tree for a pattern, with its own frame buffer and pixels"""
+        current = self._save_state()
+        self._buffer = FrameBuffer(self._num_pixels)
+        self._pixels = [Pixel(i, (x[0], x[1], x[2]), self) for i, x in enumerate(self._coords)]
+        self._shapes = []
+        self._pattern_reset()
+        state = self._save_state()
+        self._load_state(current)
+        return state
+
+    def _request_frame(self) -> npt.NDArray[np.uint32]:
         """For internal use
-        return the current pixel buffer"""
-        colors: list[int] = []
-
-        # loop for every pixel and determine what color it should be
-        for i in range(self._num_pixels):
-
-            # 1. check if the pixel has been directly changed
-            if self._pixels[i]._changed:
-                colors.append(self._pixels[i].to_bit_string())
-                self._pixels[i]._changed = False
-                continue
-
-            # 2. check for objects
-            changed = False
-            for shape in reversed(self._shapes):
-                c = shape.does_draw(self._pixels[i])
-                if c is not None:
-                    colors.append(c.to_bit_string())
-                    self._pixels[i].set(c)
-                    changed = True
-                    break
-            if changed:
-                continue
+        return the current pixel buffer, encoded as GGGGGGGGRRRRRRRRBBBBBBBB words"""
+        buffer = self._buffer
+
+        # 1. pixels which have been directly changed are drawn as they are
+        remaining = ~buffer.changed
+        buffer.changed[:] = False
+
+        # 2. check for objects, the most recently added shape is on top so it gets the first pick of the pixels.
+        #    Shapes made this frame are on top of kept shapes
+        for shape in reversed(self._shapes):
+            self._draw_shape(shape, remaining, False)
+        for shape in reversed(self._kept_shapes):
+            self._draw_shape(shape, remaining, True)
+
+        # default last color used.
+        if self._layers:
+            colors = self._composite(remaining)
+        else:
+            colors = buffer.packed()
 
             # 3. check for background
             if self._background:
-                colors.append(self._background.to_bit_string())
-                continue
+                colors[remaining] = self._background.to_bit_string()
 
-            # default last color used.
-            colors.append(self._pixels[i].to_bit_string())
-
-        for i in range(self._num_pixels):
-            self._pixels[i].cont_lerp()
+        buffer.advance_lerps()
 
         self._shapes = []
         self._frame += 1
 
         return colors
 
-    def _generate_distance_map(self) -> list[list[float]]:
-        ret: list[list[float]] = []
-        for fr in self._coords:
-            inter: list[float] = []
-            for to in self._coords:
-                inter.append(dist([x for x in fr], [x for x in to]))
-            ret.append(inter)
-        return ret
+    def _composite(self, remaining: npt.NDArray[np.bool_]) -> npt.NDArray[np.uint32]:
+        rgb = self._buffer.rgb.astype(np.float32)
+
+        # 3. check for background
+        if self._background:
+            rgb[remaining] = self._background.to_tuple()
+
+        # 4. blend the layers over everything else, bottom first
+        for layer in self._layers:
+            layer._blend(rgb)
+
+        np.rint(rgb, out=rgb)
+        return pack_rgb(rgb.astype(np.uint8))
+
+    def _draw_shape(self, shape: "Shape", remaining: npt.NDArray[np.bool_], kept: bool):
+        buffer = self._buffer
+
+        # kept shapes remember the pixels they cover until they move
+        covered = shape.covered() if kept else None
+        if covered is not None:
+            hit = covered[remaining[covered]]
+            buffer.fill(*shape.color.to_tuple(), ids=hit)
+            remaining[hit] = False
+            return
+
+        box = shape.bounds()
+        if box is None:
+            candidates = np.flatnonzero(remaining)
+        else:
+            candidates = self._grid.candidates(*box)
+            candidates = candidates[remaining[candidates]]
+
+        mask = shape.rasterize(self._xyz[candidates])
+        if mask is not None:
+            hit = candidates[mask]
+            buffer.fill(*shape.color.to_tuple(), ids=hit)
+            remaining[hit] = False
+            return
+
+        # shapes without a batched path are checked one pixel at a time
+        for i in candidates.tolist():
+            c = shape.does_draw(self._pixels[i])
+            if c is not None:
+                self._pixels[i].set(c)
+                remaining[i] = False
+
+    @property
+    def _distances(self) -> npt.NDArray[np.float64]:
+        """2d array, cols from, rows to -> dist"""
+        if self._distance_map is None:
+            self._distance_map = self._generate_distance_map()
+        return self._distance_map
+
+    @property
+    def _pixel_distance_matrix(self) -> list[list[tuple[Pixel, float]]]:
+        """2d array, cols from id, rows sorted array of distance"""
+        if self._sorted_distances is None:
+            self._sorted_distances = self._generate_pixel_distances()
+        return self._sorted_distances
+
+    def _generate_distance_map(self) -> npt.NDArray[np.float64]:
+        offsets = self._xyz[:, np.newaxis, :] - self._xyz[np.newaxis, :, :]
+        return np.sqrt(np.einsum("ijk,ijk->ij", offsets, offsets))
 
     def _generate_pixel_distances(self) -> list[list[tuple[Pixel, float]]]:
         ret: list[list[tuple[Pixel, float]]] = []
-        for i in range(len(self._coords)):
-            distances: list[tuple[Pixel, float]] = []
-            for j in range(len(self._coords)):
-                distances.append((self._pixels[j], self._distances[i][j]))
-
-            ret.append(sorted(distances, key=lambda x: x[1]))
-            pass
+        for row in self._distances:
+            order = np.argsort(row, kind="stable")
+            ret.append([(self._pixels[j], d) for j, d in zip(order.tolist(), row[order].tolist())])
 
         return ret
 
@@ -166,6 +301,52 @@ def pixels(n: Optional[int] = None) -> Union["Pixel", list["Pixel"]]:
     else:
         return tree._pixels[n]
 
+def pixels_within(point: tuple[float, float, float], r: float) -> list["Pixel"]:
+    """The pixels closer to a point than a distance, nearest first
+
+    The point can be anywhere, not just on a pixel. Only the pixels near the point are checked, so this is quick
+
+    Args:
+        point (tuple[float, float, float]): The [x, y, z] point to measure from
+        r (float): The distance
+
+    Examples:
+        for pixel in pixels_within((0, 0, height() / 2), 0.5):
+            pixel.set_rgb(255, 0, 0)
+    """
+    ids, _ = tree._grid.within(point, r)
+    return [tree._pixels[i] for i in ids.tolist()]
+
+def nearest_pixels(point: tuple[float, float, float], n: int) -> list[tuple["Pixel", float]]:
+    """The n pixels closest to a point, nearest first, with their distances
+
+    Args:
+        point (tuple[float, float, float]): The [x, y, z] point to measure from
+        n (int): How many pixels to find
+
+    Examples:
+        for pixel, distance in nearest_pixels((0, 0, 1), 10):
+            pixel.set_rgb(0, 0, 255)
+    """
+    ids, distances = tree._grid.nearest(point, n)
+    return [(tree._pixels[i], d) for i, d in zip(ids.tolist(), distances.tolist())]
+
+def pixels_in_shell(point: tuple[float, float, float], r0: float, r1: float) -> list["Pixel"]:
+    """The pixels in a hollow ball around a point, further than r0 but closer than r1, nearest first
+
+    Args:
+        point (tuple[float, float, float]): The [x, y, z] center of the ball
+        r0 (float): The inside radius of the shell
+        r1 (float): The outside radius of the shell
+
+    Examples:
+        # a ring which grows outwards
+        for pixel in pixels_in_shell((0, 0, 1), frame() / 50, frame() / 40):
+            pixel.set_rgb(255, 255, 255)
+    """
+    ids, _ = tree._grid.shell(point, r0, r1)
+    return [tree._pixels[i] for i in ids.tolist()]
+
 def set_pixel(n: int, color: Color):
     """Set the Nth light in the strip to the specified color
 
@@ -208,9 +389,7 @@ def fade(n: int = 10):
             fade(10)
         ```
     """
-    c = Color.black()
-    for pixel in tree._pixels:
-        pixel.lerp(c, n)
+    tree._buffer.set_lerp((0, 0, 0), n, linear)
 
 def background(c: Color):
     """Set the background color of the tree
@@ -235,8 +414,7 @@ def fill(color: Color):
     Args:
         color (Color): The color you want to set the tree to
     """
-    for pixel in tree._pixels:
-        pixel.set(color)
+    tree._buffer.fill(*color.to_tuple())
 
 def lerp(color: Color, frames: int, fn: Callable[[float], float] = linear):
     """Lerp the entire tree from its current color to the target color over the specified amount of frames
@@ -254,8 +432,7 @@ def lerp(color: Color, frames: int, fn: Callable[[float], float] = linear):
             lerp(Color.black(), 10) # similar to fade
         ```
     """
-    for pixel in tree._pixels:
-        pixel.lerp(color, frames, fn=fn)
+    tree._buffer.set_lerp(color.to_tuple(), frames, fn)
 
 def coords():
     """An array of 3d coordinates mapped directly to the pixels
@@ -0,0 +1,169 @@
+"""Caches the data derived from tree.csv on disk, so restarting the tree doesn't have to recompute it.
+
+   The cache is a folder of .npy files named after a hash of the csv contents, the arrays are memory mapped
+   when they are loaded so a restart only reads the parts of them which are used.
+
+   Warning:
+       This module is intended for internal use only. You do not need to use any of this in your pattern code
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+from typing import Optional
+import numpy as np
+import numpy.typing as npt
+from spatial import UniformGrid
+from util import read_tree_csv, tcolors
+
+
+CACHE_VERSION = 1
+"""Bump this whenever the layout of the cache changes, so old caches are ignored"""
+
+CACHE_DIR = ".tree_cache"
+"""The folder, next to the tree file, where caches are stored"""
+
+
+class TreeGeometry:
+    """Everything derived from the positions of the lights
+
+    Warning:
+        This module is intended for internal use only. You do not need to use any of this in your pattern code
+    """
+
+    def __init__(self, tree_hash: str, xyz: npt.NDArray[np.float64], a: npt.NDArray[np.float64], d: npt.NDArray[np.float64], grid: UniformGrid):
+        self.tree_hash = tree_hash
+        """The sha256 of the tree file contents"""
+
+        self.xyz = xyz
+        """The (n, 3) coordinates of the lights"""
+
+        self.a = a
+        """The polar angle of each light"""
+
+        self.d = d
+        """The distance of each light from the trunk"""
+
+        self.grid = grid
+        """Spatial index of the lights"""
+
+    @property
+    def height(self) -> float:
+        """The height of the tree"""
+        return float(self.xyz[:, 2].max())
+
+    @staticmethod
+    def build(tree_hash: str, coords: list[tuple[float, float, float]]) -> "TreeGeometry":
+        """build Work out the geometry from scratch
+
+        Args:
+            tree_hash (str): The sha256 of the tree file contents
+            coords (list[tuple[float, float, float]]): The coordinates read from the tree file
+
+        Returns:
+            TreeGeometry: The geometry of the tree
+        """
+        xyz = np.array(coords, dtype=np.float64).reshape(-1, 3)
+
+        # use the same maths as Pixel did, so patterns see exactly the same values
+        a = np.array([math.atan2(y, x) for x, y, _ in coords], dtype=np.float64)
+        d = np.array([math.sqrt(y ** 2 + x ** 2) for x, y, _ in coords], dtype=np.float64)
+
+        return TreeGeometry(tree_hash, xyz, a, d, UniformGrid(xyz))
+
+    def save(self, folder: str):
+        """save Write the geometry to a cache folder
+
+        The folder is written next to where it should be and then moved into place, so a crash part way through
+        never leaves a broken cache behind
+
+        Args:
+            folder (str): The folder to write to, it is replaced if it already exists
+        """
+        parent = os.path.dirname(folder)
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent)
+        try:
+            np.save(os.path.join(staging, "xyz.npy"), self.xyz)
+            np.save(os.path.join(staging, "a.npy"), self.a)
+            np.save(os.path.join(staging, "d.npy"), self.d)
+            np.save(os.path.join(staging, "grid_order.npy"), self.grid.order)
+            np.save(os.path.join(staging, "grid_start.npy"), self.grid.start)
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump({"version": CACHE_VERSION, "hash": self.tree_hash, "cell_size": self.grid.cell_size}, f)
+
+            shutil.rmtree(folder, ignore_errors=True)
+            os.replace(staging, folder)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    @staticmethod
+    def load(folder: str, tree_hash: str) -> Optional["TreeGeometry"]:
+        """load Read the geometry from a cache folder
+
+        Args:
+            folder (str): The folder written by save()
+            tree_hash (str): The hash the cache should have been made from
+
+        Returns:
+            Optional[TreeGeometry]: The geometry, or None if the cache is missing, out of date or broken
+        """
+        try:
+            with open(os.path.join(folder, "meta.json")) as f:
+                meta = json.load(f)
+            if meta["version"] != CACHE_VERSION or meta["hash"] != tree_hash:
+                return None
+
+            def array(name: str) -> npt.NDArray:
+                return np.load(os.path.join(folder, name + ".npy"), mmap_mode="r")
+
+            xyz = array("xyz")
+            grid = UniformGrid.restore(xyz, array("grid_order"), array("grid_start"), meta["cell_size"])
+            return TreeGeometry(tree_hash, xyz, array("a"), array("d"), grid)
+
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def hash_tree_file(tree_file: str) -> str:
+    """hash_tree_file The sha256 of the contents of a tree file"""
+    with open(tree_file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_tree_geometry(tree_file: str, use_cache: bool = True) -> tuple[list[tuple[float, float, float]], TreeGeometry]:
+    """load_tree_geometry Read a tree file and everything derived from it
+
+    When use_cache is set, the derived data is loaded from the cache if the tree file hasn't changed,
+    otherwise it is worked out and saved for next time
+
+    Args:
+        tree_file (str): The location of the tree.csv file
+        use_cache (bool, optional): Whether to read and write the cache. Defaults to True.
+
+    Returns:
+        tuple[list[tuple[float, float, float]], TreeGeometry]: The coordinates of the lights and their geometry
+    """
+    tree_hash = hash_tree_file(tree_file)
+    folder = os.path.join(os.path.dirname(os.path.abspath(tree_file)), CACHE_DIR, tree_hash)
+
+    if use_cache:
+        geometry = TreeGeometry.load(folder, tree_hash)
+        if geometry is not None:
+            coords: list[tuple[float, float, float]] = [(x, y, z) for x, y, z in geometry.xyz.tolist()]
+            return coords, geometry
+
+    coords = read_tree_csv(tree_file)
+    geometry = TreeGeometry.build(tree_hash, coords)
+
+    if use_cache:
+        try:
+            geometry.save(folder)
+        except OSError as e:
+            print(f"{tcolors.WARNING}Could not cache the tree geometry | {e}{tcolors.ENDC}")
+
+    return coords, geometry
@@ -3,7 +3,9 @@
 
 import csv
 import math
-from typing import Iterable, Union
+from typing import Callable, Iterable, Union
+import numpy as np
+import numpy.typing as npt
 
 
 def save_lights(light_locs: list[list[int]]) -> None:
@@ -319,3 +321,234 @@ def ease_in_out_bounce(x: float) -> float:
         return (1 - ease_out_bounce(1 - 2 * x)) / 2
     else:
         return (1 + ease_out_bounce(2 * x - 1)) / 2
+
+
+"""
+### Array activation functions
+
+Versions of the activation functions above which work on a whole numpy array of values at once.
+These are used to advance every lerp on the tree in one go, use array_easing() to look one up.
+"""
+
+_ARRAY_EASINGS: dict[Callable[[float], float], Callable[[npt.NDArray[np.float64]], npt.NDArray[np.float64]]] = {}
+
+
+def _array_version(fn: Callable[[float], float]):
+    """Register the decorated function as the array version of fn"""
+    def register(array_fn: Callable[[npt.NDArray[np.float64]], npt.NDArray[np.float64]]):
+        _ARRAY_EASINGS[fn] = array_fn
+        return array_fn
+    return register
+
+
+def array_easing(fn: Callable[[float], float]) -> Callable[[npt.NDArray[np.float64]], npt.NDArray[np.float64]]:
+    """Get the version of an activation function which works on a numpy array of values
+
+    Activation functions which don't have an array version (such as your own) are applied to each value in turn
+
+        example:
+            ```
+            array_easing(ease_in_sine)(np.array([0, 0.5, 1])) # [0, 0.29289322, 1]
+            ```
+    """
+    array_fn = _ARRAY_EASINGS.get(fn)
+    if array_fn is not None:
+        return array_fn
+
+    def each(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        return np.fromiter((fn(v) for v in x.tolist()), dtype=np.float64, count=len(x))
+    return each
+
+
+def _where(cond: npt.NDArray[np.bool_], a: Callable[[], npt.NDArray[np.float64]], b: Callable[[], npt.NDArray[np.float64]]) -> npt.NDArray[np.float64]:
+    # both sides are evaluated for every value, so silence the warnings from the side which isn't used
+    with np.errstate(all="ignore"):
+        return np.where(cond, a(), b())
+
+
+@_array_version(linear)
+def _linear_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return x
+
+
+@_array_version(step)
+def _step_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return np.where(x > 0.5, 1.0, 0.0)
+
+
+@_array_version(ease_in_sine)
+def _ease_in_sine_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return 1 - np.cos((x * math.pi) / 2)
+
+
+@_array_version(ease_out_sine)
+def _ease_out_sine_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return np.sin((x * math.pi) / 2)
+
+
+@_array_version(ease_in_out_sine)
+def _ease_in_out_sine_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return -(np.cos(math.pi * x) - 1) / 2
+
+
+@_array_version(ease_in_cubic)
+def _ease_in_cubic_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return x * x * x
+
+
+@_array_version(ease_out_cubic)
+def _ease_out_cubic_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return 1 - np.power(1 - x, 3)
+
+
+@_array_version(ease_in_out_cubic)
+def _ease_in_out_cubic_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return _where(x < 0.5, lambda: 4 * x * x * x, lambda: 1 - np.power(-2 * x + 2, 3) / 2)
+
+
+@_array_version(ease_in_quint)
+def _ease_in_quint_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return x * x * x * x * x
+
+
+@_array_version(ease_out_quint)
+def _ease_out_quint_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return 1 - np.power(1 - x, 5)
+
+
+@_array_version(ease_in_out_quint)
+def _ease_in_out_quint_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return _where(x < 0.5, lambda: 16 * x * x * x * x * x, lambda: 1 - np.power(-2 * x + 2, 5) / 2)
+
+
+@_array_version(ease_in_circ)
+def _ease_in_circ_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return 1 - np.sqrt(1 - np.power(x, 2))
+
+
+@_array_version(ease_out_circ)
+def _ease_out_circ_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return np.sqrt(1 - np.power(x - 1, 2))
+
+
+@_array_version(ease_in_out_circ)
+def _ease_in_out_circ_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return _where(x < 0.5,
+                  lambda: (1 - np.sqrt(1 - np.power(2 * x, 2))) / 2,
+                  lambda: (np.sqrt(1 - np.power(-2 * x + 2, 2)) + 1) / 2)
+
+
+@_array_version(ease_in_elastic)
+def _ease_in_elastic_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    c4 = (2 * math.pi) / 3
+    curve = _where(x <= 0, lambda: np.zeros_like(x), lambda: -np.power(2, 10 * x - 10) * np.sin((x * 10 - 10.75) * c4))
+    return np.where(x >= 1, 1.0, curve)
+
+
+@_array_version(ease_out_elastic)
+def _ease_out_elastic_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    c4 = (2 * math.pi) / 3
+    curve = _where(x <= 0, lambda: np.zeros_like(x), lambda: np.power(2, -10 * x) * np.sin((x * 10 - 0.75) * c4) + 1)
+    return np.where(x >= 1, 1.0, curve)
+
+
+@_array_version(ease_in_out_elastic)
+def _ease_in_out_elastic_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    c5 = (2 * math.pi) / 4.5
+    curve = _where(x < 0.5,
+                   lambda: -(np.power(2, 20 * x - 10) * np.sin((20 * x - 11.125) * c5)) / 2,
+                   lambda: (np.power(2, -20 * x + 10) * np.sin((20 * x - 11.125) * c5)) / 2 + 1)
+    return np.where(x <= 0, 0.0, np.where(x >= 1, 1.0, curve))
+
+
+@_array_version(ease_in_quad)
+def _ease_in_quad_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return x * x
+
+
+@_array_version(ease_out_quad)
+def _ease_out_quad_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return 1 - (1 - x) * (1 - x)
+
+
+@_array_version(ease_in_out_quad)
+def _ease_in_out_quad_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return _where(x < 0.5, lambda: 2 * x * x, lambda: 1 - np.power(-2 * x + 2, 2) / 2)
+
+
+@_array_version(ease_in_quart)
+def _ease_in_quart_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return x * x * x * x
+
+
+@_array_version(ease_out_quart)
+def _ease_out_quart_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return 1 - np.power(1 - x, 4)
+
+
+@_array_version(ease_in_out_quart)
+def _ease_in_out_quart_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return _where(x < 0.5, lambda: 8 * x * x * x * x * x, lambda: 1 - np.power(-2 * x + 2, 4) / 2)
+
+
+@_array_version(ease_in_expo)
+def _ease_in_expo_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return _where(x <= 0, lambda: np.zeros_like(x), lambda: np.power(2, 10 * x - 10))
+
+
+@_array_version(ease_out_expo)
+def _ease_out_expo_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return _where(x >= 1, lambda: np.ones_like(x), lambda: 1 - np.power(2, -10 * x))
+
+
+@_array_version(ease_in_out_expo)
+def _ease_in_out_expo_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    curve = _where(x < 0.5, lambda: np.power(2, 20 * x - 10) / 2, lambda: (2 - np.power(2, -20 * x + 10)) / 2)
+    return np.where(x <= 0, 0.0, np.where(x >= 1, 1.0, curve))
+
+
+@_array_version(ease_in_back)
+def _ease_in_back_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    c1 = 1.70158
+    c3 = c1 + 1
+    return c3 * x * x * x - c1 * x * x
+
+
+@_array_version(ease_out_back)
+def _ease_out_back_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    c1 = 1.70158
+    c3 = c1 + 1
+    return 1 + c3 * np.power(x - 1, 3) + c1 * np.power(x - 1, 2)
+
+
+@_array_version(ease_in_out_back)
+def _ease_in_out_back_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    c1 = 1.70158
+    c2 = c1 * 1.525
+    return _where(x < 0.5,
+                  lambda: (np.power(2 * x, 2) * ((c2 + 1) * 2 * x - c2)) / 2,
+                  lambda: (np.power(2 * x - 2, 2) * ((c2 + 1) * (x * 2 - 2) + c2) + 2) / 2)
+
+
+@_array_version(ease_out_bounce)
+def _ease_out_bounce_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    n1 = 7.5625
+    d1 = 2.75
+    return np.select(
+        [x < 1 / d1, x < 2 / d1, x < 2.5 / d1],
+        [n1 * x * x,
+         n1 * ((x - 1.5) / d1) * (x - 1.5) + 0.75,
+         n1 * ((x - 2.25) / d1) * (x - 2.25) + 0.9375],
+        n1 * ((x - 2.625) / d1) * (x - 2.625) + 0.984375)
+
+
+@_array_version(ease_in_bounce)
+def _ease_in_bounce_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return 1 - _ease_out_bounce_array(1 - x)
+
+
+@_array_version(ease_in_out_bounce)
+def _ease_in_out_bounce_array(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return _where(x < 0.5,
+                  lambda: (1 - _ease_out_bounce_array(1 - 2 * x)) / 2,
+                  lambda: (1 + _ease_out_bounce_array(2 * x - 1)) / 2)
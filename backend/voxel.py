@@ -0,0 +1,155 @@
+"""A 3D grid of values wrapped around the tree, for effects which are easier to work out in a box than on the lights.
+
+   Update the whole grid at once with NumPy, then splat it onto the tree. Which voxels each light reads from
+   is worked out once when the grid is made, so splatting costs the same however the grid is updated.
+
+   Use this at the top of your pattern:
+   ```
+   from gridmas import *
+   ```
+"""
+
+from typing import Literal, Optional
+import numpy as np
+import numpy.typing as npt
+from tree import tree
+
+
+SampleMode = Literal["nearest", "trilinear"]
+"""How a light reads the grid: from the voxel it is closest to, or blended between the 8 voxels around it"""
+
+
+class VoxelGrid:
+    """A box of voxels covering the tree, each holding a number or a color
+
+    Example:
+        ```
+        grid = VoxelGrid(20, 20, 40)
+
+        def draw():
+            grid.data[:] = np.random.random(grid.shape) * 255
+            grid.splat()
+        ```
+    """
+
+    def __init__(self, nx: int, ny: int, nz: int, channels: int = 1, dtype: npt.DTypeLike = np.float64,
+                 bounds: Optional[tuple[tuple[float, float, float], tuple[float, float, float]]] = None):
+        """__init__ Create a grid full of zeros
+
+        Args:
+            nx (int): The number of voxels along x
+            ny (int): The number of voxels along y
+            nz (int): The number of voxels along z, up the tree
+            channels (int, optional): How many values each voxel holds, 3 for a color. Defaults to 1.
+            dtype (npt.DTypeLike, optional): The type of the values. Defaults to np.float64.
+            bounds (Optional[tuple[tuple[float, float, float], tuple[float, float, float]]], optional): The lowest and highest
+                corners of the box, defaults to the smallest box around every light.
+        """
+        if min(nx, ny, nz) < 1:
+            raise ValueError("A VoxelGrid needs at least one voxel along each axis")
+
+        self.size = (nx, ny, nz)
+        self.channels = channels
+
+        self.shape: tuple[int, ...] = self.size if channels == 1 else (*self.size, channels)
+        """The shape of data"""
+
+        self.data: npt.NDArray = np.zeros(self.shape, dtype=dtype)
+        """The value of every voxel, indexed [x, y, z] (and then by channel if there is more than one)"""
+
+        if bounds is None:
+            low, high = tree._xyz.min(axis=0), tree._xyz.max(axis=0)
+        else:
+            low, high = np.asarray(bounds[0], dtype=np.float64), np.asarray(bounds[1], dtype=np.float64)
+        self.low = low
+        self.high = high
+
+        # where each light is in voxels, from 0 to n - 1 along each axis
+        extent = np.where(high > low, high - low, 1)
+        position = np.clip((tree._xyz - low) / extent, 0, 1) * (np.array(self.size) - 1)
+
+        strides = np.array([ny * nz, nz, 1])
+
+        self._nearest: npt.NDArray[np.intp] = np.rint(position).astype(np.intp) @ strides
+        """The flat index of the voxel nearest each light"""
+
+        # the lower corner of the cell around each light, kept one below the edge so the upper corner exists
+        corner = np.minimum(np.floor(position), np.maximum(np.array(self.size) - 2, 0)).astype(np.intp)
+        fraction = position - corner
+
+        self._corners: npt.NDArray[np.intp] = np.empty((len(position), 8), dtype=np.intp)
+        """The flat indices of the 8 voxels around each light"""
+
+        self._weights: npt.NDArray[np.float64] = np.empty((len(position), 8), dtype=np.float64)
+        """How much each of the 8 voxels around each light counts"""
+
+        for i in range(8):
+            offset = np.array([(i >> 2) & 1, (i >> 1) & 1, i & 1])
+            self._weights[:, i] = np.prod(np.where(offset == 1, fraction, 1 - fraction), axis=1)
+            # axes with only one voxel have nowhere to blend to, their fraction is 0 so the upper corner has no weight
+            self._corners[:, i] = (corner + np.minimum(offset, np.array(self.size) - 1)) @ strides
+
+    def indices(self) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+        """indices The x, y and z index of every voxel, for working out the whole grid at once
+
+        Returns:
+            tuple[npt.NDArray[np.intp], npt.NDArray[np.intp], npt.NDArray[np.intp]]: Three arrays the size of the grid
+
+        Example:
+            ```
+            x, y, z = grid.indices()
+            grid.data[:] = np.sin(x / 4) * np.cos(z / 8)
+            ```
+        """
+        return tuple(np.indices(self.size))  # type: ignore
+
+    def sample(self, mode: SampleMode = "nearest") -> npt.NDArray:
+        """sample The value of the grid at every light
+
+        Args:
+            mode (SampleMode, optional): "nearest" reads the closest voxel, "trilinear" blends the 8 voxels around each light. Defaults to "nearest".
+
+        Returns:
+            npt.NDArray: One value per light, or one row of channels per light
+        """
+        flat = self.data.reshape(-1, self.channels) if self.channels > 1 else self.data.reshape(-1)
+
+        if mode == "nearest":
+            return flat[self._nearest]
+
+        values = flat[self._corners]
+        if self.channels > 1:
+            return np.einsum("nk,nkc->nc", self._weights, values)
+        return np.einsum("nk,nk->n", self._weights, values)
+
+    def splat(self, mode: SampleMode = "nearest", palette: Optional[npt.ArrayLike] = None):
+        """splat Set every light to the color of the grid where it is
+
+        Args:
+            mode (SampleMode, optional): How each light reads the grid, see sample(). Defaults to "nearest".
+            palette (Optional[npt.ArrayLike], optional): For grids with one channel, a list of R, G, B colors which the
+                values index into, values are clamped to the palette. Without a palette the value is used as a grey level.
+                Defaults to None.
+
+        Example:
+            ```
+            fire = VoxelGrid(20, 20, 30)
+            palette = [(i, 0, 0) for i in range(256)]
+
+            def draw():
+                fire.splat("trilinear", palette)
+            ```
+        """
+        values = self.sample(mode)
+
+        if self.channels == 3:
+            rgb = values
+        elif self.channels == 1 and palette is not None:
+            colors = np.asarray(palette)
+            rgb = colors[np.clip(values, 0, len(colors) - 1).astype(np.intp)]
+        elif self.channels == 1:
+            rgb = np.repeat(values[:, np.newaxis], 3, axis=1)
+        else:
+            raise ValueError(f"Can't splat a grid with {self.channels} channels, it needs 1 or 3")
+
+        tree._buffer.set_colors(np.clip(rgb, 0, 255).astype(np.uint8))
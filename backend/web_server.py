@@ -1,11 +1,12 @@
 from abc import ABC
 import threading
-from typing import Optional
+from typing import Callable, Optional
 from pattern_manager import PatternManager
+from render_stats import TimingRing, prometheus, stats
 import util
 import json
 import time
-from flask import Flask, request, render_template, send_from_directory
+from flask import Flask, Response, request, render_template, send_from_directory
 from queue import Queue
 from gridmas import *
 
@@ -22,15 +23,26 @@ class RandomPattern(Request):
 class StartPattern(Request):
     def __init__(self, name: str):
         self.name = name
+        self.loaded = threading.Event()
+        """Set once the pattern has been loaded and its attributes are in the store"""
+
+    def __reduce__(self):
+        # the event stays in this process, the pattern worker only needs the name
+        return (StartPattern, (self.name,))
 
 class DrawFrame(Request):
     def __init__(self, frame: list[tuple[int, int, int] | None]):
         self.frame = frame
 
+class SetAttribute(Request):
+    def __init__(self, name: str, value: float | Color):
+        self.name = name
+        self.value = value
+
 
 
 class WebServer:
-    def __init__(self, rate_limit: bool, patternManager: PatternManager):
+    def __init__(self, rate_limit: bool, patternManager: PatternManager, timing_rings: Optional[Callable[[], dict[str, TimingRing]]] = None):
         manager = patternManager
 
         app = Flask(__name__,
@@ -98,12 +110,15 @@ class WebServer:
                 attribute.set(float(request.form['value']))
             else:
                 attribute.set(Color.hex(request.form['value']))
+            self.request_queue.put(SetAttribute(name, attribute.get()))
             return "something"
 
         @app.route('/pattern/<pattern>')
         def pattern(pattern: str):
-            self.request_queue.put(StartPattern(pattern))
-            time.sleep(0.1)
+            req = StartPattern(pattern)
+            self.request_queue.put(req)
+            # the page shows the new pattern's attributes, so wait for it to load (a slow pattern gets the old ones)
+            req.loaded.wait(5)
             return render_template('pattern_config.html', pattern=manager.get(pattern), attributes=Store.get_store())
 
 
@@ -121,6 +136,19 @@ class WebServer:
             return "bruh"
 
 
+        ## Stats
+
+        @app.route('/stats')
+        def statsJ():
+            rings = timing_rings() if timing_rings else {}
+            return Response(json.dumps(stats(rings)), mimetype="application/json")
+
+        @app.route('/metrics')
+        def metrics():
+            rings = timing_rings() if timing_rings else {}
+            return Response(prometheus(rings), mimetype="text/plain; version=0.0.4")
+
+
         ## Web interface
 
         @app.route('/', methods=['GET'])